@@ -24,6 +24,21 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+# SQLite 의 전문 검색 FTS5 테이블(posts_fts, comments_fts 와 그 내부 테이블)은 모델에 없으므로
+# autogenerate 가 삭제하자고 제안하지 않도록 비교 대상에서 뺍니다 (search.py 참고).
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not (name.startswith("posts_fts") or name.startswith("comments_fts"))
+    return True
+
+
+# FULLTEXT 인덱스는 MySQL 에서만 만듭니다 (models.py 의 ddl_if). 다른 DB에서는 비교하지 않습니다.
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "index" and not reflected and object.dialect_kwargs.get("mysql_prefix") == "FULLTEXT":
+        return context.get_context().dialect.name == "mysql"
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +61,8 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +86,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,48 @@
+"""Add read-path indexes, drop unused ones
+
+Revision ID: 3b9d2c7a41f0
+Revises: ef063746bf88
+Create Date: 2026-10-18 10:12:41.208117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2c7a41f0'
+down_revision: Union[str, Sequence[str], None] = 'ef063746bf88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 읽기 경로에 필요한 인덱스
+    # - comments(post_id, id): get_comments_by_post 의 post_id 필터 + id 키셋 정렬
+    # - posts(owner_id): 작성자 조인/필터
+    op.create_index('ix_comments_post_id_id', 'comments', ['post_id', 'id'], unique=False)
+    op.create_index(op.f('ix_posts_owner_id'), 'posts', ['owner_id'], unique=False)
+
+    # 쓰기만 느리게 하는 인덱스 제거
+    # - items.description: 조회 조건으로 쓰이지 않는 500자 VARCHAR 인덱스
+    # - ix_*_id: 기본 키와 중복
+    op.drop_index(op.f('ix_items_description'), table_name='items')
+    op.drop_index(op.f('ix_items_id'), table_name='items')
+    op.drop_index(op.f('ix_comments_id'), table_name='comments')
+    op.drop_index(op.f('ix_posts_id'), table_name='posts')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_posts_id'), 'posts', ['id'], unique=False)
+    op.create_index(op.f('ix_comments_id'), 'comments', ['id'], unique=False)
+    op.create_index(op.f('ix_items_id'), 'items', ['id'], unique=False)
+    op.create_index(op.f('ix_items_description'), 'items', ['description'], unique=False)
+
+    op.drop_index(op.f('ix_posts_owner_id'), table_name='posts')
+    op.drop_index('ix_comments_post_id_id', table_name='comments')
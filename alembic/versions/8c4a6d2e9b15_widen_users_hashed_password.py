@@ -0,0 +1,36 @@
+"""Widen users.hashed_password for configurable hash schemes
+
+Revision ID: 8c4a6d2e9b15
+Revises: 5e1f0a9c3d72
+Create Date: 2026-10-18 18:05:41.217593
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4a6d2e9b15'
+down_revision: Union[str, Sequence[str], None] = '5e1f0a9c3d72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('hashed_password',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=255),
+               existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('hashed_password',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=100),
+               existing_nullable=True)
@@ -0,0 +1,30 @@
+"""Index refresh_tokens.expires_at for the expired-token prune
+
+Revision ID: 9f2b6e4c1d83
+Revises: e41b7c9d2a58
+Create Date: 2026-10-19 14:22:07.604118
+
+revocation.RevocationList.prune deletes expired refresh tokens
+periodically. Without an index on expires_at that DELETE scans the whole
+table, and the table grows with every login and rotation.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2b6e4c1d83'
+down_revision: Union[str, Sequence[str], None] = 'e41b7c9d2a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
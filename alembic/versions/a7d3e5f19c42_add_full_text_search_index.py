@@ -0,0 +1,50 @@
+"""Add full-text search index for posts and comments
+
+Revision ID: a7d3e5f19c42
+Revises: 8c4a6d2e9b15
+Create Date: 2026-10-18 20:31:12.584016
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5f19c42'
+down_revision: Union[str, Sequence[str], None] = '8c4a6d2e9b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        # InnoDB FULLTEXT: 인덱스를 만들 때 기존 행도 색인되고, 이후 INSERT 는 자동으로 반영됩니다.
+        op.create_index('ft_posts_title_content', 'posts', ['title', 'content'], unique=False, mysql_prefix='FULLTEXT')
+        op.create_index('ft_comments_content', 'comments', ['content'], unique=False, mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        # FTS5 external content 테이블 (원문은 posts/comments 에 두고 역색인만 저장) + 기존 행 색인
+        op.execute(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            "title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE VIRTUAL TABLE comments_fts USING fts5("
+            "content, content='comments', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+        op.execute("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_comments_content', table_name='comments')
+        op.drop_index('ft_posts_title_content', table_name='posts')
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE comments_fts")
+        op.execute("DROP TABLE posts_fts")
@@ -0,0 +1,42 @@
+"""Add denormalized comment_count / last_comment_at to posts
+
+Revision ID: c2f84b7d5a16
+Revises: a7d3e5f19c42
+Create Date: 2026-10-18 21:12:08.530417
+
+The migration only changes the schema. Existing posts start at
+comment_count = 0 and last_comment_at = NULL. Recount them afterwards in
+short batches, which is safe while the app is serving traffic:
+
+    python post_counters.py backfill
+
+Comments written before this revision have no timestamp, so
+last_comment_at stays NULL until the post gets a new comment.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f84b7d5a16'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e5f19c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_comment_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_posts_last_comment_at_id', 'posts', ['last_comment_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_last_comment_at_id', table_name='posts')
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('last_comment_at')
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,36 @@
+"""Add comments.provisional_id for idempotent write-behind replay
+
+Revision ID: e41b7c9d2a58
+Revises: c2f84b7d5a16
+Create Date: 2026-10-19 10:04:51.218330
+
+The write-behind comment queue stores the provisional id it hands out in
+the 202 response. With the unique index, replaying the queue log after a
+crash between commit and the "done" record skips comments that are
+already saved. Existing comments keep NULL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41b7c9d2a58'
+down_revision: Union[str, Sequence[str], None] = 'c2f84b7d5a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.add_column(sa.Column('provisional_id', sa.String(length=32), nullable=True))
+    op.create_index('ix_comments_provisional_id', 'comments', ['provisional_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_provisional_id', table_name='comments')
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.drop_column('provisional_id')
@@ -1,23 +1,37 @@
-﻿from datetime import datetime, timedelta
+﻿from datetime import datetime, timedelta, timezone
+import os
 from typing import Optional
+import uuid
 
 # JWT 생성을 위한 라이브러리 임포트
-from jose import jwt, JWTError
-from fastapi import Depends, HTTPException, status
+from jose import JWTError
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from schemas import TokenData # schemas.py에서 정의한 TokenData 임포트
-from database import get_db
-from crud import get_user_by_username
-from models import User as UserModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas import TokenData, User # schemas.py에서 정의한 TokenData 임포트
+from database import get_async_db
+import crud
+from crud import get_user_by_username_async
+from token_cache import token_cache
+from jwt_keys import JWT_SECRET_KEY, LEGACY_ALGORITHM, get_keyring
+from metrics import Counter
+from revocation import revocation_list, to_timestamp, utc_now
 
 # -----------------
 # 💡 JWT 설정 값 (보안에 매우 중요)
 # -----------------
-# 환경 변수나 설정 파일을 사용하는 것이 좋으나, 지금은 코드를 명시합니다.
-SECRET_KEY = "당신의_매우_매우_매우_안전한_비밀키" # 실제 서비스에서는 절대로 노출되지 않게 하세요!
-ALGORITHM = "HS256" # 사용할 암호화 알고리즘
+# 서명 키/알고리즘은 jwt_keys.py 의 키링이 관리합니다 (JWT_KEYS_DIR 미지정 시 아래 HS256 비밀키 사용).
+SECRET_KEY = JWT_SECRET_KEY # 실제 서비스에서는 절대로 노출되지 않게 하세요! (JWT_SECRET_KEY 환경 변수)
+ALGORITHM = LEGACY_ALGORITHM # 키 디렉터리가 없을 때 사용할 암호화 알고리즘
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 # 토큰 만료 시간 (분 단위)
+# 리프레시 토큰 만료 시간 (일 단위). 이 기간 안에는 비밀번호 검증 없이 POST /token/refresh 로 재발급됩니다.
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+REFRESH_TOKEN_TYPE = "refresh"
+
+refresh_tokens_issued_total = Counter("refresh_tokens_issued_total", "Refresh tokens issued", ["grant"])
+refresh_token_reuse_total = Counter(
+    "refresh_token_reuse_total", "Already-rotated refresh tokens presented again (token family revoked)"
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -31,17 +45,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         # 기본 만료 시간 (30분)
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    # 2. 만료 시간 (exp)을 토큰 페이로드에 추가
+    # 2. 만료 시간 (exp)과 폐기용 토큰 id (jti)를 토큰 페이로드에 추가
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     
-    # 3. JWT 인코딩 및 반환
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # 3. JWT 인코딩 및 반환 (키링의 active 키로 서명, 헤더에 kid 포함)
+    encoded_jwt = get_keyring().sign(to_encode)
     return encoded_jwt
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserModel:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    # 0. 최근에 검증한 토큰이면 디코딩과 DB 조회 없이 바로 반환 (폐기 여부는 메모리에서 O(1) 확인)
+    cached = token_cache.get(token)
+    if cached is not None and not revocation_list.is_revoked(cached.claims.get("jti")):
+        return cached.principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,13 +69,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     
     try:
-        # 1. JWT 토큰 디코딩
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # 1. JWT 토큰 디코딩 (kid 로 미리 파싱해 둔 검증 키를 고름)
+        payload = get_keyring().decode(token)
         
         # 2. 페이로드에서 사용자 이름(sub) 추출 (main.py에서 {"sub": user.username}으로 저장했음)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
+
+        # 리프레시 토큰은 API 호출에 쓸 수 없고, 폐기된 토큰(로그아웃/탈취 감지)은 거절합니다.
+        if payload.get("type") == REFRESH_TOKEN_TYPE or revocation_list.is_revoked(payload.get("jti")):
+            raise credentials_exception
             
         # 3. 토큰 데이터 스키마 검증
         token_data = TokenData(username=username)
@@ -64,9 +88,114 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         # JWT 디코딩 실패 (토큰 만료, 잘못된 시크릿 키 등)
         raise credentials_exception
     
-    # 4. DB에서 사용자 정보 조회
-    user = get_user_by_username(db, username=token_data.username)
+    # 4. DB에서 사용자 정보 조회 (비동기 세션: 이벤트 루프를 막지 않음)
+    user = await get_user_by_username_async(db, username=token_data.username)
     if user is None:
         raise credentials_exception
-        
-    return user
\ No newline at end of file
+
+    # 5. 세션과 분리된 가벼운 사용자 정보(id, username, is_active)로 변환해 캐시
+    principal = User.model_validate(user)
+    token_cache.put(token, payload, principal)
+    return principal
+
+
+# 브라우저 EventSource 는 헤더를 지정할 수 없으므로 SSE 경로는 토큰을 ?token= 으로도 받습니다 (Authorization 헤더 우선).
+# (WebSocket 경로와 같은 방식. URL 은 접근 로그에 남을 수 있으니 수명이 짧은 액세스 토큰만 쓰세요.)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+async def get_current_user_for_stream(
+    header_token: str | None = Depends(optional_oauth2_scheme),
+    token: str | None = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    return await get_current_user(token=header_token or token or "", db=db)
+
+
+# -----------------
+# 🔄 리프레시 토큰 (회전 + 재사용 감지)
+# -----------------
+# 로그인(/token) 때 액세스 토큰과 함께 리프레시 토큰을 발급합니다. 클라이언트는 액세스 토큰이 만료되면
+# POST /token/refresh 로 새 쌍을 받으므로 비밀번호 해싱(sha256_crypt)을 다시 하지 않습니다.
+# - 회전: 리프레시 토큰은 한 번만 쓸 수 있고, 쓸 때마다 같은 family 의 새 토큰이 발급됩니다.
+# - 재사용 감지: 이미 쓴 리프레시 토큰이 다시 오면 탈취로 보고 family 전체와
+#   그 family 로 발급된 액세스 토큰을 폐기합니다.
+async def issue_tokens(db: AsyncSession, user_id: int, username: str, family_id: str | None = None) -> dict:
+    access_jti = uuid.uuid4().hex
+    access_token = create_access_token(data={"sub": username, "jti": access_jti})
+
+    refresh_jti = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    refresh_tokens_issued_total.inc(grant="refresh_token" if family_id else "password")
+    family_id = family_id or uuid.uuid4().hex
+    refresh_token = get_keyring().sign(
+        {"sub": username, "jti": refresh_jti, "fam": family_id, "type": REFRESH_TOKEN_TYPE, "exp": expires_at}
+    )
+    await crud.create_refresh_token_async(
+        db, jti=refresh_jti, family_id=family_id, user_id=user_id, access_jti=access_jti, expires_at=expires_at
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _decode_refresh_token(refresh_token: str) -> dict:
+    try:
+        claims = get_keyring().decode(refresh_token)
+    except JWTError:
+        raise _invalid_refresh_token()
+    if claims.get("type") != REFRESH_TOKEN_TYPE or not claims.get("jti"):
+        raise _invalid_refresh_token()
+    return claims
+
+
+async def rotate_refresh_token(db: AsyncSession, refresh_token: str) -> dict:
+    claims = _decode_refresh_token(refresh_token)
+
+    # 1. 아직 쓰이지 않은 토큰이면 사용 처리 (조건부 UPDATE 한 번)
+    stored = await crud.use_refresh_token_async(db, claims["jti"], now=utc_now())
+    if stored is None:
+        # 2. 이미 쓴 토큰이 다시 왔다면 재사용 → family 폐기
+        previous = await crud.get_refresh_token_async(db, claims["jti"])
+        if previous is not None and previous.used_at is not None and not previous.revoked:
+            refresh_token_reuse_total.inc()
+            await revoke_token_family(db, previous.family_id)
+        raise _invalid_refresh_token()
+
+    # 3. 사용자가 여전히 유효한지 확인 후 같은 family 로 새 쌍 발급
+    user = await get_user_by_username_async(db, username=claims["sub"])
+    if user is None or user.id != stored.user_id or not user.is_active:
+        raise _invalid_refresh_token()
+    return await issue_tokens(db, user.id, user.username, family_id=stored.family_id)
+
+
+async def revoke_access_tokens(db: AsyncSession, expirations: dict):
+    # expirations: {액세스 토큰 jti: 만료 시각(UTC naive datetime)}
+    await crud.add_revoked_tokens_async(db, expirations)
+    for jti, expires_at in expirations.items():
+        revocation_list.add(jti, to_timestamp(expires_at))
+
+
+async def revoke_token_family(db: AsyncSession, family_id: str):
+    access_jtis = await crud.revoke_refresh_family_async(db, family_id)
+    # 액세스 토큰은 늦어도 지금부터 ACCESS_TOKEN_EXPIRE_MINUTES 안에 만료됩니다.
+    expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    await revoke_access_tokens(db, {jti: expires_at for jti in access_jtis})
+
+
+async def revoke_tokens(db: AsyncSession, access_token: str, username: str, refresh_token: str | None = None):
+    # 로그아웃: 현재 액세스 토큰과 (주어지면) 리프레시 토큰 family 를 폐기합니다.
+    claims = get_keyring().decode(access_token)
+    if claims.get("jti"):
+        await revoke_access_tokens(db, {claims["jti"]: datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None)})
+    if refresh_token:
+        refresh_claims = _decode_refresh_token(refresh_token)
+        if refresh_claims.get("sub") != username:
+            raise _invalid_refresh_token()
+        await revoke_token_family(db, refresh_claims["fam"])
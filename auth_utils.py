@@ -1,7 +1,59 @@
-﻿from passlib.context import CryptContext
+﻿import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-# Bcrypt 해싱 알고리즘 사용 설정
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+
+from metrics import Counter, Gauge, Histogram
+
+# -----------------
+# 🔧 해싱 방식/비용 설정
+# -----------------
+# PASSWORD_HASH_SCHEMES: 쉼표로 구분한 passlib 방식 목록. 첫 번째 방식으로 새 해시를 만들고 나머지는 검증만 합니다.
+#   예: "argon2,sha256_crypt" → 기존 sha256_crypt 해시는 검증은 되고, 다음 로그인 때 argon2 로 다시 해싱됩니다.
+#   (argon2 는 argon2-cffi, bcrypt 는 bcrypt 또는 OS crypt 지원이 필요합니다.)
+# PASSWORD_HASH_SETTINGS: passlib CryptContext 옵션 "이름=값" 목록 (쉼표 구분).
+#   예: "argon2__default_rounds=3,argon2__memory_cost=65536"
+#   <방식>__default_rounds 를 지정하면 <방식>__min_rounds 도 같은 값으로 잡아서, 비용을 올렸을 때
+#   그보다 낮은 비용의 기존 해시도 다음 로그인 때 다시 해싱됩니다.
+#   이 머신에 맞는 값은 python auth_utils.py calibrate --target-ms 250 으로 구할 수 있습니다.
+PASSWORD_HASH_SCHEMES = [
+    scheme.strip() for scheme in os.getenv("PASSWORD_HASH_SCHEMES", "sha256_crypt").split(",") if scheme.strip()
+]
+PASSWORD_HASH_SETTINGS = os.getenv("PASSWORD_HASH_SETTINGS", "")
+
+
+def _parse_settings(text: str) -> dict:
+    settings = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        value = value.strip()
+        settings[name.strip()] = int(value) if value.isdigit() else value
+    return settings
+
+
+def build_context(schemes: list[str], settings: dict | None = None) -> CryptContext:
+    for scheme in schemes:
+        handler = get_crypt_handler(scheme)
+        if hasattr(handler, "has_backend") and not handler.has_backend():
+            raise RuntimeError(f"password hash scheme '{scheme}' is configured but its backend is not installed")
+    options = dict(settings or {})
+    for scheme in schemes:
+        if f"{scheme}__default_rounds" in options:
+            options.setdefault(f"{scheme}__min_rounds", options[f"{scheme}__default_rounds"])
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+# 해싱 알고리즘 설정 (기본: sha256_crypt, passlib 기본 비용)
+pwd_context = build_context(PASSWORD_HASH_SCHEMES, _parse_settings(PASSWORD_HASH_SETTINGS))
 
 # 비밀번호 해싱 함수
 def get_password_hash(password):
@@ -9,4 +61,177 @@ def get_password_hash(password):
 
 # 비밀번호 검증 함수 (로그인 시 사용 예정)
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+# 비밀번호 검증 + 해시 갱신 (로그인 시 사용)
+# (검증 결과, 새 해시 또는 None)을 반환합니다. 저장된 해시가 예전 방식이거나 설정보다 낮은 비용이면
+# 검증에 성공한 김에 현재 설정으로 다시 해싱한 값을 돌려주므로, 호출한 쪽에서 저장하면 됩니다.
+def verify_and_update_password(plain_password, hashed_password):
+    verified, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    if new_hash is not None:
+        password_hash_upgrades_total.inc()
+    return verified, new_hash
+
+
+# -----------------
+# 🔐 해싱 전용 프로세스 풀 (+ 대기열 제한)
+# -----------------
+# 해싱/검증은 수십만 번의 SHA-256 반복이라 CPU를 오래 씁니다.
+# 요청 스레드(또는 이벤트 루프)에서 직접 돌리면 다른 요청들이 같이 느려지므로,
+# 코어 수만큼의 워커 프로세스로 보내고, 대기 중인 작업이 너무 많으면 즉시 거절(503)합니다.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# 실행 중 + 대기 중인 해싱 작업의 최대 개수 (넘으면 PasswordHashingBusy)
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 4))
+# 거절 시 클라이언트에게 알려줄 재시도 대기 시간 (초)
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", 1))
+
+password_hash_seconds = Histogram(
+    "password_hash_seconds", "Time spent hashing/verifying a password in a worker", ["operation"]
+)
+password_hash_queue_wait_seconds = Histogram(
+    "password_hash_queue_wait_seconds", "Time a hashing job waited before a worker picked it up", ["operation"]
+)
+password_hash_pending = Gauge(
+    "password_hash_pending", "Hashing jobs submitted but not finished", callback=lambda: _pending
+)
+password_hash_rejected_total = Counter(
+    "password_hash_rejected_total", "Hashing jobs rejected because the queue was full", ["operation"]
+)
+password_hash_upgrades_total = Counter(
+    "password_hash_upgrades_total", "Stored password hashes re-hashed with the current scheme/cost on login"
+)
+
+
+class PasswordHashingBusy(Exception):
+    # 대기열이 가득 찼을 때 발생 (main.py에서 503 + Retry-After 로 변환)
+    def __init__(self, retry_after: int = PASSWORD_HASH_RETRY_AFTER):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+_executor: ProcessPoolExecutor | None = None
+_pending = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: 이벤트 루프/스레드/DB 커넥션을 가진 부모 프로세스를 fork 하지 않습니다.
+        _executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_password_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def _timed_worker(operation: str, *args):
+    # 워커 프로세스에서 실행: (결과, 시작 시각, 소요 시간)을 돌려줍니다.
+    started = time.time()
+    if operation == "hash":
+        result = get_password_hash(*args)
+    elif operation == "verify_and_update":
+        result = pwd_context.verify_and_update(*args)
+    elif operation == "dummy_verify":
+        result = pwd_context.dummy_verify()
+    else:
+        raise ValueError(f"unknown password operation: {operation}")
+    return result, started, time.time() - started
+
+
+async def _run_in_pool(operation: str, *args):
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        password_hash_rejected_total.inc(operation=operation)
+        raise PasswordHashingBusy()
+
+    _pending += 1
+    submitted = time.time()
+    try:
+        loop = asyncio.get_running_loop()
+        result, started, elapsed = await loop.run_in_executor(_get_executor(), _timed_worker, operation, *args)
+    finally:
+        _pending -= 1
+
+    password_hash_queue_wait_seconds.observe(max(0.0, started - submitted), operation=operation)
+    password_hash_seconds.observe(elapsed, operation=operation)
+    return result
+
+
+# 비동기 해싱 함수 (crud의 *_async 함수에서 사용)
+async def get_password_hash_async(password):
+    return await _run_in_pool("hash", password)
+
+
+# 비동기 검증 + 해시 갱신 함수 (로그인 시 사용, verify_and_update_password 참고)
+async def verify_and_update_password_async(plain_password, hashed_password):
+    verified, new_hash = await _run_in_pool("verify_and_update", plain_password, hashed_password)
+    if new_hash is not None:
+        password_hash_upgrades_total.inc()
+    return verified, new_hash
+
+
+# 없는 사용자로 로그인할 때 사용: 실제 검증과 같은 비용의 가짜 검증을 수행해
+# 응답 시간으로 사용자 존재 여부를 알 수 없게 합니다.
+async def dummy_verify_password_async():
+    await _run_in_pool("dummy_verify")
+    return False
+
+
+# -----------------
+# ⏱️ 비용 보정 (calibration)
+# -----------------
+# 방식마다 비용(rounds)을 조절해 이 머신에서 검증 1회가 target_seconds 에 가깝도록 맞춥니다.
+# rounds 비용이 선형인 방식(sha256_crypt, pbkdf2, argon2 의 time_cost)은 비례식으로,
+# log2 인 방식(bcrypt, scrypt)은 2의 거듭제곱 단위로 조정합니다.
+def measure_verify_seconds(handler, samples: int = 3) -> float:
+    hashed = handler.hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify("calibration-password", hashed)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target_seconds: float, samples: int = 3) -> tuple[int, float]:
+    # (rounds, 그 rounds 에서 측정한 검증 시간)을 반환합니다.
+    handler = get_crypt_handler(scheme)
+    rounds = handler.default_rounds
+    for _ in range(8):
+        elapsed = measure_verify_seconds(handler.using(rounds=rounds), samples)
+        ratio = target_seconds / elapsed
+        if handler.rounds_cost == "log2":
+            next_rounds = rounds + round(math.log2(ratio))
+        else:
+            next_rounds = int(rounds * ratio)
+        next_rounds = min(max(next_rounds, handler.min_rounds or 1), handler.max_rounds)
+        if next_rounds == rounds or abs(ratio - 1) < 0.1:
+            break
+        rounds = next_rounds
+    return rounds, measure_verify_seconds(handler.using(rounds=rounds), samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="password hashing tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_command = commands.add_parser("calibrate", help="pick rounds that hit a target verify time")
+    calibrate_command.add_argument("--target-ms", type=float, default=250.0)
+    calibrate_command.add_argument("--scheme", action="append", help="scheme to calibrate (repeatable)")
+    calibrate_command.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    schemes = args.scheme or PASSWORD_HASH_SCHEMES[:1]
+    settings = []
+    for scheme in schemes:
+        rounds, elapsed = calibrate(scheme, args.target_ms / 1000, args.samples)
+        print(f"{scheme:<16} rounds={rounds:<10} verify={elapsed * 1000:8.1f}ms  (~{1 / elapsed:.1f} logins/s per core)")
+        settings.append(f"{scheme}__default_rounds={rounds}")
+    print()
+    print(f"PASSWORD_HASH_SCHEMES={','.join(dict.fromkeys(schemes + PASSWORD_HASH_SCHEMES))}")
+    print(f"PASSWORD_HASH_SETTINGS={','.join(settings)}")
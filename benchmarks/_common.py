@@ -0,0 +1,133 @@
+"""벤치마크 공통 도구.
+
+모든 벤치마크는 로컬 SQLite(동기: pysqlite, 비동기: aiosqlite)를 백엔드로 사용합니다.
+앱은 별도 프로세스의 uvicorn 서버로 띄우고, 클라이언트는 httpx 로 실제 TCP 요청을 보냅니다.
+(ASGITransport 로 직접 호출하면 서버 이벤트 루프가 막혀도 대기 시간이 측정되지 않기 때문입니다.)
+
+이 모듈은 main.py 보다 먼저 임포트되어야 합니다. DB URL 환경 변수를 여기서 설정하기 때문입니다.
+"""
+import asyncio
+import contextlib
+import os
+import socket
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 벤치마크는 서버의 /metrics 를 읽어 결과를 계산하므로 켭니다 (운영 기본값은 꺼짐).
+os.environ.setdefault("METRICS_ENABLED", "1")
+
+BENCH_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench.db")
+
+
+def use_sqlite(path: str = BENCH_DB_PATH, fresh: bool = True):
+    # 이미 환경 변수가 지정되어 있으면 (예: 다른 DB로 측정) 그대로 둡니다.
+    if fresh and "DATABASE_URL" not in os.environ and os.path.exists(path):
+        os.remove(path)
+    # 비동기 엔진 URL(aiosqlite)은 database.async_database_url 이 DATABASE_URL 에서 만듭니다.
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{path}")
+
+
+def emulate_db_latency(engine, async_engine, latency_ms: float):
+    # 로컬 SQLite 는 네트워크 왕복이 없어 실제 MySQL 보다 훨씬 빠릅니다.
+    # 문장마다 latency_ms 만큼 왕복 대기 시간을 넣어 원격 DB를 흉내 냅니다.
+    # - 동기 엔진: 실제 동기 드라이버처럼 호출한 스레드를 그대로 재웁니다 (time.sleep).
+    # - 비동기 엔진: 실제 네트워크 드라이버처럼 이벤트 루프에 제어를 넘기며 기다립니다 (asyncio.sleep).
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+
+    if latency_ms <= 0:
+        return
+    delay = latency_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _sync_round_trip(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(delay)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _async_round_trip(conn, cursor, statement, parameters, context, executemany):
+        await_only(asyncio.sleep(delay))
+
+
+@contextlib.contextmanager
+def serve(app):
+    # app 을 fork 한 자식 프로세스의 uvicorn 으로 실행하고 base_url 을 돌려줍니다.
+    # 부하 생성기(httpx)와 서버가 같은 GIL 을 나눠 쓰지 않도록 프로세스를 분리합니다.
+    import multiprocessing
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    process = multiprocessing.get_context("fork").Process(target=_run_server, args=(app, port))
+    process.start()
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                raise RuntimeError("benchmark server did not start")
+            time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def _run_server(app, port: int):
+    import uvicorn
+
+    import database
+
+    # 부모 프로세스에서 열어 둔 커넥션을 자식이 공유하지 않도록 풀을 비웁니다.
+    database.engine.dispose(close=False)
+    database.async_engine.sync_engine.dispose(close=False)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(label: str, samples, elapsed: float | None = None):
+    # 지연 시간은 ms 단위로 출력합니다.
+    line = (
+        f"{label:<32} n={len(samples):<6} "
+        f"p50={percentile(samples, 50) * 1000:8.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:8.2f}ms "
+        f"mean={statistics.fmean(samples) * 1000 if samples else 0:8.2f}ms"
+    )
+    if elapsed:
+        line += f"  throughput={len(samples) / elapsed:9.1f} req/s"
+    print(line)
+
+
+async def run_clients(base_url: str, send, clients: int, requests_per_client: int):
+    # send(client): 요청 1건을 보내는 코루틴 함수. 클라이언트마다 커넥션 1개짜리 httpx 클라이언트를 씁니다.
+    # 각 요청의 지연 시간 목록과 전체 소요 시간을 반환합니다.
+    import httpx
+
+    latencies: list[float] = []
+
+    async def client():
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+            await send(http)  # 워밍업 (커넥션 수립)
+            for _ in range(requests_per_client):
+                start = time.perf_counter()
+                await send(http)
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - start
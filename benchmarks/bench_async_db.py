@@ -0,0 +1,75 @@
+"""get_current_user 동기 경로 vs 비동기 경로 지연 시간 비교.
+
+before: async 디펜던시 안에서 동기 Session + crud.get_user_by_username 호출 (이벤트 루프 블로킹)
+after : main.app (AsyncSession + crud.get_user_by_username_async)
+
+실행: python benchmarks/bench_async_db.py [동시_클라이언트_수] [클라이언트당_요청_수] [DB_지연_ms]
+
+DB_지연_ms (기본 2ms) 는 원격 DB 왕복 시간을 흉내 냅니다 (_common.emulate_db_latency 참고).
+0 을 주면 순수 로컬 SQLite 로 측정합니다.
+"""
+import asyncio
+import sys
+
+from _common import emulate_db_latency, report, run_clients, serve, use_sqlite
+
+use_sqlite()
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from jose import jwt  # noqa: E402
+
+import crud  # noqa: E402
+import main  # noqa: E402
+from auth_token import ALGORITHM, SECRET_KEY, create_access_token, oauth2_scheme  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+from schemas import User, UserCreate  # noqa: E402
+
+
+def build_legacy_app() -> FastAPI:
+    # 변경 전 auth_token.get_current_user 와 동일하게 이벤트 루프 위에서 동기 조회를 합니다.
+    # (get_db 로 받은 세션을 그대로 쓰면 동시 요청 수가 풀 크기를 넘는 순간 루프가 풀 대기에 막혀
+    #  세션 반납도 못 하는 교착 상태가 되므로, 벤치마크에서는 조회 직후 세션을 닫습니다.)
+    async def legacy_get_current_user(token: str = Depends(oauth2_scheme)):
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with SessionLocal() as db:
+            return crud.get_user_by_username(db, username=payload["sub"])
+
+    legacy = FastAPI()
+
+    @legacy.get("/users/me/", response_model=User)
+    async def read_users_me(current_user=Depends(legacy_get_current_user)):
+        return current_user
+
+    return legacy
+
+
+async def measure(base_url: str, label: str, token: str, clients: int, per_client: int):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def send(client):
+        response = await client.get("/users/me/", headers=headers)
+        assert response.status_code == 200, response.text
+
+    latencies, elapsed = await run_clients(base_url, send, clients, per_client)
+    report(label, latencies, elapsed)
+
+
+def main_bench():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+
+    with SessionLocal() as db:
+        crud.create_user(db, UserCreate(username="bench_user", password="bench-password"))
+    token = create_access_token({"sub": "bench_user"})
+    emulate_db_latency(engine, async_engine, latency_ms)
+
+    print(f"clients={clients} requests/client={per_client} db_latency={latency_ms}ms")
+    with serve(build_legacy_app()) as base_url:
+        asyncio.run(measure(base_url, "before (sync session)", token, clients, per_client))
+    with serve(main.app) as base_url:
+        asyncio.run(measure(base_url, "after  (async session)", token, clients, per_client))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,73 @@
+"""댓글 가져오기(import) 처리량: 행 단위 엔드포인트 vs 일괄(bulk) 엔드포인트 (rows/s).
+
+per-row: POST /posts/{id}/comments/ 를 행마다 호출 (동시 클라이언트 여러 개)
+bulk   : POST /posts/{id}/comments/bulk 로 batch_size 개씩 호출 (가져오기 작업 하나가 배치를 순서대로 전송)
+
+SQLite 는 쓰기 트랜잭션을 하나만 허용하고, 읽기 후 쓰기로 잠금을 올리는 트랜잭션이 겹치면
+대기 없이 "database is locked" 로 실패합니다. 그래서 bulk 측은 클라이언트 1개로 측정합니다.
+
+실행: python benchmarks/bench_bulk_insert.py [총_행_수] [배치_크기] [동시_클라이언트_수] [DB_지연_ms]
+"""
+import asyncio
+import sys
+import time
+
+from _common import emulate_db_latency, serve, use_sqlite
+
+use_sqlite()
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+import models  # noqa: E402
+from auth_token import create_access_token  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+
+
+async def import_rows(base_url: str, token: str, total: int, batch_size: int, clients: int, bulk: bool):
+    headers = {"Authorization": f"Bearer {token}"}
+    queue: asyncio.Queue = asyncio.Queue()
+    step = batch_size if bulk else 1
+    for start in range(0, total, step):
+        queue.put_nowait([{"content": f"imported {i}"} for i in range(start, min(total, start + step))])
+
+    async def worker():
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, headers=headers) as client:
+            while not queue.empty():
+                batch = queue.get_nowait()
+                if bulk:
+                    response = await client.post("/posts/1/comments/bulk", json=batch)
+                else:
+                    response = await client.post("/posts/1/comments/", json=batch[0])
+                assert response.status_code == 201, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return total / (time.perf_counter() - started)
+
+
+def main_bench():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    latency_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 2.0
+
+    with SessionLocal() as db:
+        user = models.User(username="importer", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(models.Post(title="import target", content="x", owner_id=user.id))
+        db.commit()
+    token = create_access_token({"sub": "importer"})
+    emulate_db_latency(engine, async_engine, latency_ms)
+
+    print(f"rows={total} batch_size={batch_size} clients={clients} db_latency={latency_ms}ms")
+    with serve(main.app) as base_url:
+        per_row = asyncio.run(import_rows(base_url, token, total, batch_size, clients, bulk=False))
+        print(f"{'per-row endpoint':<32} {per_row:10.1f} rows/s")
+        bulk = asyncio.run(import_rows(base_url, token, total, batch_size, 1, bulk=True))
+        print(f"{'bulk endpoint':<32} {bulk:10.1f} rows/s  ({bulk / per_row:.1f}x)")
+
+
+if __name__ == "__main__":
+    main_bench()
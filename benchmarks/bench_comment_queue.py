@@ -0,0 +1,132 @@
+"""댓글 폭주(burst) 부하 테스트: 동기 커밋 vs write-behind 큐.
+
+before: POST /posts/{id}/comments/ 가 요청마다 커밋을 기다린 뒤 201
+after : COMMENT_WRITE_BEHIND 모드 - 큐에 넣고 바로 202, 백그라운드에서 배치 저장
+
+확인하는 것
+1. 응답 지연/처리량 (접수 기준) 과, 서버 종료(드레인)까지 포함한 실제 저장 처리량
+2. 드레인 정확성: 202 로 접수된 댓글 수 == 종료 후 DB 에 저장된 댓글 수
+3. 복구: 추가 전용 로그에 남은 (done 이 아닌) 댓글만 다음 시작 때 저장되는지
+   (커밋은 되었지만 done 을 기록하기 전에 죽은 댓글은 다시 저장하지 않는지 포함)
+
+실패하면 종료 코드 1 을 반환합니다.
+
+실행: python benchmarks/bench_comment_queue.py [동시_클라이언트_수] [클라이언트당_요청_수] [DB_지연_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from _common import emulate_db_latency, report, run_clients, serve, use_sqlite
+
+use_sqlite()
+
+from sqlalchemy import func, select  # noqa: E402
+
+import main  # noqa: E402
+import models  # noqa: E402
+from auth_token import create_access_token  # noqa: E402
+from comment_queue import CommentWriteQueue  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+
+
+def count_comments(post_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(models.Comment).where(models.Comment.post_id == post_id))
+
+
+def create_post(owner_id: int, title: str) -> int:
+    with SessionLocal() as db:
+        post = models.Post(title=title, content="x", owner_id=owner_id)
+        db.add(post)
+        db.commit()
+        return post.id
+
+
+async def burst(base_url: str, label: str, token: str, post_id: int, clients: int, per_client: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    statuses: dict[int, int] = {}
+
+    async def send(client):
+        response = await client.post(f"/posts/{post_id}/comments/", json={"content": "burst"}, headers=headers)
+        assert response.status_code in (201, 202, 503), response.text
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    latencies, elapsed = await run_clients(base_url, send, clients, per_client)
+    report(label, latencies, elapsed)
+    return statuses
+
+
+def check_recovery(owner_id: int) -> bool:
+    # 이전 프로세스가 3건을 접수하고 그중 1건만 저장한 채 죽었다고 가정한 로그
+    # b 는 커밋까지 되었지만 done 을 기록하기 전에 죽은 댓글입니다 (다시 저장되면 안 됨).
+    post_id = create_post(owner_id, "recovery")
+    with SessionLocal() as db:
+        db.add(models.Comment(content="x", post_id=post_id, owner_id=owner_id, provisional_id="b"))
+        db.commit()
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "comments.log")
+        with open(log_path, "w", encoding="utf-8") as log:
+            for provisional_id in ("a", "b", "c"):
+                record = {"op": "add", "id": provisional_id, "post_id": post_id, "owner_id": owner_id, "content": "x"}
+                log.write(json.dumps(record) + "\n")
+            log.write(json.dumps({"op": "done", "ids": ["a"]}) + "\n")
+            log.write('{"op": "add", "id": "trunc')  # 기록 도중 잘린 줄
+
+        async def restart():
+            queue = CommentWriteQueue(log_path=log_path)
+            await queue.start()
+            await queue.stop()
+
+        asyncio.run(restart())
+        leftover = open(log_path, encoding="utf-8").read()
+    saved = count_comments(post_id)
+    print(f"recovery: {saved} comments after replay (expected 2: b once + c), log empty after drain: {leftover == ''}")
+    return saved == 2 and leftover == ""
+
+
+def main_bench():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+
+    with SessionLocal() as db:
+        user = models.User(username="commenter", hashed_password="x")
+        db.add(user)
+        db.commit()
+        owner_id = user.id
+    token = create_access_token({"sub": "commenter"})
+    emulate_db_latency(engine, async_engine, latency_ms)
+
+    print(f"clients={clients} requests/client={per_client} db_latency={latency_ms}ms")
+    post_id = create_post(owner_id, "sync")
+    with serve(main.app) as base_url:
+        asyncio.run(burst(base_url, "before (commit per request)", token, post_id, clients, per_client))
+
+    # fork 된 서버 프로세스가 이 값을 보고 lifespan 에서 큐를 시작합니다.
+    main.COMMENT_WRITE_BEHIND = True
+    post_id = create_post(owner_id, "write-behind")
+    started = time.perf_counter()
+    with serve(main.app) as base_url:
+        statuses = asyncio.run(burst(base_url, "after  (write-behind, accepted)", token, post_id, clients, per_client))
+    # serve() 는 SIGTERM 후 서버가 드레인을 마치고 종료할 때까지 기다립니다.
+    drained_in = time.perf_counter() - started
+
+    accepted = statuses.get(202, 0)
+    saved = count_comments(post_id)
+    print(
+        f"write-behind: accepted={accepted} rejected(503)={statuses.get(503, 0)} saved={saved} "
+        f"end-to-end={saved / drained_in:.1f} comments/s (including drain)"
+    )
+    ok = saved == accepted
+    if not ok:
+        print("FAIL: accepted comments were lost or duplicated during drain")
+    ok = check_recovery(owner_id) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_bench()
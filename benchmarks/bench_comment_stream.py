@@ -0,0 +1,230 @@
+"""댓글 실시간 스트림 부하 테스트: 워커 1개에 SSE 구독자 수천 명.
+
+1. 구독자 N 명이 GET /posts/{post_id}/comments/stream 에 연결합니다 (asyncio 원시 소켓, 연결당 메모리 최소화).
+2. 새 댓글 M 개를 간격을 두고 작성하고, 각 구독자가 댓글을 받기까지 걸린 시간(작성 요청 시작 → 수신)을 잽니다.
+   서버 프로세스의 메모리(RSS) 증가량과 전달 구간의 CPU 사용률도 /proc 에서 읽습니다 (Linux 전용).
+3. Last-Event-ID 로 다시 연결하면 놓친 댓글을 받는지 확인합니다.
+4. 느린 소비자: 읽지 않는 구독자 1명과 정상 구독자 몇 명을 두고 긴 댓글을 쏟아부어,
+   느린 구독만 끊기고(comment_stream_evicted_total) 정상 구독자는 모두 받는지 확인합니다.
+모든 구독자가 모든 댓글을 받지 못했거나 3, 4 의 확인이 실패하면 1로 종료합니다.
+
+클라이언트와 서버가 같은 머신(코어 1개)을 나눠 쓰므로 지연 시간에는 클라이언트의 수신 처리도 포함됩니다.
+실행: python benchmarks/bench_comment_stream.py [구독자_수] [댓글_수]
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+import socket
+import sys
+import time
+
+from _common import percentile, serve, use_sqlite
+
+use_sqlite()
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("COMMENT_STREAM_MAX_SUBSCRIBERS", "20000")
+os.environ.setdefault("COMMENT_STREAM_BUFFER_SIZE", "64")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+
+CONNECT_BATCH = 200
+COMMENT_INTERVAL = 0.25
+
+
+def server_pid() -> int:
+    return multiprocessing.active_children()[0].pid
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Subscriber:
+    # 원시 소켓 SSE 클라이언트. 받은 "comment" 이벤트마다 수신 시각을 기록합니다.
+    def __init__(self, port: int, post_id: int, token: str, last_event_id: int | None = None, rcvbuf: int = 0):
+        self.port = port
+        self.request = (
+            f"GET /posts/{post_id}/comments/stream HTTP/1.1\r\nHost: bench\r\n"
+            f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n"
+            + (f"Last-Event-ID: {last_event_id}\r\n" if last_event_id is not None else "")
+            + "\r\n"
+        ).encode()
+        self.rcvbuf = rcvbuf
+        self.arrivals: list[float] = []
+        self.ids: list[int] = []
+        self.closed_reason = None
+        self.status = None
+        self.reader = self.writer = None
+        self.task = None
+        self._tail = b""
+
+    async def connect(self):
+        if self.rcvbuf:
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+            sock.setblocking(False)
+            await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", self.port))
+            self.reader, self.writer = await asyncio.open_connection(sock=sock, limit=1 << 20)
+        else:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port, limit=1 << 20)
+        self.writer.write(self.request)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        self.status = int(head.split(b" ", 2)[1])
+
+    def start(self, record_ids: bool = False):
+        self.task = asyncio.create_task(self._read(record_ids))
+
+    async def _read(self, record_ids: bool):
+        while True:
+            chunk = await self.reader.read(65536)
+            if not chunk:
+                return
+            now = time.perf_counter()
+            # 이벤트가 청크 경계에서 잘릴 수 있으므로 완성된 줄까지만 보고 나머지는 다음 청크와 이어 붙입니다.
+            data, _, self._tail = (self._tail + chunk).rpartition(b"\n")
+            self.arrivals.extend([now] * data.count(b"event: comment"))
+            if record_ids:
+                self.ids.extend(int(match) for match in re.findall(rb"^id: (\d+)$", data, re.M))
+            if b"event: close" in data:
+                self.closed_reason = data.split(b"event: close", 1)[1]
+                return
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def wait_until(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def run(base_url: str, subscribers: int, comments: int) -> bool:
+    port = int(base_url.rsplit(":", 1)[1])
+    pid = server_pid()
+    ok = True
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        await http.post("/users/", json={"username": "streamer", "password": "password123"})
+        token = (await http.post("/token", data={"username": "streamer", "password": "password123"})).json()[
+            "access_token"
+        ]
+        headers = {"Authorization": f"Bearer {token}"}
+        post_id = (await http.post("/posts/", json={"title": "live", "content": "thread"}, headers=headers)).json()["id"]
+
+        # 1. 구독자 연결
+        rss_before = rss_mb(pid)
+        started = time.perf_counter()
+        clients = [Subscriber(port, post_id, token) for _ in range(subscribers)]
+        for start in range(0, subscribers, CONNECT_BATCH):
+            await asyncio.gather(*(client.connect() for client in clients[start:start + CONNECT_BATCH]))
+        connected = sum(client.status == 200 for client in clients)
+        for client in clients:
+            client.start()
+        rss_after = rss_mb(pid)
+        print(f"subscribers connected: {connected}/{subscribers} in {time.perf_counter() - started:.1f}s, "
+              f"server RSS {rss_before:.0f} → {rss_after:.0f} MB "
+              f"({(rss_after - rss_before) * 1024 / max(1, connected):.1f} KB/subscriber)")
+
+        # 2. 댓글 작성 → 전달 지연
+        sent_at, comment_ids = [], []
+        cpu_started, wall_started = cpu_seconds(pid), time.perf_counter()
+        for index in range(comments):
+            sent_at.append(time.perf_counter())
+            response = await http.post(f"/posts/{post_id}/comments/", json={"content": f"live {index}"}, headers=headers)
+            comment_ids.append(response.json()["id"])
+            await asyncio.sleep(COMMENT_INTERVAL)
+        await wait_until(lambda: all(len(client.arrivals) >= comments for client in clients), 30)
+        cpu_used = cpu_seconds(pid) - cpu_started
+        wall = time.perf_counter() - wall_started
+        latencies = [
+            arrival - sent_at[index]
+            for client in clients for index, arrival in enumerate(client.arrivals[:comments])
+        ]
+        complete = sum(len(client.arrivals) >= comments for client in clients)
+        print(f"delivered {len(latencies)}/{connected * comments} events "
+              f"({complete}/{connected} subscribers got all {comments} comments)")
+        print(f"delivery latency p50={percentile(latencies, 50) * 1000:.1f}ms "
+              f"p99={percentile(latencies, 99) * 1000:.1f}ms max={max(latencies, default=0) * 1000:.1f}ms, "
+              f"server CPU {cpu_used / wall * 100:.0f}% during fan-out")
+        print(f"(polling every 2s instead would be {connected / 2:.0f} GET /posts/{post_id}/comments/ per second)")
+        if connected != subscribers or complete != connected:
+            ok = False
+        await asyncio.gather(*(client.close() for client in clients))
+        await wait_until(lambda: False, 0.5)
+
+        # 3. Last-Event-ID 로 다시 연결 → 첫 댓글 이후의 댓글을 DB 에서 받음
+        resumed = Subscriber(port, post_id, token, last_event_id=comment_ids[0])
+        await resumed.connect()
+        resumed.start(record_ids=True)
+        await wait_until(lambda: len(resumed.ids) >= comments - 1, 5)
+        await resumed.close()
+        print(f"resume with Last-Event-ID={comment_ids[0]}: got ids {resumed.ids[:3]}... ({len(resumed.ids)} events)")
+        if resumed.ids != comment_ids[1:]:
+            ok = False
+
+        # 4. 느린 소비자: 읽지 않는 구독자는 끊기고 정상 구독자는 모두 받음
+        evicted_before = await evicted_total(http)
+        slow = Subscriber(port, post_id, token, rcvbuf=4096)
+        await slow.connect()  # 응답 헤더까지만 읽고 이후로는 읽지 않음
+        healthy = [Subscriber(port, post_id, token) for _ in range(10)]
+        await asyncio.gather(*(client.connect() for client in healthy))
+        for client in healthy:
+            client.start()
+        flood = 0
+        # 서버와 커널의 송신 버퍼를 넘길 만큼 (수 MB) 보냅니다.
+        # sqlite 브로커는 폴링 주기 동안 발행된 이벤트를 한 번에 전달하므로, 묶음마다 폴링 주기만큼 쉬어
+        # 여러 번에 나눠 전달되게 합니다 (한 번에 합쳐지면 느린 구독자의 버퍼는 다음 전달 때에야 넘침).
+        pause = float(os.environ.get("COMMENT_STREAM_POLL_INTERVAL_MS", 100)) / 1000 * 1.5
+        for _ in range(12):
+            batch = [{"content": "x" * 480} for _ in range(1000)]
+            await http.post(f"/posts/{post_id}/comments/bulk", json=batch, headers=headers)
+            flood += len(batch)
+            await asyncio.sleep(pause)
+        await wait_until(lambda: all(len(client.arrivals) >= flood for client in healthy), 30)
+        evicted = await evicted_total(http) - evicted_before
+        received = [len(client.arrivals) for client in healthy]
+        print(f"slow consumer: evicted={evicted:.0f}, healthy subscribers received {min(received)}..{max(received)}"
+              f"/{flood} events")
+        if evicted < 1 or min(received) < flood:
+            ok = False
+        await asyncio.gather(*(client.close() for client in healthy + [slow]))
+        await wait_until(lambda: False, 0.5)
+    return ok
+
+
+async def evicted_total(http) -> float:
+    text = (await http.get("/metrics")).text
+    match = re.search(r"^comment_stream_evicted_total (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def main_bench():
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    comments = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with serve(main.app) as base_url:
+        ok = asyncio.run(run(base_url, subscribers, comments))
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,94 @@
+"""피드 렌더링: 게시글마다 댓글을 따로 조회해 세기 (before) vs 게시글 행의 댓글 수/활동 시각 (after).
+
+게시글 P 개에 댓글을 0~120 개씩 (평균 약 60) 넣고 post_counters.backfill 로 카운터를 채운 뒤,
+서버(uvicorn, 응답 캐시 끔)에 클라이언트 C 개가 피드 한 화면(게시글 20개 + 각 글의 댓글 수와 최근 활동)을 반복해서 그립니다.
+- before: GET /posts/?limit=20 다음, 게시글마다 GET /posts/{id}/comments/?limit=100&fields=id 를
+          다음 페이지가 없을 때까지 호출해서 클라이언트가 셉니다 (N+1 HTTP 호출).
+- after : GET /posts/?sort=activity&limit=20 한 번 (comment_count, last_comment_at 포함, 인덱스로 정렬)
+피드 한 화면을 그리는 데 걸린 시간과 HTTP 호출 수를 비교합니다.
+
+실행: python benchmarks/bench_feed.py [게시글_수] [클라이언트_수] [클라이언트당_피드_수]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from _common import BENCH_DB_PATH, report, run_clients, serve, use_sqlite
+
+use_sqlite()
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+
+import main  # noqa: E402
+import post_counters  # noqa: E402
+
+FEED_SIZE = 20
+
+
+def seed(posts: int):
+    rng = random.Random(7)
+    connection = sqlite3.connect(BENCH_DB_PATH)
+    connection.execute("INSERT INTO users (id, username, hashed_password, is_active) VALUES (1, 'feed', 'x', 1)")
+    connection.executemany(
+        "INSERT INTO posts (id, title, content, owner_id) VALUES (?, ?, ?, 1)",
+        [(i, f"post {i}", "body " * 40) for i in range(1, posts + 1)],
+    )
+    comments = [(f"comment on {post_id}", post_id) for post_id in range(1, posts + 1) for _ in range(rng.randint(0, 120))]
+    connection.executemany("INSERT INTO comments (content, post_id, owner_id) VALUES (?, ?, 1)", comments)
+    # 최근 활동 시각은 기존 댓글에 없으므로 무작위로 흩어 둡니다 (댓글이 있는 게시글만).
+    now = datetime(2026, 10, 18)
+    connection.executemany(
+        "UPDATE posts SET last_comment_at = ? WHERE id = ? AND EXISTS (SELECT 1 FROM comments WHERE post_id = posts.id)",
+        [((now - timedelta(seconds=rng.randint(0, 86400 * 30))).isoformat(sep=" "), i) for i in range(1, posts + 1)],
+    )
+    connection.commit()
+    connection.close()
+    post_counters.backfill()
+    print(f"posts={posts} comments={len(comments)}")
+
+
+async def measure(base_url: str, clients: int, feeds: int):
+    calls = {"before": 0, "after": 0}
+
+    async def before(http):
+        posts = (await http.get("/posts/", params={"limit": FEED_SIZE})).json()
+        calls["before"] += 1
+        for post in posts:
+            count, cursor = 0, None
+            while True:
+                params = {"limit": 100, "fields": "id"}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await http.get(f"/posts/{post['id']}/comments/", params=params)
+                calls["before"] += 1
+                count += len(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            post["comment_count"] = count
+
+    async def after(http):
+        response = await http.get("/posts/", params={"sort": "activity", "limit": FEED_SIZE})
+        calls["after"] += 1
+        assert len(response.json()) == FEED_SIZE
+
+    for label, render in (("before (N+1 comment lists)", before), ("after (counters, sort=activity)", after)):
+        latencies, elapsed = await run_clients(base_url, render, clients, feeds)
+        key = "before" if render is before else "after"
+        report(label, latencies, elapsed)
+        print(f"{'':<32} HTTP calls per feed: {calls[key] / (clients * (feeds + 1)):.1f}")
+
+
+def main_bench():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    feeds = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+    seed(posts)
+    with serve(main.app) as base_url:
+        asyncio.run(measure(base_url, clients, feeds))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,60 @@
+"""JWT 검증 처리량 (코어 1개 기준, verify/s).
+
+알고리즘별로 (HS256, RS256, ES256, EdDSA) 토큰을 하나 만들어 두고 단일 스레드에서 반복 검증합니다.
+- keyring : jwt_keys.KeyRing.decode (kid 로 미리 파싱한 키 선택)
+- per-call: jose.jwt.decode 에 PEM 문자열을 그대로 전달 (요청마다 키 파싱, 변경 전 방식과 같은 형태)
+
+실행: python benchmarks/bench_jwt_verify.py [알고리즘당_측정_시간_초]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from _common import ROOT  # noqa: F401  (저장소 루트를 sys.path 에 추가)
+
+from jose import jwt  # noqa: E402
+
+import jwt_keys  # noqa: E402
+
+
+def rate(fn, seconds: float) -> float:
+    fn()  # 워밍업
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            fn()
+        count += 50
+    return count / (time.perf_counter() - started)
+
+
+def main_bench():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    claims = {"sub": "bench_user", "exp": int(time.time()) + 3600}
+    print(f"{'algorithm':<10} {'keyring verify/s':>18} {'per-call parse verify/s':>25} {'sign/s':>10}")
+
+    keyring = jwt_keys.load_keyring("")
+    token = keyring.sign(claims)
+    verify = rate(lambda: keyring.decode(token), seconds)
+    sign = rate(lambda: keyring.sign(claims), seconds)
+    per_call = rate(lambda: jwt.decode(token, jwt_keys.JWT_SECRET_KEY, algorithms=["HS256"]), seconds)
+    print(f"{'HS256':<10} {verify:18.0f} {per_call:25.0f} {sign:10.0f}")
+
+    with tempfile.TemporaryDirectory() as keys_dir:
+        for algorithm in ("RS256", "ES256", "EdDSA"):
+            kid = algorithm.lower()
+            path = jwt_keys.generate_key(algorithm, kid, keys_dir)
+            keyring = jwt_keys.load_keyring(keys_dir, kid)
+            token = keyring.sign(claims)
+            public_pem = open(path, "rb").read() if algorithm == "EdDSA" else keyring.signing.verifier.to_pem()
+            verify = rate(lambda: keyring.decode(token), seconds)
+            sign = rate(lambda: keyring.sign(claims), seconds)
+            per_call = rate(lambda: jwt.decode(token, public_pem, algorithms=[algorithm]), seconds)
+            print(f"{algorithm:<10} {verify:18.0f} {per_call:25.0f} {sign:10.0f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main_bench()
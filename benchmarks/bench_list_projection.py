@@ -0,0 +1,132 @@
+"""목록 조회: 엔티티 전체 로딩 vs 컬럼 선택(projection) — 요청당 메모리와 rows/s.
+
+큰 본문(게시글 4000자, 댓글 2000자)이 들어 있는 데이터를 만들어 두고, 요청 하나처럼 세션을 새로 열어
+100개짜리 페이지를 조회 + JSON 바이트 직렬화하는 과정을 키셋 커서로 테이블 끝까지 반복합니다.
+- before     : select(models.Post) 엔티티 로딩 (identity map) + from_attributes 검증 + dump_json (변경 전 경로)
+- columns    : crud.get_posts (필요한 컬럼만 SELECT, Row 튜플) + fast_json
+- fields     : fields={"title"} (id, title 만 SELECT)
+- excerpt    : excerpt=200 (content 를 DB에서 200자로 잘라 읽음)
+요청당 메모리는 페이지를 조회해 행을 만드는 동안의 tracemalloc 최대 할당량(peak)입니다.
+직렬화 단계는 제외합니다: 응답 바이트는 양쪽이 같고, Pydantic 의 dump_json 은 Rust 쪽 버퍼를 쓰므로
+tracemalloc 에 잡히지 않아 공정하게 비교할 수 없기 때문입니다. rows/s 는 직렬화까지 포함합니다.
+
+실행: python benchmarks/bench_list_projection.py [게시글_수] [페이지_크기]
+"""
+import sys
+import time
+import tracemalloc
+
+from _common import use_sqlite
+
+use_sqlite()
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+import crud  # noqa: E402
+import fast_json  # noqa: E402
+import models  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from schemas import Comment, CommentCreate, Post, PostCreate, UserCreate  # noqa: E402
+
+post_adapter = TypeAdapter(list[Post])
+comment_adapter = TypeAdapter(list[Comment])
+
+
+def legacy_posts(db, limit, after_id):
+    query = select(models.Post)
+    if after_id is not None:
+        query = query.where(models.Post.id > after_id)
+    return db.scalars(query.order_by(models.Post.id).limit(limit)).all()
+
+
+def legacy_comments(db, post_id, limit, after_id):
+    query = select(models.Comment).where(models.Comment.post_id == post_id)
+    if after_id is not None:
+        query = query.where(models.Comment.id > after_id)
+    return db.scalars(query.order_by(models.Comment.id).limit(limit)).all()
+
+
+def validated(adapter):
+    return lambda rows: adapter.dump_json(adapter.validate_python(rows))
+
+
+def walk(label: str, fetch_page, serialize):
+    # fetch_page(db, after_id) -> rows, serialize(rows) -> bytes. 요청마다 세션을 새로 엽니다.
+    peaks, rows_total, bytes_total, pages = [], 0, 0, 0
+    after_id = None
+    while True:
+        with SessionLocal() as db:
+            tracemalloc.start()
+            rows = fetch_page(db, after_id)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            body = serialize(rows)
+        if not rows:
+            break
+        rows_total += len(rows)
+        bytes_total += len(body)
+        pages += 1
+        after_id = rows[-1].id
+
+    # rows/s 는 tracemalloc 없이 한 번 더 잽니다.
+    after_id, started = None, time.perf_counter()
+    while True:
+        with SessionLocal() as db:
+            rows = fetch_page(db, after_id)
+            serialize(rows)
+        if not rows:
+            break
+        after_id = rows[-1].id
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<22} rows={rows_total:<7} peak/request={max(peaks) / 1024:8.1f}KiB "
+        f"mean={sum(peaks) / len(peaks) / 1024:8.1f}KiB  rows/s={rows_total / elapsed:8.0f}  "
+        f"response={bytes_total / max(1, pages) / 1024:7.1f}KiB/page"
+    )
+
+
+def main_bench():
+    post_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = crud.create_user(db, UserCreate(username="projection", password="projection-password"))
+        for start in range(0, post_count, crud.BULK_MAX_BATCH_SIZE):
+            batch = range(start, min(post_count, start + crud.BULK_MAX_BATCH_SIZE))
+            crud.create_user_posts_bulk(
+                db, [PostCreate(title=f"post {i}", content="가" * 4000) for i in batch], user_id=user.id
+            )
+        for start in range(0, post_count // 2, crud.BULK_MAX_BATCH_SIZE):
+            batch = range(start, min(post_count // 2, start + crud.BULK_MAX_BATCH_SIZE))
+            crud.create_comments_for_post_bulk(
+                db, [CommentCreate(content="나" * 500) for _ in batch], post_id=1, user_id=user.id
+            )
+
+    print(f"posts={post_count} comments on post 1={post_count // 2} page_size={page_size}")
+    walk("posts before", lambda db, after: legacy_posts(db, page_size, after), validated(post_adapter))
+    for label, options in (
+        ("posts columns", {}),
+        ("posts fields=title", {"fields": {"title"}}),
+        ("posts excerpt=200", {"excerpt": 200}),
+    ):
+        walk(
+            label,
+            lambda db, after, options=options: crud.get_posts(db, limit=page_size, after_id=after, **options),
+            lambda rows: fast_json.dump_list(Post, rows),
+        )
+
+    walk("comments before", lambda db, after: legacy_comments(db, 1, page_size, after), validated(comment_adapter))
+    for label, options in (("comments columns", {}), ("comments excerpt=100", {"excerpt": 100})):
+        walk(
+            label,
+            lambda db, after, options=options: crud.get_comments_by_post(
+                db, post_id=1, limit=page_size, after_id=after, **options
+            ),
+            lambda rows: fast_json.dump_list(Comment, rows),
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
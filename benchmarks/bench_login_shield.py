@@ -0,0 +1,173 @@
+"""로그인 공격(credential stuffing) 재현: 서버 CPU 사용량과 정상 사용자 로그인 성공률.
+
+공격자 클라이언트들이 소수의 IP(X-Forwarded-For)에서 틀린 비밀번호로 계속 로그인합니다.
+(절반은 특정 사용자 "victim", 절반은 유출 목록의 다른 사용자 이름 — 대부분 없는 이름)
+그동안 정상 사용자들은 각자의 IP 에서 1초마다 올바른 비밀번호로 로그인합니다 (503/429 는 Retry-After 후 재시도).
+
+before: 로그인 시도 제한 끔 (모든 시도가 비밀번호 검증까지 감)
+after : login_limiter 켬 (IP/사용자 이름별 토큰 버킷 + 잠금 백오프 + 없는 사용자 캐시)
+
+서버 프로세스와 해싱 워커 프로세스의 CPU 시간을 /proc 에서 1초마다 읽어, 공격 초반(버킷이 비는 구간)을
+제외한 후반부 평균 CPU 사용률을 비교합니다 (Linux 전용). 제한기가 줄이는 것은 해싱 CPU 이고,
+429 응답 자체를 만드는 HTTP 처리 비용은 공격 요청 수에 비례해 남습니다 (앞단 프록시/방화벽의 몫).
+after 의 후반부에 정상 로그인이 하나라도 실패하거나 후반부 해싱 CPU 사용률이 before 보다 낮지 않으면 1로 종료합니다.
+
+실행 시간을 줄이려고 sha256_crypt 비용을 낮춰 둡니다 (PASSWORD_HASH_SETTINGS 로 변경 가능).
+실행: python benchmarks/bench_login_shield.py [공격_클라이언트_수] [공격_IP_수] [측정_시간_초]
+"""
+import asyncio
+import collections
+import os
+import random
+import statistics
+import sys
+import time
+
+from _common import percentile, serve, use_sqlite
+
+use_sqlite()
+os.environ.setdefault("PASSWORD_HASH_SETTINGS", "sha256_crypt__default_rounds=50000")
+
+import httpx  # noqa: E402
+
+import crud  # noqa: E402
+import main  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from login_limiter import login_limiter  # noqa: E402
+from schemas import UserCreate  # noqa: E402
+
+LEGIT_USERS = 4
+LEAKED_USERNAMES = [f"leaked_{i}" for i in range(200)]
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def descendants_cpu_seconds(root_pid: int) -> tuple[float, float]:
+    # root_pid 의 자식(uvicorn 서버)과 손자 이하(해싱 워커 등)가 쓴 CPU 시간. 부하 생성기 자신은 제외합니다.
+    parents, cpu = {}, {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        parents[int(name)] = int(fields[1])
+        cpu[int(name)] = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+    def depth(pid):
+        # root_pid 의 자식이면 1, 손자면 2, ... 자손이 아니면 0
+        level = 0
+        while pid in parents and pid != root_pid:
+            pid = parents[pid]
+            level += 1
+        return level if pid == root_pid else 0
+
+    server = workers = 0.0
+    for pid, seconds in cpu.items():
+        level = depth(pid)
+        if level == 1:
+            server += seconds
+        elif level > 1:
+            workers += seconds
+    return server, workers
+
+
+async def attack(base_url: str, label: str, attackers: int, attacker_ips: int, seconds: float) -> bool:
+    attack_statuses = collections.Counter()
+    # 정상 로그인 결과는 전반부/후반부로 나눠 셉니다. 전반부에는 공격 IP 버킷에 남아 있던 토큰만큼
+    # 공격 요청이 통과하므로 해싱 대기열이 잠시 가득 찰 수 있습니다 (503 + Retry-After).
+    legit_statuses = {"first half": collections.Counter(), "second half": collections.Counter()}
+    attack_started = time.perf_counter()
+    legit_latencies: list[float] = []
+    cpu_samples: list[float] = []
+    stop = asyncio.Event()
+
+    async def attacker(index: int):
+        rng = random.Random(index)
+        async with httpx.AsyncClient(base_url=base_url, timeout=300) as http:
+            while not stop.is_set():
+                username = "victim" if rng.random() < 0.5 else rng.choice(LEAKED_USERNAMES)
+                response = await http.post(
+                    "/token",
+                    data={"username": username, "password": f"guess-{rng.random()}"},
+                    headers={"X-Forwarded-For": f"203.0.113.{rng.randrange(attacker_ips) + 1}"},
+                )
+                attack_statuses[response.status_code] += 1
+
+    async def legit_user(index: int):
+        form = {"username": f"legit_{index}", "password": f"legit-password-{index}"}
+        async with httpx.AsyncClient(base_url=base_url, timeout=300) as http:
+            while not stop.is_set():
+                # 실제 클라이언트처럼 503/429 는 Retry-After 만큼 기다렸다가 다시 시도합니다 (최대 3번).
+                started = time.perf_counter()
+                for _ in range(3):
+                    response = await http.post(
+                        "/token", data=form, headers={"X-Forwarded-For": f"198.51.100.{index + 1}"}
+                    )
+                    if response.status_code not in (429, 503):
+                        break
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                half = "first half" if time.perf_counter() - attack_started < seconds / 2 else "second half"
+                legit_statuses[half][response.status_code] += 1
+                legit_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(max(0.0, 1 - (time.perf_counter() - started)))
+
+    async def sample_cpu():
+        previous, previous_at = descendants_cpu_seconds(os.getpid()), time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(1)
+            current, current_at = descendants_cpu_seconds(os.getpid()), time.perf_counter()
+            elapsed = current_at - previous_at
+            cpu_samples.append(tuple((now - then) / elapsed for now, then in zip(current, previous)))
+            previous, previous_at = current, current_at
+
+    tasks = [asyncio.create_task(attacker(i)) for i in range(attackers)]
+    tasks += [asyncio.create_task(legit_user(i)) for i in range(LEGIT_USERS)]
+    tasks.append(asyncio.create_task(sample_cpu()))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    half = len(cpu_samples) // 2
+    steady_server = statistics.fmean(sample[0] for sample in cpu_samples[half:])
+    steady_hashing = statistics.fmean(sample[1] for sample in cpu_samples[half:])
+    steady_legit = legit_statuses["second half"]
+    print(f"{label:<8} attack responses: {dict(attack_statuses)}")
+    print(
+        f"{'':<8} legit logins: first half {dict(legit_statuses['first half'])}, "
+        f"second half {dict(steady_legit)} "
+        f"p50={percentile(legit_latencies, 50) * 1000:.0f}ms p99={percentile(legit_latencies, 99) * 1000:.0f}ms"
+    )
+    print(f"{'':<8} second-half CPU: hashing workers {steady_hashing:.0%}, server (HTTP + DB) {steady_server:.0%}")
+    print(f"{'':<8} hashing CPU per second: {' '.join(f'{sample[1]:.0%}' for sample in cpu_samples)}")
+    return sum(steady_legit.values()) > 0 and steady_legit[200] == sum(steady_legit.values()), steady_hashing
+
+
+def main_bench():
+    attackers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    attacker_ips = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+
+    with SessionLocal() as db:
+        crud.create_user(db, UserCreate(username="victim", password="victim-password"))
+        for i in range(LEGIT_USERS):
+            crud.create_user(db, UserCreate(username=f"legit_{i}", password=f"legit-password-{i}"))
+
+    print(f"attackers={attackers} attacker_ips={attacker_ips} seconds={seconds} legit_users={LEGIT_USERS}")
+    # serve() 는 fork 하므로 여기서 바꾼 설정이 서버 프로세스에 그대로 적용됩니다.
+    login_limiter.enabled = False
+    with serve(main.app) as base_url:
+        _, before_cpu = asyncio.run(attack(base_url, "before", attackers, attacker_ips, seconds))
+    login_limiter.enabled = True
+    login_limiter.store.clear()
+    with serve(main.app) as base_url:
+        legit_ok, after_cpu = asyncio.run(attack(base_url, "after", attackers, attacker_ips, seconds))
+
+    if not legit_ok or after_cpu >= before_cpu:
+        print("FAIL: legitimate logins failed in steady state or hashing CPU was not bounded by the limiter")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,96 @@
+"""로그인 폭주(login storm) 중 GET /posts/ 읽기 지연 시간 비교.
+
+before: 변경 전처럼 /token 이 요청 스레드(AnyIO 스레드풀)에서 sha256_crypt 검증을 직접 수행
+after : main.app (해싱 전용 프로세스 풀 + 대기열 제한, 초과 시 503 + Retry-After)
+
+실행: python benchmarks/bench_login_storm.py [로그인_클라이언트_수] [읽기_클라이언트_수] [읽기_요청_수]
+"""
+import asyncio
+import collections
+import os
+import sys
+
+from _common import report, run_clients, serve, use_sqlite
+
+use_sqlite()
+# 같은 사용자/IP 로 계속 로그인하므로 로그인 시도 제한은 끄고 해싱 비용만 잽니다.
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "0")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from fastapi.security import OAuth2PasswordRequestForm  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import crud  # noqa: E402
+import main  # noqa: E402
+from database import SessionLocal, get_db  # noqa: E402
+from schemas import Post, PostCreate, UserCreate  # noqa: E402
+
+
+def build_legacy_app() -> FastAPI:
+    # 변경 전 main.py 와 같은 동기 엔드포인트 (스레드풀에서 인라인 해싱)
+    legacy = FastAPI()
+
+    @legacy.post("/token")
+    def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+        user = crud.authenticate_user(db, form_data.username, form_data.password)
+        if not user:
+            raise HTTPException(status_code=401)
+        return {"access_token": "x", "token_type": "bearer"}
+
+    @legacy.get("/posts/", response_model=list[Post])
+    def read_posts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+        return crud.get_posts(db, skip=skip, limit=limit)
+
+    return legacy
+
+
+async def storm(base_url: str, label: str, login_clients: int, readers: int, reads: int):
+    login_statuses = collections.Counter()
+    stop = asyncio.Event()
+
+    async def login_loop():
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            while not stop.is_set():
+                response = await client.post(
+                    "/token", data={"username": "storm_user", "password": "storm-password"}
+                )
+                login_statuses[response.status_code] += 1
+                if response.status_code == 503:
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+    async def read(client):
+        response = await client.get("/posts/")
+        assert response.status_code == 200, response.text
+
+    baseline, elapsed = await run_clients(base_url, read, readers, reads)
+    report(f"{label} reads (idle)", baseline, elapsed)
+
+    loginers = [asyncio.create_task(login_loop()) for _ in range(login_clients)]
+    await asyncio.sleep(1)  # 폭주가 자리 잡을 때까지 대기
+    latencies, elapsed = await run_clients(base_url, read, readers, reads)
+    stop.set()
+    await asyncio.gather(*loginers)
+    report(f"{label} reads (storm)", latencies, elapsed)
+    print(f"{'':<32} login responses: {dict(login_statuses)}")
+
+
+def main_bench():
+    login_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    reads = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+
+    with SessionLocal() as db:
+        user = crud.create_user(db, UserCreate(username="storm_user", password="storm-password"))
+        for i in range(50):
+            crud.create_user_post(db, PostCreate(title=f"post {i}", content="bench"), user_id=user.id)
+
+    print(f"login_clients={login_clients} readers={readers} reads/reader={reads}")
+    with serve(build_legacy_app()) as base_url:
+        asyncio.run(storm(base_url, "before", login_clients, readers, reads))
+    with serve(main.app) as base_url:
+        asyncio.run(storm(base_url, "after ", login_clients, readers, reads))
+
+
+if __name__ == "__main__":
+    main_bench()
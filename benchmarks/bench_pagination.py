@@ -0,0 +1,63 @@
+"""깊은 페이지 조회 지연 시간: OFFSET vs 키셋(커서).
+
+posts 테이블에 대량의 행을 넣은 뒤, 여러 깊이에서 같은 페이지를
+crud.get_posts(skip=...) 와 crud.get_posts(after_id=...) 로 각각 조회합니다.
+
+실행: python benchmarks/bench_pagination.py [게시글_수] [페이지_크기] [반복_횟수]
+"""
+import sys
+import time
+
+from _common import report, use_sqlite
+
+use_sqlite()
+
+from sqlalchemy import insert  # noqa: E402
+
+import crud  # noqa: E402
+import models  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+
+
+def seed(total: int, chunk: int = 50_000):
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"username": "pager", "hashed_password": "x"}])
+        for start in range(0, total, chunk):
+            rows = [
+                {"title": f"post {i}", "content": "lorem ipsum " * 8, "owner_id": 1}
+                for i in range(start, min(total, start + chunk))
+            ]
+            conn.execute(insert(models.Post), rows)
+
+
+def main_bench():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    started = time.perf_counter()
+    seed(total)
+    print(f"seeded {total} posts in {time.perf_counter() - started:.1f}s, page_size={page_size}")
+
+    with SessionLocal() as db:
+        for depth in (0.01, 0.25, 0.5, 0.99):
+            skip = int(total * depth)
+            offset_samples, keyset_samples = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                by_offset = crud.get_posts(db, skip=skip, limit=page_size)
+                offset_samples.append(time.perf_counter() - start)
+
+                # 같은 페이지를 커서로: 직전 페이지의 마지막 id 는 skip 번째 행의 id
+                start = time.perf_counter()
+                by_keyset = crud.get_posts(db, limit=page_size, after_id=skip)
+                keyset_samples.append(time.perf_counter() - start)
+                db.expunge_all()
+            assert [p.id for p in by_offset] == [p.id for p in by_keyset]
+            report(f"offset skip={skip}", offset_samples)
+            report(f"keyset after_id={skip}", keyset_samples)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,52 @@
+"""비밀번호 해싱 방식별 로그인 처리량 (코어 1개 기준, logins/s).
+
+로그인 1회의 CPU 비용은 거의 전부 비밀번호 검증이므로, 방식별로 해시를 하나 만들어 두고
+단일 스레드에서 반복 검증해 초당 검증 횟수(= 코어당 최대 로그인 수)를 잽니다.
+- default   : passlib 기본 비용
+- calibrated: auth_utils.calibrate 로 목표 검증 시간(기본 250ms)에 맞춘 비용
+백엔드가 설치되지 않은 방식(argon2-cffi, bcrypt 등)은 건너뜁니다.
+
+실행: python benchmarks/bench_password_schemes.py [목표_검증_시간_ms] [방식당_측정_시간_초]
+"""
+import sys
+import time
+
+from _common import ROOT  # noqa: F401  (저장소 루트를 sys.path 에 추가)
+
+from passlib.registry import get_crypt_handler  # noqa: E402
+
+import auth_utils  # noqa: E402
+
+SCHEMES = ["sha256_crypt", "sha512_crypt", "pbkdf2_sha256", "bcrypt", "argon2", "scrypt"]
+
+
+def logins_per_second(handler, seconds: float) -> float:
+    hashed = handler.hash("password123")
+    handler.verify("password123", hashed)  # 워밍업
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds or count < 3:
+        handler.verify("password123", hashed)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main_bench():
+    target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    print(f"{'scheme':<15} {'default rounds':>15} {'logins/s':>10} {'calibrated rounds':>18} {'logins/s':>10}")
+    for scheme in SCHEMES:
+        handler = get_crypt_handler(scheme)
+        if hasattr(handler, "has_backend") and not handler.has_backend():
+            print(f"{scheme:<15} (backend not installed, skipped)")
+            continue
+        default_rate = logins_per_second(handler, seconds)
+        rounds, _ = auth_utils.calibrate(scheme, target_ms / 1000)
+        calibrated_rate = logins_per_second(handler.using(rounds=rounds), seconds)
+        print(
+            f"{scheme:<15} {handler.default_rounds:>15} {default_rate:10.1f} {rounds:>18} {calibrated_rate:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,102 @@
+"""재방문 클라이언트의 토큰 갱신 비용: 비밀번호 재로그인 vs 리프레시 토큰.
+
+before: 액세스 토큰이 만료될 때마다 POST /token (sha256_crypt 검증)
+after : POST /token/refresh (서명 검증 + 조건부 UPDATE + 새 토큰 서명, 비밀번호 해싱 없음)
+
+서버의 /metrics 에서 password_hash_seconds 합계(해싱에 쓴 CPU 시간)를 읽어 갱신 1건당 비용을 비교하고,
+마지막으로 get_current_user 의 폐기 목록 확인(O(1)) 비용을 측정합니다.
+
+실행: python benchmarks/bench_refresh_tokens.py [동시_클라이언트_수] [클라이언트당_갱신_수]
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+from _common import report, serve, use_sqlite
+
+use_sqlite()
+# 같은 사용자/IP 로 계속 로그인하므로 로그인 시도 제한은 끄고 해싱 비용만 잽니다.
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "0")
+
+import httpx  # noqa: E402
+
+import crud  # noqa: E402
+import main  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from revocation import RevocationList  # noqa: E402
+from schemas import UserCreate  # noqa: E402
+
+HASH_METRIC = 'password_hash_seconds_sum{operation="verify_and_update"}'
+
+
+def hashing_seconds(text: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(HASH_METRIC + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+async def renew(base_url: str, label: str, clients: int, per_client: int, use_refresh: bool):
+    latencies: list[float] = []
+    form = {"username": "returning_user", "password": "returning-password"}
+
+    async def client(http: httpx.AsyncClient, tokens: dict):
+        for _ in range(per_client):
+            started = time.perf_counter()
+            if use_refresh:
+                response = await http.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+            else:
+                response = await http.post("/token", data=form)
+            assert response.status_code == 200, response.text
+            latencies.append(time.perf_counter() - started)
+            tokens = response.json()
+
+    https = [httpx.AsyncClient(base_url=base_url, timeout=300) for _ in range(clients)]
+    try:
+        # 첫 로그인은 양쪽 모두 같으므로 측정 전에 끝내 둡니다.
+        first_tokens = [(await http.post("/token", data=form)).json() for http in https]
+        before = hashing_seconds((await https[0].get("/metrics")).text)
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http, tokens) for http, tokens in zip(https, first_tokens)))
+        elapsed = time.perf_counter() - started
+        after = hashing_seconds((await https[0].get("/metrics")).text)
+    finally:
+        for http in https:
+            await http.aclose()
+
+    report(label, latencies, elapsed)
+    print(f"{'':<32} hashing CPU per renewal = {(after - before) / (clients * per_client) * 1000:.2f}ms")
+
+
+def measure_revocation_check():
+    revoked = RevocationList()
+    expires_at = time.time() + 3600
+    for _ in range(100_000):
+        revoked.add(uuid.uuid4().hex, expires_at)
+    probe = uuid.uuid4().hex
+    rounds = 1_000_000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        revoked.is_revoked(probe)
+    elapsed = time.perf_counter() - started
+    print(f"revocation check with {len(revoked)} revoked ids: {elapsed / rounds * 1e9:.0f}ns per request")
+
+
+def main_bench():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with SessionLocal() as db:
+        crud.create_user(db, UserCreate(username="returning_user", password="returning-password"))
+
+    print(f"clients={clients} renewals/client={per_client}")
+    with serve(main.app) as base_url:
+        asyncio.run(renew(base_url, "before (password login)", clients, per_client, use_refresh=False))
+        asyncio.run(renew(base_url, "after  (refresh token)", clients, per_client, use_refresh=True))
+    measure_revocation_check()
+
+
+if __name__ == "__main__":
+    main_bench()
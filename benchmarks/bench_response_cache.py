@@ -0,0 +1,74 @@
+"""공개 읽기 경로 처리량: 응답 캐시 사용 vs 미사용.
+
+GET /posts/?limit=50 과 GET /posts/{id}/comments/ 를 섞어 보내며,
+ETag 재검증(If-None-Match)을 하는 클라이언트 비율도 조절할 수 있습니다.
+
+실행: python benchmarks/bench_response_cache.py [클라이언트_수] [클라이언트당_요청_수] [재검증_비율] [DB_지연_ms]
+"""
+import asyncio
+import random
+import sys
+
+from _common import emulate_db_latency, report, run_clients, serve, use_sqlite
+
+use_sqlite()
+
+import main  # noqa: E402
+import models  # noqa: E402
+import response_cache  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+
+POSTS = 200
+
+
+async def measure(base_url: str, label: str, clients: int, per_client: int, revalidate: float):
+    rng = random.Random(7)
+    etags = {}
+
+    async def send(client):
+        if rng.random() < 0.5:
+            path = "/posts/?limit=50"
+        else:
+            path = f"/posts/{rng.randint(1, 20)}/comments/"
+        headers = {}
+        if path in etags and rng.random() < revalidate:
+            headers["If-None-Match"] = etags[path]
+        response = await client.get(path, headers=headers)
+        assert response.status_code in (200, 304), response.text
+        if "etag" in response.headers:
+            etags[path] = response.headers["etag"]
+
+    latencies, elapsed = await run_clients(base_url, send, clients, per_client)
+    report(label, latencies, elapsed)
+
+
+def main_bench():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    revalidate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    latency_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 2.0
+
+    with SessionLocal() as db:
+        user = models.User(username="reader", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(models.Post(title=f"post {i}", content="lorem ipsum " * 40, owner_id=user.id) for i in range(POSTS))
+        db.flush()
+        db.add_all(
+            models.Comment(content=f"comment {i}", post_id=1 + i % 20, owner_id=user.id) for i in range(20 * 50)
+        )
+        db.commit()
+    emulate_db_latency(engine, async_engine, latency_ms)
+
+    print(f"clients={clients} requests/client={per_client} revalidate={revalidate} db_latency={latency_ms}ms")
+    configured = response_cache.backend
+    response_cache.set_backend(None)
+    with serve(main.app) as base_url:
+        asyncio.run(measure(base_url, "uncached", clients, per_client, revalidate))
+    response_cache.set_backend(configured)
+    with serve(main.app) as base_url:
+        asyncio.run(measure(base_url, f"cached ({type(configured).__name__})", clients, per_client, revalidate))
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,136 @@
+"""전문 검색(GET /search) 쿼리 지연 시간 — 문서 100만 개 기준.
+
+게시글 절반(제목 5단어 + 본문 30단어), 댓글 절반(15단어)을 Zipf 분포 단어로 만들어 SQLite 에 넣고,
+FTS5 색인을 한 번에 만든 뒤(rebuild) crud.search_documents 로 검색합니다 (순위 쿼리 + 상세 쿼리).
+- rare/medium/common: 빈도가 다른 단어 하나 (일치 문서 수가 많을수록 순위 계산 비용이 큼)
+- two terms         : 중간 빈도 단어 두 개 (AND)
+- common pages 1-5 : 흔한 단어로 다섯 페이지를 커서로 이어서 조회 (합계)
+- LIKE baseline     : 색인 없이 posts.content LIKE '%단어%' (전체 스캔, 비교용)
+
+실행: python benchmarks/bench_search.py [문서_수] [반복_횟수]
+"""
+import random
+import sqlite3
+import sys
+import time
+
+from _common import BENCH_DB_PATH, percentile, use_sqlite
+
+use_sqlite()
+
+from sqlalchemy import text  # noqa: E402
+
+import crud  # noqa: E402
+import search  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+
+VOCABULARY_SIZE = 50_000
+PAGE_SIZE = 20
+
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words  # 앞쪽일수록 자주 쓰이는 단어 (Zipf 순위)
+
+
+def seed(documents: int):
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    cumulative, total = [], 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=words))
+
+    Base.metadata.create_all(bind=engine)
+    posts = documents // 2
+    started = time.perf_counter()
+    connection = sqlite3.connect(BENCH_DB_PATH)
+    connection.execute("INSERT INTO users (id, username, hashed_password, is_active) VALUES (1, 'search', 'x', 1)")
+    batch = 50_000
+    for start in range(0, posts, batch):
+        connection.executemany(
+            "INSERT INTO posts (id, title, content, owner_id) VALUES (?, ?, ?, 1)",
+            [(i + 1, sentence(5), sentence(30)) for i in range(start, min(posts, start + batch))],
+        )
+    for start in range(0, documents - posts, batch):
+        connection.executemany(
+            "INSERT INTO comments (id, content, post_id, owner_id) VALUES (?, ?, ?, 1)",
+            [(i + 1, sentence(15), rng.randint(1, posts)) for i in range(start, min(documents - posts, start + batch))],
+        )
+    connection.commit()
+    connection.close()
+    loaded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        search.backend_for("sqlite").rebuild(conn)
+    print(f"documents={documents} (posts {posts}, comments {documents - posts}) "
+          f"load {loaded:.1f}s, FTS5 rebuild {time.perf_counter() - started:.1f}s")
+    return vocabulary
+
+
+def measure(label: str, run, repeats: int):
+    run()  # 워밍업
+    samples, results = [], 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        results = run()
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<28} results/page={results:<4} p50={percentile(samples, 50) * 1000:8.2f}ms "
+          f"p99={percentile(samples, 99) * 1000:8.2f}ms")
+
+
+def count_matches(db, term: str) -> int:
+    return db.execute(
+        text("SELECT (SELECT count(*) FROM posts_fts WHERE posts_fts MATCH :t) "
+             "+ (SELECT count(*) FROM comments_fts WHERE comments_fts MATCH :t)"),
+        {"t": f'"{term}"'},
+    ).scalar()
+
+
+def main_bench():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    vocabulary = seed(documents)
+    rare, medium, common = vocabulary[20_000], vocabulary[500], vocabulary[5]
+
+    with SessionLocal() as db:
+        for label, term in (("rare", rare), ("medium", medium), ("common", common)):
+            print(f"  {label:<7} term {term!r}: {count_matches(db, term)} matching documents")
+
+        def page(q, pages=1):
+            after, hits = None, []
+            for _ in range(pages):
+                hits = crud.search_documents(db, q, PAGE_SIZE, after)
+                if not hits:
+                    break
+                last = hits[-1]
+                after = (-last["score"], last["kind"], last["id"])
+            return len(hits)
+
+        measure("rare term", lambda: page(rare), repeats)
+        measure("medium term", lambda: page(medium), repeats)
+        measure("common term", lambda: page(common), repeats)
+        measure("two terms (AND)", lambda: page(f"{medium} {vocabulary[501]}"), repeats)
+        measure("common term, pages 1-5", lambda: page(common, pages=5), max(1, repeats // 4))
+        measure(
+            "LIKE baseline (posts only)",
+            lambda: len(db.execute(
+                text("SELECT id FROM posts WHERE content LIKE :pattern LIMIT :limit"),
+                {"pattern": f"%{rare}%", "limit": PAGE_SIZE},
+            ).all()),
+            max(1, repeats // 4),
+        )
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,92 @@
+"""목록 응답 직렬화 처리량: response_model 검증 경로 vs fast_json 직행 경로 (페이지/s, 코어 1개).
+
+10/100/1000개짜리 게시글 페이지(DB에서 읽은 ORM 객체, 컬럼만 조회한 Row)를 JSON 바이트로 만드는 속도를 잽니다.
+- response_model: FastAPI 가 response_model=list[Post] 라우트에서 하는 일 (from_attributes 검증 + dump_json)
+- fast_json     : fast_json.dump_list (attrgetter + orjson, orjson 이 없으면 표준 json)
+두 경로의 출력 바이트가 같은지도 확인하고, 다르면 1로 종료합니다.
+
+실행: python benchmarks/bench_serialization.py [크기별_측정_시간_초]
+"""
+import asyncio
+import sys
+import time
+
+from _common import use_sqlite
+
+use_sqlite()
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+import crud  # noqa: E402
+import fast_json  # noqa: E402
+import models  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from schemas import Post, PostCreate, UserCreate  # noqa: E402
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+def rate(fn, seconds: float) -> float:
+    fn()  # 워밍업
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main_bench():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = crud.create_user(db, UserCreate(username="serializer", password="serializer-password"))
+        crud.create_user_posts_bulk(
+            db, [PostCreate(title=f"게시글 {i}", content="본문 " * 40) for i in range(max(PAGE_SIZES))], user_id=user.id
+        )
+
+    # response_model=list[Post] 라우트가 쓰는 필드를 그대로 가져와 FastAPI 의 직렬화 함수를 호출합니다.
+    app = FastAPI()
+
+    @app.get("/posts/", response_model=list[Post])
+    async def read_posts():
+        return []
+
+    response_field = app.router.routes[-1].response_field
+    loop = asyncio.new_event_loop()
+
+    def via_response_model(rows):
+        return loop.run_until_complete(
+            serialize_response(field=response_field, response_content=rows, dump_json=True)
+        )
+
+    orjson_module = fast_json.orjson
+    ok = True
+    print(f"orjson installed: {orjson_module is not None}")
+    print(f"{'rows':<6} {'source':<5} {'response_model/s':>17} {'fast_json/s':>12} {'speedup':>8} {'stdlib json/s':>14}")
+    with SessionLocal() as db:
+        for size in PAGE_SIZES:
+            orm_rows = db.scalars(select(models.Post).order_by(models.Post.id).limit(size)).all()
+            # 목록 라우트와 같은 컬럼 (schemas.Post 의 필드 전부)
+            tuple_rows = db.execute(
+                select(*crud.POST_LIST_COLUMNS.values()).order_by(models.Post.id).limit(size)
+            ).all()
+            for source, rows in (("orm", orm_rows), ("row", tuple_rows)):
+                if via_response_model(rows) != fast_json.dump_list(Post, rows):
+                    print(f"FAIL: output differs for {size} {source} rows")
+                    ok = False
+                before = rate(lambda: via_response_model(rows), seconds)
+                after = rate(lambda: fast_json.dump_list(Post, rows), seconds)
+                fast_json.orjson = None
+                stdlib = rate(lambda: fast_json.dump_list(Post, rows), seconds)
+                fast_json.orjson = orjson_module
+                print(f"{size:<6} {source:<5} {before:17.0f} {after:12.0f} {after / before:7.1f}x {stdlib:14.0f}")
+    loop.close()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,80 @@
+"""/users/me/ 처리량: 토큰 캐시 사용 vs 미사용.
+
+각 클라이언트는 로그인한 사용자 한 명을 흉내 내며 자기 세션 토큰을 재사용합니다.
+요청의 (1 - 재사용률) 만큼은 새로 발급된 토큰(재로그인/새 탭)으로 보냅니다.
+
+실행: python benchmarks/bench_token_cache.py [클라이언트_수] [클라이언트당_요청_수] [재사용률] [DB_지연_ms]
+"""
+import asyncio
+import random
+import sys
+from datetime import timedelta
+
+from _common import emulate_db_latency, report, run_clients, serve, use_sqlite
+
+use_sqlite()
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+import models  # noqa: E402
+from auth_token import create_access_token  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+from token_cache import token_cache  # noqa: E402
+
+
+async def measure(base_url: str, label: str, users: list[str], per_client: int, reuse: float):
+    rng = random.Random(42)
+    sessions = iter(range(10**9))
+
+    def new_token(username: str) -> str:
+        # exp 를 조금씩 달리해 매번 다른 토큰 문자열을 만듭니다.
+        return create_access_token({"sub": username}, expires_delta=timedelta(minutes=30, seconds=next(sessions)))
+
+    async def run():
+        # 클라이언트마다 (사용자, 현재 토큰) 상태를 둡니다.
+        states = {}
+
+        async def send(client):
+            state = states.get(id(client))
+            if state is None or rng.random() >= reuse:
+                username = state[0] if state else users[len(states) % len(users)]
+                state = states[id(client)] = (username, new_token(username))
+            response = await client.get("/users/me/", headers={"Authorization": f"Bearer {state[1]}"})
+            assert response.status_code == 200, response.text
+
+        return await run_clients(base_url, send, len(users), per_client)
+
+    latencies, elapsed = await run()
+    report(label, latencies, elapsed)
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        exposition = (await client.get("/metrics")).text
+    counters = [line for line in exposition.splitlines() if line.startswith("token_cache_")]
+    print(f"{'':<32} {'  '.join(counters)}")
+
+
+def main_bench():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    reuse = float(sys.argv[3]) if len(sys.argv) > 3 else 0.95
+    latency_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 2.0
+
+    # 해싱 비용은 이 벤치마크와 무관하므로 더미 해시로 사용자만 만듭니다.
+    users = [f"cache_user_{i}" for i in range(clients)]
+    with SessionLocal() as db:
+        db.add_all(models.User(username=name, hashed_password="x") for name in users)
+        db.commit()
+    emulate_db_latency(engine, async_engine, latency_ms)
+
+    print(f"clients={clients} requests/client={per_client} reuse={reuse} db_latency={latency_ms}ms")
+    max_entries = token_cache.max_entries
+    token_cache.max_entries = 0
+    with serve(main.app) as base_url:
+        asyncio.run(measure(base_url, "cache disabled", users, per_client, reuse))
+    token_cache.max_entries = max_entries
+    with serve(main.app) as base_url:
+        asyncio.run(measure(base_url, "cache enabled", users, per_client, reuse))
+
+
+if __name__ == "__main__":
+    main_bench()
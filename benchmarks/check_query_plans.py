@@ -0,0 +1,230 @@
+"""crud 쿼리의 실행 계획 검사 (SQLite EXPLAIN QUERY PLAN).
+
+각 crud 함수를 임시 SQLite 파일(models 기준 스키마 + 검색 색인)에서 실행하면서 발생한 SELECT/UPDATE/DELETE 를
+가로채고, 같은 문장/파라미터로 EXPLAIN QUERY PLAN 을 돌립니다. 동기 함수는 Session 으로, *_async 함수는
+AsyncSession(aiosqlite) 으로 실행하므로 라우트가 실제로 쓰는 비동기 경로의 문장도 검사합니다.
+다음 중 하나라도 보이면 실패(종료 코드 1)합니다.
+
+- "SCAN <테이블>" (인덱스 없이 테이블 전체를 훑음)
+- "USE TEMP B-TREE" (인덱스로 정렬하지 못해 결과 전체를 정렬)
+
+단, ALLOWED_SCANS / ALLOWED_SORTS 에 사유와 함께 등록된 조합은 허용합니다.
+CI 에서는 python benchmarks/check_query_plans.py 를 그대로 실행하면 됩니다.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# 검사는 아래 main() 의 엔진으로 이 임시 파일에서 실행합니다. database 모듈의 엔진도 같은 파일을 보게 합니다
+# (비동기 URL 은 database.async_database_url 이 DATABASE_URL 에서 만듭니다).
+DB_PATH = os.path.join(tempfile.mkdtemp(), "plans.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import crud  # noqa: E402
+import models  # noqa: E402
+import post_counters  # noqa: E402
+from schemas import CommentCreate  # noqa: E402
+
+# (crud 함수 이름, 테이블) -> 허용 사유
+ALLOWED_SCANS = {
+    # 첫 페이지: 기본 키 순서로 앞에서부터 LIMIT 개만 읽고 멈춥니다.
+    ("get_posts(first page)", "posts"): "rowid-ordered scan bounded by LIMIT",
+    # 기존 skip/limit 호환 경로: OFFSET 은 본질적으로 앞의 행을 건너뛰며 읽습니다 (커서 사용 권장).
+    ("get_posts(offset)", "posts"): "legacy OFFSET pagination, bounded by LIMIT",
+}
+
+# 함수 이름 -> 결과 전체 정렬을 허용하는 사유
+ALLOWED_SORTS = {
+    # 순위(bm25 점수)는 계산된 값이라 인덱스 순서가 없습니다. 정렬 대상은 MATCH 로 찾은 문서뿐입니다.
+    "search_documents(first page)": "rank order is computed per match; only matching rows are sorted",
+    "search_documents(cursor)": "rank order is computed per match; only matching rows are sorted",
+}
+
+NOW = datetime(2026, 1, 1)
+
+# 검사할 쿼리: (이름, 동기 호출, 비동기 호출). 한쪽만 있는 함수는 None.
+# 동기/비동기 함수는 crud 의 같은 쿼리 빌더를 쓰지만, 둘 다 실행해서 실제로 나가는 문장을 확인합니다.
+CHECKS = [
+    (
+        "get_user_by_username",
+        lambda db: crud.get_user_by_username(db, username="alice"),
+        lambda db: crud.get_user_by_username_async(db, username="alice"),
+    ),
+    ("get_post", lambda db: crud.get_post(db, post_id=1), lambda db: crud.get_post_async(db, post_id=1)),
+    (
+        "get_posts(first page)",
+        lambda db: crud.get_posts(db, limit=11),
+        lambda db: crud.get_posts_async(db, limit=11),
+    ),
+    (
+        "get_posts(offset)",
+        lambda db: crud.get_posts(db, skip=100, limit=11),
+        lambda db: crud.get_posts_async(db, skip=100, limit=11),
+    ),
+    (
+        "get_posts(cursor)",
+        lambda db: crud.get_posts(db, limit=11, after_id=100),
+        lambda db: crud.get_posts_async(db, limit=11, after_id=100),
+    ),
+    # 활동순 피드
+    (
+        "get_posts_by_activity(first page)",
+        lambda db: crud.get_posts_by_activity(db, limit=11),
+        lambda db: crud.get_posts_by_activity_async(db, limit=11),
+    ),
+    (
+        "get_posts_by_activity(cursor)",
+        lambda db: crud.get_posts_by_activity(db, limit=11, after=(NOW, 100)),
+        lambda db: crud.get_posts_by_activity_async(db, limit=11, after=(NOW, 100)),
+    ),
+    (
+        "get_posts_by_activity(idle cursor)",
+        lambda db: crud.get_posts_by_activity(db, limit=11, after=(None, 100)),
+        lambda db: crud.get_posts_by_activity_async(db, limit=11, after=(None, 100)),
+    ),
+    (
+        "get_comments_by_post(first page)",
+        lambda db: crud.get_comments_by_post(db, post_id=1, limit=51),
+        lambda db: crud.get_comments_by_post_async(db, post_id=1, limit=51),
+    ),
+    (
+        "get_comments_by_post(cursor)",
+        lambda db: crud.get_comments_by_post(db, post_id=1, limit=51, after_id=10),
+        lambda db: crud.get_comments_by_post_async(db, post_id=1, limit=51, after_id=10),
+    ),
+    (
+        "get_post_detail",
+        lambda db: crud.get_post_detail(db, post_id=1, comment_limit=51),
+        lambda db: crud.get_post_detail_async(db, post_id=1, comment_limit=51),
+    ),
+    # 댓글 저장과 같은 트랜잭션의 댓글 수/마지막 댓글 시각 UPDATE, 카운터 재계산
+    (
+        "create_comment_for_post",
+        lambda db: crud.create_comment_for_post(db, CommentCreate(content="more content"), post_id=1, user_id=1),
+        lambda db: crud.create_comment_for_post_async(
+            db, CommentCreate(content="more content"), post_id=1, user_id=1
+        ),
+    ),
+    ("post_counters.backfill", lambda db: post_counters.backfill(bind=db.get_bind()), None),
+    # write-behind 큐의 재시도/재생 중복 확인
+    ("get_saved_provisional_ids", None, lambda db: crud.get_saved_provisional_ids_async(db, ["a", "b"])),
+    # 전문 검색 (순위 쿼리 + 상세 쿼리)
+    (
+        "search_documents(first page)",
+        lambda db: crud.search_documents(db, q="content", limit=11),
+        lambda db: crud.search_documents_async(db, q="content", limit=11),
+    ),
+    (
+        "search_documents(cursor)",
+        lambda db: crud.search_documents(db, q="content", limit=11, after=(-1.0, "comment", 1)),
+        lambda db: crud.search_documents_async(db, q="content", limit=11, after=(-1.0, "comment", 1)),
+    ),
+    # 리프레시 토큰 회전 / 폐기 목록
+    ("get_refresh_token", None, lambda db: crud.get_refresh_token_async(db, "refresh")),
+    ("use_refresh_token", None, lambda db: crud.use_refresh_token_async(db, "refresh", NOW)),
+    ("revoke_refresh_family", None, lambda db: crud.revoke_refresh_family_async(db, "family")),
+    (
+        "add_revoked_tokens",
+        None,
+        lambda db: crud.add_revoked_tokens_async(db, {"access": NOW + timedelta(hours=1), "other": NOW}),
+    ),
+    ("get_revoked_tokens_since", None, lambda db: crud.get_revoked_tokens_since_async(db, after_id=0, now=NOW)),
+    ("delete_expired_tokens", None, lambda db: crud.delete_expired_tokens_async(db, now=NOW)),
+]
+
+CHECKED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+def plan_problems(connection, name: str, statement: str, parameters):
+    problems = []
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    for row in rows:
+        detail = row[-1]
+        words = detail.split()
+        # FTS5 가상 테이블: 인덱스 문자열에 M 이 있으면 MATCH 로 역색인을 찾은 것입니다 (전체 훑기 아님).
+        fts_match = "VIRTUAL TABLE INDEX" in detail and "M" in words[-1]
+        if words[:1] == ["SCAN"] and "USING" not in words and not fts_match:
+            table = words[1]
+            if (name, table) not in ALLOWED_SCANS:
+                problems.append(f"full table scan: {detail}")
+        if "USE TEMP B-TREE" in detail and name not in ALLOWED_SORTS:
+            problems.append(f"sort without index: {detail}")
+    return [row[-1] for row in rows], problems
+
+
+def seed(engine):
+    # 조건부로 이어지는 쿼리(예: 게시글이 있어야 댓글을 조회, 검색 결과가 있어야 상세 조회)도
+    # 실행되도록 최소한의 행을 넣어 둡니다. 글/댓글은 crud 로 만들어 검색 색인에도 들어가게 합니다.
+    with Session(engine) as db:
+        db.add(models.User(id=1, username="alice", hashed_password="x"))
+        db.commit()
+        crud.create_user_posts_bulk(db, [crud.PostCreate(title="title", content="content")], user_id=1)
+        crud.create_comments_for_post_bulk(db, [CommentCreate(content="content")], post_id=1, user_id=1)
+        db.add(models.RefreshToken(
+            id="refresh", family_id="family", user_id=1, access_jti="access",
+            expires_at=NOW + timedelta(days=1), revoked=False,
+        ))
+        db.commit()
+
+
+async def run_async(async_engine, call):
+    async with AsyncSession(async_engine, expire_on_commit=False) as db:
+        await call(db)
+
+
+def main():
+    engine = create_engine(f"sqlite:///{DB_PATH}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{DB_PATH}")
+    models.Base.metadata.create_all(bind=engine)
+    seed(engine)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+
+    loop = asyncio.new_event_loop()
+    failed = False
+    for name, sync_call, async_call in CHECKS:
+        for label, call in (("sync", sync_call), ("async", async_call)):
+            if call is None:
+                continue
+            captured.clear()
+            if label == "sync":
+                with Session(engine) as db:
+                    call(db)
+            else:
+                loop.run_until_complete(run_async(async_engine, call))
+            statements = list(captured)
+            with engine.connect() as connection:
+                for statement, parameters in statements:
+                    plan, problems = plan_problems(connection, name, statement, parameters)
+                    status = "FAIL" if problems else "ok"
+                    print(f"[{status:>4}] {name} [{label}]: {' | '.join(plan)}")
+                    for problem in problems:
+                        print(f"         {problem}")
+                    failed = failed or bool(problems)
+    loop.run_until_complete(async_engine.dispose())
+    loop.close()
+
+    if failed:
+        print("query plan check failed")
+        sys.exit(1)
+    print("all checked crud queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
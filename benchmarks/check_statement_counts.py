@@ -0,0 +1,94 @@
+"""게시글 상세 조회의 SQL 문장 수 검사.
+
+crud.get_post_detail_async 가 댓글 수/작성자 수와 관계없이 고정된 개수(MAX_STATEMENTS)의
+SQL 만 실행하는지 확인하고, 응답을 직렬화할 때 지연 로딩(N+1)이 일어나지 않는지도 확인합니다.
+실패하면 종료 코드 1 을 반환합니다.
+
+실행: python benchmarks/check_statement_counts.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+_db_path = os.path.join(tempfile.mkdtemp(), "statements.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_path}")  # 비동기 엔진은 같은 파일을 aiosqlite 로 엽니다
+
+from sqlalchemy import event  # noqa: E402
+
+import crud  # noqa: E402
+import models  # noqa: E402
+from database import AsyncSessionLocal, SessionLocal, async_engine, engine  # noqa: E402
+from pagination import split_page  # noqa: E402
+from schemas import PostDetail  # noqa: E402
+
+# 게시글(+작성자) 1개, 댓글 페이지(+작성자) 1개
+MAX_STATEMENTS = 2
+COMMENT_PAGE = 50
+
+
+def seed(comment_counts):
+    models.Base.metadata.create_all(bind=engine)
+    post_ids = []
+    with SessionLocal() as db:
+        authors = [models.User(username=f"author_{i}", hashed_password="x") for i in range(100)]
+        db.add_all(authors)
+        db.flush()
+        for count in comment_counts:
+            post = models.Post(title=f"{count} comments", content="body", owner_id=authors[0].id)
+            db.add(post)
+            db.flush()
+            db.add_all(
+                models.Comment(content=f"comment {i}", post_id=post.id, owner_id=authors[i % len(authors)].id)
+                for i in range(count)
+            )
+            post_ids.append(post.id)
+        db.commit()
+    return post_ids
+
+
+async def count_statements(post_id: int) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with AsyncSessionLocal() as db:
+            post, comments = await crud.get_post_detail_async(db, post_id=post_id, comment_limit=COMMENT_PAGE + 1)
+            comments, next_cursor = split_page(comments, COMMENT_PAGE)
+            # 라우트와 같은 방식으로 직렬화 (여기서 지연 로딩이 일어나면 문장 수가 늘거나 예외가 납니다)
+            PostDetail(
+                id=post.id,
+                title=post.title,
+                content=post.content,
+                owner_id=post.owner_id,
+                owner=post.owner,
+                comments=comments,
+                next_comments_cursor=next_cursor,
+            ).model_dump_json()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+async def main():
+    comment_counts = (0, 3, 500)
+    post_ids = seed(comment_counts)
+    failed = False
+    for count, post_id in zip(comment_counts, post_ids):
+        statements = await count_statements(post_id)
+        ok = statements <= MAX_STATEMENTS
+        failed = failed or not ok
+        print(f"[{'ok' if ok else 'FAIL':>4}] post with {count} comments: {statements} statements (max {MAX_STATEMENTS})")
+    await async_engine.dispose()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
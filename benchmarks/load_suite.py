@@ -0,0 +1,342 @@
+"""전체 라우트 부하 테스트 (재현 가능한 시나리오).
+
+로컬 SQLite 로 서버를 띄우고 데이터를 미리 심어 둔 뒤, 가상 사용자(virtual user)들이 실제 사용자처럼
+회원가입 → 로그인(/token) → 가중치를 둔 작업을 반복합니다. locust 의 TaskSet 과 같은 구조지만
+추가 의존성 없이 httpx 로 돌아가므로 CI 나 로컬에서 그대로 실행할 수 있습니다.
+
+작업과 가중치 (TASKS):
+- GET  /users/me/                     내 정보
+- GET  /posts/                        게시글 목록 (키셋 커서로 다음 페이지까지)
+- GET  /posts/?sort=activity          활동순 피드
+- GET  /posts/{post_id}               게시글 상세
+- GET  /posts/{post_id}/comments/     댓글 목록
+- POST /posts/                        게시글 작성
+- POST /posts/{post_id}/comments/     댓글 작성
+- POST /token                         재로그인 (가끔)
+
+출력:
+- 라우트별 요청 수, 오류 수, 과부하 거절(503/429 후 재시도) 수, p50/p95/p99, 초당 요청 수 (클라이언트 측)
+- 라우트 템플릿별 요청당 SQL 수와 DB 시간 (서버의 /metrics 에서 실행 전후 차이로 계산, instrumentation.py 참고)
+  서버는 라우트 템플릿 단위로만 집계하므로 ("GET /posts/" 와 "GET /posts/?sort=activity" 는 같은 템플릿)
+  클라이언트 측 작업별 표와 따로 템플릿별 표로 보여 줍니다.
+
+--json 으로 결과를 파일에 저장하고, --compare 로 저장해 둔 기준 결과와 비교할 수 있습니다.
+오류가 있거나 기준보다 p95 가 --tolerance 배 넘게 느려진 라우트가 있으면 종료 코드 1 입니다.
+(요청당 SQL 수가 늘어난 경우도 회귀로 봅니다. 지연 시간과 달리 기계 성능에 흔들리지 않기 때문입니다.)
+
+실행: python benchmarks/load_suite.py [--users 20] [--spawn-rate 2] [--duration 30] [--seed-posts 2000] [--json out.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+# 시나리오마다 새 계정으로 수십 번 로그인하므로 로그인 시도 제한은 끕니다.
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "0")
+
+from _common import percentile, serve, use_sqlite  # noqa: E402
+
+use_sqlite()
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from database import Base, engine  # noqa: E402
+
+PASSWORD = "load-test-password"
+MAX_RETRIES = 20
+
+# (이름, 가중치). 이름은 결과에 쓰는 라우트 템플릿과 같게 맞춥니다.
+TASKS = [
+    ("GET /users/me/", 15),
+    ("GET /posts/", 25),
+    ("GET /posts/?sort=activity", 10),
+    ("GET /posts/{post_id}", 15),
+    ("GET /posts/{post_id}/comments/", 15),
+    ("POST /posts/", 5),
+    ("POST /posts/{post_id}/comments/", 12),
+    ("POST /token", 3),
+]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.shed: dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, started: float, response: httpx.Response | None):
+        self.latencies[name].append(time.perf_counter() - started)
+        if response is None or response.status_code >= 400:
+            self.errors[name] += 1
+
+
+class VirtualUser:
+    def __init__(self, http: httpx.AsyncClient, index: int, stats: Stats, rng: random.Random, post_ids: list[int]):
+        self.http = http
+        self.username = f"load-{index}-{rng.randrange(1 << 30):x}"
+        self.stats = stats
+        self.rng = rng
+        self.post_ids = post_ids
+        self.headers: dict[str, str] = {}
+
+    async def call(self, name: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        # 503/429 + Retry-After (해싱 대기열/로그인 제한의 과부하 거절)는 실제 클라이언트처럼 기다렸다 다시 보냅니다.
+        # 거절 횟수는 shed 로 따로 세고, 지연 시간은 첫 시도부터 성공할 때까지로 잽니다.
+        started = time.perf_counter()
+        for _ in range(MAX_RETRIES + 1):
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                response = None
+                break
+            if response.status_code not in (429, 503) or "retry-after" not in response.headers:
+                break
+            self.stats.shed[name] += 1
+            await asyncio.sleep(float(response.headers["retry-after"]) * self.rng.uniform(1, 1.5))
+        self.stats.record(name, started, response)
+        return response
+
+    async def signup(self):
+        await self.call("POST /users/", "POST", "/users/", json={"username": self.username, "password": PASSWORD})
+        await self.login()
+
+    async def login(self):
+        response = await self.call(
+            "POST /token", "POST", "/token", data={"username": self.username, "password": PASSWORD}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def pick_post(self) -> int:
+        # 최근 게시글에 요청이 몰리도록 뒤쪽을 더 자주 고릅니다 (실제 피드와 비슷하게).
+        return self.post_ids[int(len(self.post_ids) * (1 - self.rng.random() ** 3)) - 1]
+
+    async def run_task(self, name: str):
+        if name == "GET /users/me/":
+            await self.call(name, "GET", "/users/me/", headers=self.headers)
+        elif name == "GET /posts/":
+            response = await self.call(name, "GET", "/posts/", params={"limit": 20})
+            cursor = response.headers.get("x-next-cursor") if response is not None else None
+            if cursor and self.rng.random() < 0.5:
+                await self.call(name, "GET", "/posts/", params={"limit": 20, "cursor": cursor})
+        elif name == "GET /posts/?sort=activity":
+            await self.call(name, "GET", "/posts/", params={"sort": "activity", "limit": 20})
+        elif name == "GET /posts/{post_id}":
+            await self.call(name, "GET", f"/posts/{self.pick_post()}")
+        elif name == "GET /posts/{post_id}/comments/":
+            await self.call(name, "GET", f"/posts/{self.pick_post()}/comments/")
+        elif name == "POST /posts/":
+            response = await self.call(
+                name, "POST", "/posts/", headers=self.headers,
+                json={"title": f"{self.username} post", "content": "load test " * 20},
+            )
+            if response is not None and response.status_code == 200:
+                self.post_ids.append(response.json()["id"])
+        elif name == "POST /posts/{post_id}/comments/":
+            await self.call(
+                name, "POST", f"/posts/{self.pick_post()}/comments/", headers=self.headers,
+                json={"content": f"{self.username} comment"},
+            )
+        elif name == "POST /token":
+            await self.login()
+
+    async def run(self, deadline: float, think_time: float):
+        await self.signup()
+        names = [name for name, _ in TASKS]
+        weights = [weight for _, weight in TASKS]
+        while time.perf_counter() < deadline:
+            await self.run_task(self.rng.choices(names, weights)[0])
+            if think_time:
+                await asyncio.sleep(self.rng.uniform(0, 2 * think_time))
+
+
+def parse_metrics(text: str) -> dict[str, float]:
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line:
+            continue
+        name, _, value = line.rpartition(" ")
+        values[name] = float(value)
+    return values
+
+
+def server_side(before: dict[str, float], after: dict[str, float]) -> dict[str, dict[str, float]]:
+    # "메서드 라우트"별 요청당 SQL 수와 요청당 DB 시간 (실행 전후 /metrics 차이)
+    routes: dict[str, dict[str, float]] = defaultdict(dict)
+    for key, value in after.items():
+        for metric, field in (
+            ("db_queries_per_request_sum", "queries"),
+            ("db_seconds_per_request_sum", "db_seconds"),
+            ("db_queries_per_request_count", "requests"),
+        ):
+            if key.startswith(metric + '{method="'):
+                method, _, route = key[len(metric) + len('{method="'):-len('"}')].partition('",route="')
+                routes[f"{method} {route}"][field] = value - before.get(key, 0.0)
+    return {
+        route: {
+            "queries_per_request": data.get("queries", 0) / data["requests"],
+            "db_ms_per_request": data.get("db_seconds", 0) * 1000 / data["requests"],
+        }
+        for route, data in routes.items()
+        if data.get("requests")
+    }
+
+
+async def seed(base_url: str, posts: int, comments_per_post: int, rng: random.Random) -> list[int]:
+    # 일괄 생성 엔드포인트로 게시글/댓글을 미리 심어 둡니다 (측정에는 포함하지 않음).
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+        await http.post("/users/", json={"username": "load-seed", "password": PASSWORD})
+        token = (await http.post("/token", data={"username": "load-seed", "password": PASSWORD})).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        post_ids: list[int] = []
+        batch_size = 500
+        for start in range(0, posts, batch_size):
+            batch = [
+                {"title": f"seed post {i}", "content": "seed content " * 30}
+                for i in range(start, min(posts, start + batch_size))
+            ]
+            response = await http.post("/posts/bulk", json=batch, headers=headers)
+            response.raise_for_status()
+            post_ids.extend(row["id"] for row in response.json())
+        # 댓글은 일부 게시글에 몰아서 답니다 (활동순 피드와 댓글 목록에 페이지가 생기도록).
+        for post_id in rng.sample(post_ids, min(len(post_ids), max(1, posts // 10))):
+            batch = [{"content": f"seed comment {i}"} for i in range(comments_per_post)]
+            response = await http.post(f"/posts/{post_id}/comments/bulk", json=batch, headers=headers)
+            response.raise_for_status()
+    return post_ids
+
+
+async def run_suite(base_url: str, args) -> dict:
+    rng = random.Random(args.random_seed)
+    started = time.perf_counter()
+    post_ids = await seed(base_url, args.seed_posts, args.seed_comments, rng)
+    print(f"seeded posts={len(post_ids)} in {time.perf_counter() - started:.1f}s")
+
+    stats = Stats()
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+        metrics_before = parse_metrics((await http.get("/metrics")).text)
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    async def user(index: int):
+        # 가상 사용자마다 커넥션 1개 (브라우저 탭 하나처럼). 초당 spawn_rate 명씩 늘려 갑니다.
+        await asyncio.sleep(index / args.spawn_rate)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as http:
+            await VirtualUser(http, index, stats, random.Random(rng.random()), post_ids).run(deadline, args.think_time)
+
+    await asyncio.gather(*(user(i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+        metrics_after = parse_metrics((await http.get("/metrics")).text)
+    server = server_side(metrics_before, metrics_after)
+
+    results = {}
+    for name in sorted(stats.latencies):
+        samples = stats.latencies[name]
+        results[name] = {
+            "requests": len(samples),
+            "errors": stats.errors[name],
+            "shed": stats.shed[name],
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "rps": len(samples) / elapsed,
+            "template": name.split("?", 1)[0],
+        }
+    # 서버 측 값은 이 실행에서 호출한 템플릿만 남깁니다 (시드/메트릭 조회 요청 제외).
+    templates = {row["template"] for row in results.values()}
+    server = {route: row for route, row in sorted(server.items()) if route in templates}
+    return {"users": args.users, "duration": elapsed, "routes": results, "server": server}
+
+
+def print_results(result: dict):
+    print(f"users={result['users']} duration={result['duration']:.1f}s")
+    print(f"{'task (client side)':<36} {'n':>6} {'err':>4} {'shed':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8}")
+    for name, row in result["routes"].items():
+        print(
+            f"{name:<36} {row['requests']:>6} {row['errors']:>4} {row.get('shed', 0):>5} "
+            f"{row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms {row['rps']:>8.1f}"
+        )
+    print()
+    print(f"{'route template (server side)':<36} {'sql/req':>8} {'db ms/req':>9}  tasks")
+    for route, row in result["server"].items():
+        tasks = ", ".join(name for name, task in result["routes"].items() if task["template"] == route and name != route)
+        print(
+            f"{route:<36} {row['queries_per_request']:>8.2f} {row['db_ms_per_request']:>9.2f}"
+            + (f"  (includes {tasks})" if tasks else "")
+        )
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    # 기준 결과 대비 회귀 목록 (작업별 p95 가 tolerance 배 초과 또는 템플릿별 요청당 SQL 수 증가)
+    regressions = []
+    for name, base in baseline["routes"].items():
+        row = result["routes"].get(name)
+        if row is None:
+            continue
+        if row["p95_ms"] > base["p95_ms"] * tolerance:
+            regressions.append(f"{name}: p95 {base['p95_ms']:.1f}ms -> {row['p95_ms']:.1f}ms")
+    # 과부하 거절된 요청은 SQL 을 덜 실행하므로 거절이 섞인 템플릿의 SQL 수는 비교하지 않습니다.
+    shed = {
+        row["template"]
+        for rows in (result["routes"], baseline["routes"])
+        for row in rows.values()
+        if row.get("shed") and "template" in row
+    }
+    for route, base in baseline.get("server", {}).items():
+        row = result["server"].get(route)
+        if row is None or route in shed:
+            continue
+        # 캐시 적중률에 따라 조금씩 흔들리므로 요청당 0.5개 넘게 늘어난 경우만 봅니다 (N+1 은 1개 이상 늘어남).
+        if row["queries_per_request"] > base["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{route}: sql/request {base['queries_per_request']:.2f} -> {row['queries_per_request']:.2f}"
+            )
+    return regressions
+
+
+def main_suite():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--spawn-rate", type=float, default=2, help="virtual users started per second")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between tasks (seconds)")
+    parser.add_argument("--seed-posts", type=int, default=2000)
+    parser.add_argument("--seed-comments", type=int, default=50, help="comments on each of 10%% of seeded posts")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results (--json output) to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed p95 slowdown factor")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with serve(main.app) as base_url:
+        result = asyncio.run(run_suite(base_url, args))
+    print_results(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+    failed = False
+    errors = {name: row["errors"] for name, row in result["routes"].items() if row["errors"]}
+    if errors:
+        print(f"FAIL: errors {errors}")
+        failed = True
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(result, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main_suite()
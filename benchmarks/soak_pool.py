@@ -0,0 +1,124 @@
+"""커넥션 풀 소크(soak) 테스트.
+
+작은 풀(DB_POOL_SIZE/DB_MAX_OVERFLOW)로 서버를 띄우고, 풀보다 훨씬 많은 동시 클라이언트로
+GET /posts/ 와 /users/me/ 를 일정 시간 보내면서 /metrics 를 주기적으로 읽습니다.
+
+- 토큰 캐시와 응답 캐시를 끄고 실행하므로 요청마다 실제로 커넥션을 체크아웃합니다.
+- 체크아웃 이벤트마다 기록한 최대 사용 수(db_pool_checked_out_peak)가 pool_size + max_overflow 를 넘으면 실패 (종료 코드 1)
+- 체크아웃 수가 요청 수보다 훨씬 적으면(요청이 풀까지 오지 않음) 검사가 의미 없으므로 역시 실패합니다.
+- 체크아웃 대기 시간(db_pool_checkout_wait_seconds)과 고갈(timeout) 횟수를 보고합니다.
+
+실행: python benchmarks/soak_pool.py [동시_클라이언트_수] [지속_시간_초]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("DB_POOL_SIZE", "4")
+os.environ.setdefault("DB_MAX_OVERFLOW", "4")
+os.environ.setdefault("DB_POOL_TIMEOUT", "10")
+# 캐시가 요청을 흡수하면 풀에 부하가 가지 않습니다.
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+os.environ.setdefault("TOKEN_CACHE_MAX_ENTRIES", "0")
+
+from _common import emulate_db_latency, report, serve, use_sqlite  # noqa: E402
+
+use_sqlite()
+
+import httpx  # noqa: E402
+
+import crud  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+from auth_token import create_access_token  # noqa: E402
+from database import SessionLocal, async_engine, engine  # noqa: E402
+from db_pool import DB_MAX_OVERFLOW, DB_POOL_SIZE  # noqa: E402
+from schemas import PostCreate  # noqa: E402
+
+
+def parse_metrics(text: str) -> dict[str, float]:
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line:
+            continue
+        name, _, value = line.rpartition(" ")
+        values[name] = float(value)
+    return values
+
+
+async def soak(base_url: str, clients: int, duration: float, token: str):
+    capacity = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    deadline = time.monotonic() + duration
+    latencies, statuses = [], {}
+
+    async def client_loop(index: int):
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                if index % 2:
+                    response = await client.get("/posts/")
+                else:
+                    response = await client.get("/users/me/", headers=headers)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        before = parse_metrics((await client.get("/metrics")).text)
+        await asyncio.gather(*(client_loop(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+        final = parse_metrics((await client.get("/metrics")).text)
+
+    report("requests", latencies, elapsed)
+    print(f"statuses={statuses}")
+
+    def delta(name):
+        key = f'{name}{{engine="async"}}'
+        return final.get(key, 0.0) - before.get(key, 0.0)
+
+    checkouts = delta("db_pool_checkouts_total")
+    waits = delta("db_pool_checkout_wait_seconds_count")
+    wait_sum = delta("db_pool_checkout_wait_seconds_sum")
+    timeouts = delta("db_pool_timeouts_total")
+    peak = final.get('db_pool_checked_out_peak{engine="async"}', 0.0)
+    print(f"pool capacity={capacity} peak checked out={peak:.0f}")
+    print(
+        f"checkouts={checkouts:.0f} mean checkout wait={wait_sum / waits * 1000 if waits else 0:.2f}ms "
+        f"timeouts={timeouts:.0f}"
+    )
+
+    if checkouts < len(latencies):
+        print(f"FAIL: only {checkouts:.0f} pool checkouts for {len(latencies)} requests (were they served from a cache?)")
+        return False
+    if peak > capacity:
+        print("FAIL: pool grew beyond pool_size + max_overflow")
+        return False
+    if waits == 0:
+        print("FAIL: checkout wait was not reported")
+        return False
+    return True
+
+
+def main_soak():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with SessionLocal() as db:
+        user = models.User(username="soak_user", hashed_password="x")
+        db.add(user)
+        db.commit()
+        for i in range(20):
+            crud.create_user_post(db, PostCreate(title=f"post {i}", content="soak"), user_id=user.id)
+    token = create_access_token({"sub": "soak_user"})
+    emulate_db_latency(engine, async_engine, 2.0)
+
+    print(f"clients={clients} duration={duration}s pool_size={DB_POOL_SIZE} max_overflow={DB_MAX_OVERFLOW}")
+    with serve(main.app) as base_url:
+        ok = asyncio.run(soak(base_url, clients, duration, token))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main_soak()
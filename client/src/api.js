@@ -3,7 +3,7 @@
 import axios from 'axios';
 
 // 🚨 FastAPI 서버의 주소와 포트를 지정합니다.
-const API_BASE_URL = 'http://127.0.0.1:8000'; 
+export const API_BASE_URL = 'http://127.0.0.1:8000'; 
 
 // Axios 인스턴스 생성
 const api = axios.create({
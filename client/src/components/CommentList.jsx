@@ -0,0 +1,129 @@
+﻿// src/components/CommentList.jsx
+
+import React, { useState, useEffect } from 'react';
+import api, { API_BASE_URL } from '../api';
+
+// 🚨 댓글 목록 + 새 댓글 실시간 수신 (SSE)
+// 목록은 첫 페이지만 읽고, 나머지 페이지는 "댓글 더 보기"를 눌렀을 때 X-Next-Cursor 로 이어서 읽습니다.
+// 새 댓글은 목록을 다시 조회하지 않고 /posts/{id}/comments/stream 으로 받습니다.
+// - EventSource 는 헤더를 지정할 수 없으므로 토큰은 ?token= 으로 보냅니다.
+// - 첫 페이지에 댓글이 모두 들어 있으면 ?after= (마지막 id) 로 그 사이에 달린 댓글부터 받고,
+//   아직 읽지 않은 페이지가 있으면 after 없이 연결해 지금부터 달리는 댓글만 받습니다 (빠진 구간은 더 보기로 읽음).
+// - 연결이 끊기면 브라우저가 자동으로 다시 연결하면서 Last-Event-ID (마지막으로 받은 댓글 id) 를 보내므로,
+//   서버가 그 사이에 놓친 댓글부터 보내 줍니다.
+// - "reset" 이벤트: 놓친 댓글이 너무 많음 → 첫 페이지부터 다시 읽고 다시 연결합니다.
+const PAGE_SIZE = 50;
+
+// id 순으로 정렬하고 같은 댓글은 한 번만 남깁니다.
+const mergeById = (current, incoming) => {
+  const known = new Set(current.map(c => c.id));
+  const added = incoming.filter(c => !known.has(c.id));
+  return added.length ? [...current, ...added].sort((a, b) => a.id - b.id) : current;
+};
+
+function CommentList({ postId }) {
+  const [comments, setComments] = useState([]); // 페이지로 읽은 댓글
+  const [live, setLive] = useState([]); // 스트림으로 받은 댓글 (읽지 않은 페이지 뒤에 보여 줌)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState(null);
+  const [generation, setGeneration] = useState(0); // reset 이벤트마다 증가
+
+  const fetchPage = (cursor) =>
+    api.get(`/posts/${postId}/comments/`, { params: { limit: PAGE_SIZE, cursor } });
+
+  useEffect(() => {
+    let source = null;
+    let cancelled = false;
+
+    const connect = (afterId) => {
+      const params = new URLSearchParams({ token: localStorage.getItem('access_token') });
+      if (afterId !== null) params.set('after', afterId);
+      source = new EventSource(`${API_BASE_URL}/posts/${postId}/comments/stream?${params}`);
+
+      source.addEventListener('comment', (event) => {
+        const comment = JSON.parse(event.data);
+        setLive(prev => mergeById(prev, [comment]));
+      });
+      source.addEventListener('reset', () => {
+        source.close();
+        setGeneration(prev => prev + 1);
+      });
+      source.onerror = () => {
+        // 끊긴 연결은 브라우저가 retry 간격 뒤 다시 연결합니다. 연결 자체가 거부되면(401 등) CLOSED 가 됩니다.
+        if (source.readyState === EventSource.CLOSED) {
+          setError('실시간 댓글 연결이 끊어졌습니다. 다시 로그인해 주세요.');
+        }
+      };
+    };
+
+    fetchPage(null)
+      .then(response => {
+        if (cancelled) return;
+        const loaded = response.data;
+        const cursor = response.headers['x-next-cursor'] || null;
+        setComments(loaded);
+        setLive([]);
+        setNextCursor(cursor);
+        setError(null);
+        // 스트림은 로그인이 필요합니다. 로그인하지 않았으면 목록만 보여 줍니다.
+        if (localStorage.getItem('access_token')) {
+          connect(cursor ? null : (loaded.length ? loaded[loaded.length - 1].id : 0));
+        }
+      })
+      .catch(err => {
+        console.error("댓글 로드 실패:", err);
+        if (!cancelled) setError('댓글을 불러오는 데 실패했습니다.');
+      });
+
+    return () => {
+      cancelled = true;
+      if (source) source.close();
+    };
+  }, [postId, generation]);
+
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await fetchPage(nextCursor);
+      setComments(prev => mergeById(prev, response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err) {
+      console.error("댓글 로드 실패:", err);
+      setError('댓글을 불러오는 데 실패했습니다.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // 모든 페이지를 읽었으면 실시간 댓글은 목록 끝에 이어 붙입니다. 아직이면 "더 보기" 버튼 아래에 따로 보여 줍니다.
+  const pagedIds = new Set(comments.map(c => c.id));
+  const pending = live.filter(c => !pagedIds.has(c.id));
+  const shown = nextCursor ? comments : mergeById(comments, pending);
+  const renderComments = (list) => (
+    <ul style={{ paddingLeft: '20px' }}>
+      {list.map(comment => (
+        <li key={comment.id}>
+          {comment.content} <small>(작성자 ID: {comment.owner_id})</small>
+        </li>
+      ))}
+    </ul>
+  );
+
+  return (
+    <div style={{ marginTop: '10px' }}>
+      {error && <p style={{ color: 'red' }}>{error}</p>}
+      {shown.length === 0 && !nextCursor ? <small>댓글이 없습니다.</small> : renderComments(shown)}
+      {nextCursor && (
+        <>
+          <button onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? '불러오는 중...' : '댓글 더 보기'}
+          </button>
+          {pending.length > 0 && renderComments(pending)}
+        </>
+      )}
+    </div>
+  );
+}
+
+export default CommentList;
@@ -2,11 +2,14 @@
 
 import React, { useState, useEffect } from 'react';
 import api from '../api';
+import CommentList from './CommentList';
 
 function PostList() {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  // 댓글은 한 번에 한 게시글만 펼칩니다 (게시글마다 스트림 연결을 열지 않도록)
+  const [openPostId, setOpenPostId] = useState(null);
 
   useEffect(() => {
     const fetchPosts = async () => {
@@ -45,6 +48,13 @@ function PostList() {
               <h4>{post.title}</h4>
               <p>{post.content}</p>
               <small>작성자 ID: {post.owner_id}</small>
+              <button
+                style={{ marginLeft: '10px' }}
+                onClick={() => setOpenPostId(openPostId === post.id ? null : post.id)}
+              >
+                {openPostId === post.id ? '댓글 닫기' : `댓글 보기 (${post.comment_count ?? 0})`}
+              </button>
+              {openPostId === post.id && <CommentList postId={post.id} />}
             </li>
           ))}
         </ul>
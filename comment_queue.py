@@ -0,0 +1,365 @@
+﻿import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+
+import crud
+from database import AsyncSessionLocal
+from metrics import Counter, Gauge, Histogram
+from models import Post as PostModel
+from schemas import PendingComment
+
+logger = logging.getLogger(__name__)
+
+# -----------------
+# ✉️ 댓글 write-behind 큐 (선택 기능)
+# -----------------
+# 인기 게시글에 댓글이 몰리면 요청마다 커밋을 기다리느라 DB 커밋 지연이 그대로 응답 지연이 되고 풀이 포화됩니다.
+# 이 모드를 켜면 POST /posts/{post_id}/comments/ 는 검증된 댓글을 프로세스 안의 제한된 큐에 넣고
+# 임시 id(provisional_id)와 함께 바로 202 를 반환합니다. 백그라운드 태스크가 큐를 모아서
+# 한 트랜잭션(다중 행 INSERT)으로 저장합니다.
+#
+# - 백프레셔: 큐가 COMMENT_QUEUE_MAX_SIZE 만큼 차면 CommentQueueFull (main.py에서 503 + Retry-After)
+# - 종료: stop() 이 새 댓글 접수를 멈추고 남은 댓글을 모두 저장한 뒤 반환합니다 (lifespan 에서 호출).
+# - 내구성(선택): COMMENT_QUEUE_LOG_PATH 를 지정하면 접수한 댓글을 추가 전용(append-only) 파일에 먼저 기록하고,
+#   저장이 끝난 댓글은 "done" 레코드로 표시합니다. 프로세스가 비정상 종료되면 다음 시작 때 남은 댓글을 다시 넣습니다.
+#   임시 id 를 comments.provisional_id (unique)에 함께 저장하므로, 커밋 직후 "done" 기록 전에 죽었더라도
+#   다시 넣은 댓글 중 이미 저장된 것은 건너뜁니다 (같은 댓글이 두 번 저장되지 않음).
+#   워커 프로세스마다 서로 다른 파일을 써야 합니다.
+COMMENT_WRITE_BEHIND = os.getenv("COMMENT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+COMMENT_QUEUE_MAX_SIZE = int(os.getenv("COMMENT_QUEUE_MAX_SIZE", 10000))
+# 한 트랜잭션으로 저장할 최대 댓글 수
+COMMENT_QUEUE_BATCH_SIZE = int(os.getenv("COMMENT_QUEUE_BATCH_SIZE", 500))
+# 배치가 덜 찼을 때 다음 댓글을 모으기 위해 기다리는 시간 (밀리초)
+COMMENT_QUEUE_FLUSH_INTERVAL_MS = float(os.getenv("COMMENT_QUEUE_FLUSH_INTERVAL_MS", 50))
+# 큐가 가득 찼을 때 클라이언트에게 알려줄 재시도 대기 시간 (초)
+COMMENT_QUEUE_RETRY_AFTER = int(os.getenv("COMMENT_QUEUE_RETRY_AFTER", 1))
+# DB 장애(연결 실패/풀 타임아웃)로 배치 저장에 실패했을 때 다시 시도하기 전 대기 시간 (초)
+COMMENT_QUEUE_RETRY_DELAY = float(os.getenv("COMMENT_QUEUE_RETRY_DELAY", 1))
+# 종료 시 남은 댓글을 저장하며 기다리는 최대 시간 (초). 넘기면 남은 댓글은 로그 파일에만 남습니다.
+COMMENT_QUEUE_DRAIN_TIMEOUT = float(os.getenv("COMMENT_QUEUE_DRAIN_TIMEOUT", 30))
+COMMENT_QUEUE_LOG_PATH = os.getenv("COMMENT_QUEUE_LOG_PATH", "")
+# true 면 접수할 때마다 fsync 합니다 (전원 장애까지 대비, 대신 접수 지연 증가).
+# false 면 OS 버퍼까지만 기록하므로 프로세스 장애에는 안전하고 OS 장애에는 안전하지 않습니다.
+COMMENT_QUEUE_LOG_FSYNC = os.getenv("COMMENT_QUEUE_LOG_FSYNC", "false").lower() in ("1", "true", "yes")
+# 존재를 확인한 게시글 id 를 기억하는 개수. 같은 게시글에 댓글이 몰릴 때 요청마다
+# 존재 확인 쿼리로 커넥션을 잡지 않도록 합니다 (게시글이 삭제되면 ORM 이벤트로 제거).
+COMMENT_QUEUE_KNOWN_POSTS = int(os.getenv("COMMENT_QUEUE_KNOWN_POSTS", 10000))
+
+comment_queue_enqueued_total = Counter("comment_queue_enqueued_total", "Comments accepted into the write-behind queue")
+comment_queue_rejected_total = Counter(
+    "comment_queue_rejected_total", "Comments rejected because the write-behind queue was full"
+)
+comment_queue_written_total = Counter("comment_queue_written_total", "Queued comments written to the database")
+comment_queue_dropped_total = Counter(
+    "comment_queue_dropped_total", "Queued comments dropped because the database rejected them"
+)
+comment_queue_flush_seconds = Histogram("comment_queue_flush_seconds", "Time spent writing one batch of comments")
+comment_queue_lag_seconds = Histogram(
+    "comment_queue_lag_seconds", "Time from accepting a comment to committing it"
+)
+
+
+class CommentQueueFull(Exception):
+    # 큐가 가득 찼거나 종료 중일 때 발생 (main.py에서 503 + Retry-After 로 변환)
+    def __init__(self, retry_after: int = COMMENT_QUEUE_RETRY_AFTER):
+        super().__init__("Comment write queue is full")
+        self.retry_after = retry_after
+
+
+class QueuedComment:
+    __slots__ = ("provisional_id", "post_id", "owner_id", "content", "accepted_at", "retried")
+
+    def __init__(self, provisional_id: str, post_id: int, owner_id: int, content: str, accepted_at: float):
+        self.provisional_id = provisional_id
+        self.post_id = post_id
+        self.owner_id = owner_id
+        self.content = content
+        self.accepted_at = accepted_at
+        # 이미 한 번 저장을 시도했거나 로그에서 되살린 댓글 (커밋되었을 수도 있으므로 저장 전에 확인)
+        self.retried = False
+
+    def row(self) -> dict:
+        return {
+            "content": self.content,
+            "post_id": self.post_id,
+            "owner_id": self.owner_id,
+            "provisional_id": self.provisional_id,
+        }
+
+    def to_record(self) -> dict:
+        return {
+            "op": "add",
+            "id": self.provisional_id,
+            "post_id": self.post_id,
+            "owner_id": self.owner_id,
+            "content": self.content,
+        }
+
+
+class CommentWriteQueue:
+    def __init__(
+        self,
+        max_size: int = COMMENT_QUEUE_MAX_SIZE,
+        batch_size: int = COMMENT_QUEUE_BATCH_SIZE,
+        flush_interval: float = COMMENT_QUEUE_FLUSH_INTERVAL_MS / 1000,
+        log_path: str = COMMENT_QUEUE_LOG_PATH,
+        log_fsync: bool = COMMENT_QUEUE_LOG_FSYNC,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.log_path = log_path
+        self.log_fsync = log_fsync
+        self.session_factory = session_factory
+        self._items: deque[QueuedComment] = deque()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._log = None
+        self._accepting = False
+        self._stopping = False
+        self._known_posts: OrderedDict[int, None] = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    # -----------------
+    # 시작 / 종료
+    # -----------------
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        if self.log_path:
+            # 이전 실행에서 저장하지 못한 댓글을 되살리고, 로그를 남은 댓글만으로 다시 씁니다.
+            for item in self._replay_log():
+                self._items.append(item)
+            self._compact_log()
+            self._log = open(self.log_path, "a", encoding="utf-8")
+            if self._items:
+                logger.warning("comment queue: recovered %d unsaved comments from %s", len(self._items), self.log_path)
+        self._accepting = True
+        self._task = asyncio.create_task(self._run())
+        if self._items:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = COMMENT_QUEUE_DRAIN_TIMEOUT):
+        # 1. 새 댓글 접수 중단 → 2. 남은 댓글 저장 → 3. 로그 정리
+        if self._task is None:
+            return
+        self._accepting = False
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            logger.error("comment queue: %d comments not saved before shutdown", len(self._items))
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+            if not self._items:
+                # 모두 저장했으므로 다음 시작 때 되살릴 것이 없습니다.
+                open(self.log_path, "w").close()
+
+    # -----------------
+    # 접수
+    # -----------------
+    def knows_post(self, post_id: int) -> bool:
+        # 큐가 꺼져 있으면 항상 False (동기 경로는 매번 존재를 확인)
+        if not self._accepting or post_id not in self._known_posts:
+            return False
+        self._known_posts.move_to_end(post_id)
+        return True
+
+    def remember_post(self, post_id: int):
+        if not self._accepting or COMMENT_QUEUE_KNOWN_POSTS <= 0:
+            return
+        self._known_posts[post_id] = None
+        self._known_posts.move_to_end(post_id)
+        while len(self._known_posts) > COMMENT_QUEUE_KNOWN_POSTS:
+            self._known_posts.popitem(last=False)
+
+    def forget_post(self, post_id: int):
+        self._known_posts.pop(post_id, None)
+
+    def enqueue(self, post_id: int, owner_id: int, content: str) -> PendingComment:
+        if not self._accepting or len(self._items) >= self.max_size:
+            comment_queue_rejected_total.inc()
+            raise CommentQueueFull()
+        item = QueuedComment(uuid.uuid4().hex, post_id, owner_id, content, time.monotonic())
+        if self._log is not None:
+            self._write_log(item.to_record())
+        self._items.append(item)
+        comment_queue_enqueued_total.inc()
+        if len(self._items) >= self.batch_size or len(self._items) == 1:
+            self._wakeup.set()
+        return PendingComment(
+            provisional_id=item.provisional_id, post_id=post_id, owner_id=owner_id, content=content
+        )
+
+    # -----------------
+    # 백그라운드 플러시
+    # -----------------
+    async def _run(self):
+        while True:
+            if not self._items:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._items) < self.batch_size and not self._stopping:
+                # 배치가 찰 때까지 잠깐 더 모읍니다 (그사이 배치가 차면 바로 깨어남).
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+            try:
+                saved = await self._flush(batch)
+            except Exception:
+                # 예상하지 못한 오류로 플러시 태스크가 조용히 죽으면 큐가 찰 때까지 202 를 돌려주다가
+                # 이후로는 계속 503 이 됩니다. 기록을 남기고 DB 장애와 같이 다시 시도합니다.
+                logger.exception("comment queue: unexpected error, will retry %d comments", len(batch))
+                saved = False
+            if not saved:
+                # DB 장애: 순서를 유지한 채 큐 앞에 되돌려 놓고 잠시 후 다시 시도합니다.
+                # 커밋은 되었는데 그 뒤에 실패했을 수 있으므로 다음 시도 때 저장 여부를 먼저 확인합니다.
+                for item in batch:
+                    item.retried = True
+                self._items.extendleft(reversed(batch))
+                await asyncio.sleep(COMMENT_QUEUE_RETRY_DELAY)
+
+    async def _flush(self, batch: list[QueuedComment]) -> bool:
+        started = time.perf_counter()
+        try:
+            async with self.session_factory() as db:
+                batch = await self._skip_saved(db, batch)
+                if not batch:
+                    return True
+                await crud.create_comments_batch_async(db, [item.row() for item in batch])
+        except (sa_exc.OperationalError, sa_exc.TimeoutError):
+            logger.exception("comment queue: database unavailable, will retry %d comments", len(batch))
+            return False
+        except sa_exc.SQLAlchemyError:
+            # 배치 안의 어떤 행이 거부됨 (예: 외래 키). 한 건씩 저장해서 나머지는 살립니다.
+            logger.exception("comment queue: batch rejected, retrying %d comments one by one", len(batch))
+            await self._flush_one_by_one(batch)
+            return True
+        self._mark_done(batch)
+        comment_queue_flush_seconds.observe(time.perf_counter() - started)
+        return True
+
+    async def _skip_saved(self, db, batch: list[QueuedComment]) -> list[QueuedComment]:
+        # 다시 시도하는 댓글 중 이미 커밋된 것은 "done" 으로만 표시하고 빼냅니다.
+        retried = [item.provisional_id for item in batch if item.retried]
+        if not retried:
+            return batch
+        saved = await crud.get_saved_provisional_ids_async(db, retried)
+        if not saved:
+            return batch
+        logger.warning("comment queue: %d comments were already saved, skipping them", len(saved))
+        self._write_done([item for item in batch if item.provisional_id in saved])
+        return [item for item in batch if item.provisional_id not in saved]
+
+    async def _flush_one_by_one(self, batch: list[QueuedComment]):
+        deferred = []
+        for item in batch:
+            try:
+                async with self.session_factory() as db:
+                    if not await self._skip_saved(db, [item]):
+                        continue
+                    await crud.create_comments_batch_async(db, [item.row()])
+            except (sa_exc.OperationalError, sa_exc.TimeoutError):
+                # 장애라면 이 댓글은 다음 배치로 미룹니다.
+                item.retried = True
+                deferred.append(item)
+                continue
+            except sa_exc.SQLAlchemyError:
+                logger.exception("comment queue: dropping comment %s", item.provisional_id)
+                comment_queue_dropped_total.inc()
+                self._write_done([item])
+                continue
+            self._mark_done([item])
+        self._items.extendleft(reversed(deferred))
+
+    def _mark_done(self, batch: list[QueuedComment]):
+        now = time.monotonic()
+        for item in batch:
+            comment_queue_lag_seconds.observe(now - item.accepted_at)
+        comment_queue_written_total.inc(len(batch))
+        self._write_done(batch)
+
+    # -----------------
+    # 추가 전용 로그
+    # -----------------
+    # 한 줄에 JSON 레코드 하나: {"op": "add", ...} 또는 {"op": "done", "ids": [...]}
+    def _write_log(self, record: dict):
+        self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._log.flush()
+        if self.log_fsync:
+            os.fsync(self._log.fileno())
+
+    def _write_done(self, batch: list[QueuedComment]):
+        if self._log is not None:
+            self._write_log({"op": "done", "ids": [item.provisional_id for item in batch]})
+
+    def _replay_log(self) -> list[QueuedComment]:
+        if not os.path.exists(self.log_path):
+            return []
+        pending: dict[str, QueuedComment] = {}
+        with open(self.log_path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 기록 도중 죽어서 잘린 마지막 줄
+                    continue
+                if record.get("op") == "add":
+                    item = QueuedComment(
+                        record["id"], record["post_id"], record["owner_id"], record["content"], time.monotonic()
+                    )
+                    item.retried = True
+                    pending[record["id"]] = item
+                elif record.get("op") == "done":
+                    for provisional_id in record["ids"]:
+                        pending.pop(provisional_id, None)
+        return list(pending.values())
+
+    def _compact_log(self):
+        temp_path = self.log_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as log:
+            for item in self._items:
+                log.write(json.dumps(item.to_record(), ensure_ascii=False) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+        os.replace(temp_path, self.log_path)
+
+
+comment_queue = CommentWriteQueue()
+
+comment_queue_depth = Gauge(
+    "comment_queue_depth", "Comments accepted but not yet written", callback=lambda: len(comment_queue)
+)
+
+
+@event.listens_for(PostModel, "after_delete")
+def _forget_deleted_post(mapper, connection, target):
+    comment_queue.forget_post(target.id)
@@ -0,0 +1,495 @@
+﻿import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+from fastapi import WebSocketDisconnect
+
+import fast_json
+from metrics import Counter, Gauge
+from schemas import Comment
+
+logger = logging.getLogger(__name__)
+
+# -----------------
+# 📡 새 댓글 실시간 스트림 (SSE / WebSocket)
+# -----------------
+# 새 댓글을 보려고 클라이언트가 GET /posts/{post_id}/comments/ 를 주기적으로 호출하면
+# 열린 탭마다 매번 쿼리와 직렬화를 반복합니다. 대신 GET /posts/{post_id}/comments/stream (SSE) 이나
+# /posts/{post_id}/comments/ws (WebSocket) 에 연결해 두면, crud 가 댓글을 커밋한 직후 이 허브에 발행하고
+# 허브가 그 게시글을 구독 중인 연결에만 나눠 줍니다.
+#
+# - 댓글은 발행할 때 한 번만 직렬화하고, 모든 구독자에게 같은 바이트 객체를 전달합니다.
+# - 구독자마다 크기가 COMMENT_STREAM_BUFFER_SIZE 인 버퍼가 있습니다. 클라이언트가 읽지 못해 보내지 못한 댓글이
+#   그만큼 쌓인 상태에서 새 댓글이 오면 (느린 소비자) 그 구독만 허브에서 빼고 스트림을 끝냅니다.
+#   발행하는 쪽과 다른 구독자는 기다리지 않습니다. 일괄 작성으로 한 번에 발행된 댓글은 나누지 않고 통째로 넣습니다.
+#   SSE 클라이언트는 자동으로 다시 연결하면서 Last-Event-ID(마지막으로 받은 댓글 id)를 보내고,
+#   놓친 댓글은 DB 에서 받습니다 (main.py 참고).
+# - 발행 → 허브 전달 경로(브로커)는 교체할 수 있습니다.
+#   memory: 같은 프로세스 안에서만 전달 (워커 1개)
+#   sqlite: 같은 호스트의 워커들이 공유 SQLite 파일의 이벤트 테이블을 폴링 (Redis pub/sub 등을 대신하는 로컬 대용)
+# - uvicorn 은 종료할 때 열린 응답이 끝나기를 기다리므로, 스트림을 쓰는 배포에서는
+#   --timeout-graceful-shutdown 을 지정해야 열린 스트림이 종료를 막지 않습니다.
+COMMENT_STREAM_BACKEND = os.getenv("COMMENT_STREAM_BACKEND", "memory")  # memory | sqlite
+# 구독자 하나가 아직 보내지 못한 댓글을 쌓아 둘 수 있는 최대 개수 (넘으면 그 구독을 끊음)
+COMMENT_STREAM_BUFFER_SIZE = int(os.getenv("COMMENT_STREAM_BUFFER_SIZE", 256))
+# 워커 하나가 유지하는 최대 구독 수 (넘으면 503 + Retry-After)
+COMMENT_STREAM_MAX_SUBSCRIBERS = int(os.getenv("COMMENT_STREAM_MAX_SUBSCRIBERS", 10000))
+COMMENT_STREAM_RETRY_AFTER = int(os.getenv("COMMENT_STREAM_RETRY_AFTER", 5))
+# 새 댓글이 없을 때 연결 유지를 위해 보내는 SSE 주석(: ping) 간격 (초). 프록시의 유휴 연결 종료를 막고 끊긴 연결을 찾아냅니다.
+COMMENT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("COMMENT_STREAM_HEARTBEAT_SECONDS", 15))
+# SSE 클라이언트가 다시 연결하기 전에 기다리는 시간 (retry: 필드, 밀리초)
+COMMENT_STREAM_RETRY_MS = int(os.getenv("COMMENT_STREAM_RETRY_MS", 3000))
+# 다시 연결할 때 DB 에서 채워 줄 놓친 댓글의 최대 개수. 더 많이 놓쳤으면 "reset" 이벤트를 보내고
+# 클라이언트는 목록을 GET /posts/{post_id}/comments/ 로 다시 읽습니다.
+COMMENT_STREAM_BACKFILL_LIMIT = int(os.getenv("COMMENT_STREAM_BACKFILL_LIMIT", 500))
+# sqlite 브로커 설정
+COMMENT_STREAM_SQLITE_PATH = os.getenv("COMMENT_STREAM_SQLITE_PATH", "./comment_stream.db")
+COMMENT_STREAM_POLL_INTERVAL_MS = float(os.getenv("COMMENT_STREAM_POLL_INTERVAL_MS", 100))
+# 이벤트 테이블에 남겨 두는 시간 (초). 폴링은 이보다 훨씬 짧은 주기로 하므로 그 뒤에는 지워도 됩니다.
+COMMENT_STREAM_EVENT_TTL_SECONDS = float(os.getenv("COMMENT_STREAM_EVENT_TTL_SECONDS", 60))
+
+comment_stream_published_total = Counter("comment_stream_published_total", "Comments published to the stream hub")
+comment_stream_deliveries_total = Counter(
+    "comment_stream_deliveries_total", "Comment events handed to stream subscribers"
+)
+comment_stream_evicted_total = Counter(
+    "comment_stream_evicted_total", "Stream subscriptions dropped because the client fell behind"
+)
+comment_stream_rejected_total = Counter(
+    "comment_stream_rejected_total", "Stream subscriptions rejected because the worker was at its limit"
+)
+
+
+class CommentStreamFull(Exception):
+    # 구독 수가 COMMENT_STREAM_MAX_SUBSCRIBERS 에 도달함 (main.py에서 503 + Retry-After 로 변환)
+    def __init__(self, retry_after: int = COMMENT_STREAM_RETRY_AFTER):
+        super().__init__("Too many comment stream subscribers")
+        self.retry_after = retry_after
+
+
+class SubscriptionEnded(Exception):
+    # 구독이 끝남: reason 은 "slow_consumer" (버퍼 초과), "shutdown" (서버 종료), "disconnect" (클라이언트 종료)
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class StreamEvent:
+    # 댓글 하나. data 는 Comment 스키마의 JSON 바이트, frame 은 그대로 보낼 SSE 이벤트 바이트,
+    # text 는 WebSocket 텍스트 메시지로 보낼 문자열입니다 (구독자마다 다시 만들지 않도록 미리 만들어 둠).
+    __slots__ = ("id", "post_id", "data", "frame", "text")
+
+    def __init__(self, comment_id: int, post_id: int, data: bytes):
+        self.id = comment_id
+        self.post_id = post_id
+        self.data = data
+        self.frame = b"id: %d\nevent: comment\ndata: %s\n\n" % (comment_id, data)
+        self.text = data.decode()
+
+
+def events_from_comments(comments) -> list[StreamEvent]:
+    # ORM 객체 또는 Comment 의 모든 컬럼을 조회한 Row 목록 → StreamEvent 목록
+    dicts = fast_json.serializer_for(Comment).to_dicts(comments)
+    return [StreamEvent(row["id"], row["post_id"], fast_json.dumps(row)) for row in dicts]
+
+
+def sse_frame(event: str, data: bytes = b"{}") -> bytes:
+    return b"event: %s\ndata: %s\n\n" % (event.encode(), data)
+
+
+class Subscription:
+    __slots__ = ("post_id", "max_size", "ended", "active", "_buffer", "_ready")
+
+    def __init__(self, post_id: int, max_size: int = COMMENT_STREAM_BUFFER_SIZE):
+        self.post_id = post_id
+        self.max_size = max_size
+        self.ended: str | None = None
+        # 마지막 하트비트 이후 이벤트를 받았는지 (받았으면 그 주기에는 ping 을 보내지 않음)
+        self.active = False
+        self._buffer: deque[StreamEvent] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, events: list[StreamEvent]) -> bool:
+        # 이벤트 루프 스레드에서만 호출합니다. 한 번에 발행된 묶음(일괄 작성)은 통째로 넣고,
+        # 이전에 받은 이벤트를 max_size 개 이상 아직 보내지 못했을 때만 구독을 끝냅니다 (False).
+        if self.ended is not None:
+            return False
+        if len(self._buffer) >= self.max_size:
+            self.end("slow_consumer")
+            return False
+        self._buffer.extend(events)
+        self.active = True
+        self._ready.set()
+        return True
+
+    def ping(self):
+        # 허브의 하트비트: 빈 목록으로 get() 을 깨웁니다.
+        self._ready.set()
+
+    def end(self, reason: str):
+        if self.ended is None:
+            self.ended = reason
+            self._buffer.clear()
+            self._ready.set()
+
+    async def get(self) -> list[StreamEvent]:
+        # 쌓인 이벤트를 모두 꺼냅니다. 하트비트로 깨어났으면 빈 목록입니다.
+        # (구독자마다 wait_for 타이머를 두지 않고 허브의 타이머 하나가 한가한 구독을 깨웁니다.)
+        if not self._buffer and self.ended is None:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.ended is not None:
+            raise SubscriptionEnded(self.ended)
+        events = list(self._buffer)
+        self._buffer.clear()
+        return events
+
+
+# -----------------
+# 브로커 (발행 → 허브 전달)
+# -----------------
+class StreamBroker(ABC):
+    # local 이 True 면 이 프로세스의 구독자에게만 전달하므로, 구독자가 없는 게시글은 발행을 건너뜁니다.
+    local = False
+
+    @abstractmethod
+    async def start(self, deliver):
+        # deliver(events): 이벤트 루프 스레드에서 호출할 허브의 전달 함수
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    @abstractmethod
+    def publish(self, events: list[StreamEvent]):
+        ...
+
+
+class MemoryBroker(StreamBroker):
+    local = True
+
+    def __init__(self):
+        self._deliver = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._deliver = None
+
+    def publish(self, events):
+        if self._deliver is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(events)
+        else:
+            # 동기 crud 경로(스레드)에서 발행한 경우
+            self._loop.call_soon_threadsafe(self._deliver, events)
+
+
+class SqliteBroker(StreamBroker):
+    # 발행한 이벤트를 공유 SQLite 파일에 추가하고, 각 워커가 자기가 마지막으로 읽은 id 이후의 행을 폴링합니다.
+    # 자기 워커에서 발행한 이벤트도 폴링으로 받으므로 모든 워커에서 순서가 같습니다.
+    # publish 는 댓글 작성 요청 안에서 불리므로 이벤트 루프에서 파일에 직접 쓰지 않습니다.
+    # 대기 목록에 넣고 INSERT 는 스레드에서 실행합니다 (잠긴 DB 를 기다리느라 루프가 멈추지 않음).
+    # 쓰기에 실패한 이벤트는 대기 목록에 남아 있다가 폴링 태스크가 다음 주기에 다시 씁니다.
+    def __init__(
+        self,
+        path: str = COMMENT_STREAM_SQLITE_PATH,
+        poll_interval: float = COMMENT_STREAM_POLL_INTERVAL_MS / 1000,
+        ttl: float = COMMENT_STREAM_EVENT_TTL_SECONDS,
+    ):
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._pending: deque[StreamEvent] = deque()
+        self._writes: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, post_id INTEGER, comment_id INTEGER, data BLOB, created_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_events_created_at ON events (created_at)")
+
+    async def start(self, deliver):
+        with self._lock:
+            # 시작하기 전의 이벤트는 보내지 않습니다 (놓친 댓글은 Last-Event-ID 로 DB 에서 채움).
+            self._last_id = self._conn.execute("SELECT coalesce(max(id), 0) FROM events").fetchone()[0]
+        self._task = asyncio.create_task(self._run(deliver))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        # 아직 쓰지 못한 이벤트는 다른 워커의 구독자를 위해 마저 기록합니다.
+        try:
+            await asyncio.to_thread(self._write_pending)
+        except sqlite3.Error:
+            logger.exception("comment stream: writing pending events failed")
+
+    def publish(self, events):
+        # deque.extend 는 스레드 안전하므로 동기 crud 경로(스레드)에서 불려도 됩니다.
+        self._pending.extend(events)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is None:
+            # 동기 crud 경로: 이미 이벤트 루프 밖의 스레드이므로 바로 씁니다.
+            try:
+                self._write_pending()
+            except sqlite3.Error:
+                logger.exception("comment stream: writing events failed, retrying on the next poll")
+            return
+        task = running.create_task(asyncio.to_thread(self._write_pending))
+        self._writes.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: asyncio.Task):
+        self._writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("comment stream: writing events failed, retrying on the next poll", exc_info=task.exception())
+
+    def _write_pending(self):
+        # 대기 목록을 잠금 안에서 꺼내야 동시에 실행된 쓰기끼리 발행 순서가 뒤섞이지 않습니다.
+        with self._lock:
+            events = []
+            while self._pending:
+                events.append(self._pending.popleft())
+            if not events:
+                return
+            try:
+                self._conn.executemany(
+                    "INSERT INTO events (post_id, comment_id, data, created_at) VALUES (?, ?, ?, ?)",
+                    [(event.post_id, event.id, event.data, time.time()) for event in events],
+                )
+            except sqlite3.Error:
+                # 다음 주기에 다시 시도합니다 (순서 유지를 위해 앞쪽에 되돌려 놓음).
+                self._pending.extendleft(reversed(events))
+                raise
+
+    def _fetch(self) -> list[StreamEvent]:
+        self._write_pending()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, post_id, comment_id, data FROM events WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        return [StreamEvent(comment_id, post_id, data) for _, post_id, comment_id, data in rows]
+
+    def _prune(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.ttl,))
+
+    async def _run(self, deliver):
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                events = await asyncio.to_thread(self._fetch)
+                if time.monotonic() - last_prune > self.ttl:
+                    last_prune = time.monotonic()
+                    await asyncio.to_thread(self._prune)
+            except sqlite3.Error:
+                logger.exception("comment stream: polling the event table failed")
+                continue
+            if events:
+                deliver(events)
+
+
+def _create_broker(name: str) -> StreamBroker:
+    if name == "sqlite":
+        return SqliteBroker()
+    return MemoryBroker()
+
+
+# -----------------
+# 허브 (게시글별 구독자 목록)
+# -----------------
+class CommentHub:
+    def __init__(
+        self,
+        broker: StreamBroker | None = None,
+        buffer_size: int = COMMENT_STREAM_BUFFER_SIZE,
+        max_subscribers: int = COMMENT_STREAM_MAX_SUBSCRIBERS,
+    ):
+        self.broker = broker
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._count = 0
+        self._started = False
+        self._heartbeat: asyncio.Task | None = None
+
+    def __len__(self):
+        return self._count
+
+    async def start(self):
+        if self.broker is None:
+            self.broker = _create_broker(COMMENT_STREAM_BACKEND)
+        await self.broker.start(self.deliver)
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        self._started = True
+
+    async def stop(self):
+        # 새 발행을 멈추고 열린 구독을 모두 끝냅니다 (각 스트림은 "shutdown" 으로 종료).
+        self._started = False
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if self.broker is not None:
+            await self.broker.stop()
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.end("shutdown")
+                self.unsubscribe(subscription)
+
+    def subscribe(self, post_id: int) -> Subscription:
+        if self._count >= self.max_subscribers:
+            comment_stream_rejected_total.inc()
+            raise CommentStreamFull()
+        subscription = Subscription(post_id, self.buffer_size)
+        self._subscribers.setdefault(post_id, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.post_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.post_id]
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(COMMENT_STREAM_HEARTBEAT_SECONDS)
+            for subscribers in list(self._subscribers.values()):
+                for subscription in subscribers:
+                    if not subscription.active:
+                        subscription.ping()
+                    subscription.active = False
+
+    def publish_comments(self, comments):
+        # crud 에서 댓글을 커밋한 직후 호출합니다 (ORM 객체 목록).
+        if not self._started or not comments:
+            return
+        if self.broker.local and not any(comment.post_id in self._subscribers for comment in comments):
+            return
+        events = events_from_comments(comments)
+        comment_stream_published_total.inc(len(events))
+        self.broker.publish(events)
+
+    def deliver(self, events: list[StreamEvent]):
+        by_post: dict[int, list[StreamEvent]] = {}
+        for event in events:
+            if event.post_id in self._subscribers:
+                by_post.setdefault(event.post_id, []).append(event)
+        delivered = 0
+        for post_id, post_events in by_post.items():
+            evicted = []
+            for subscription in self._subscribers[post_id]:
+                if subscription.push(post_events):
+                    delivered += len(post_events)
+                elif subscription.ended == "slow_consumer":
+                    evicted.append(subscription)
+            for subscription in evicted:
+                comment_stream_evicted_total.inc()
+                self.unsubscribe(subscription)
+        comment_stream_deliveries_total.inc(delivered)
+
+
+comment_hub = CommentHub()
+
+comment_stream_subscribers = Gauge(
+    "comment_stream_subscribers", "Open comment stream subscriptions", callback=lambda: len(comment_hub)
+)
+
+
+# -----------------
+# 연결별 송신 루프
+# -----------------
+async def sse_stream(hub: CommentHub, subscription: Subscription, backlog: list[StreamEvent], reset: bool = False):
+    # StreamingResponse 본문. 놓친 댓글(backlog)을 먼저 보내고, 이후 허브에서 받은 댓글을 보냅니다.
+    # backlog 를 DB 에서 읽는 동안 구독이 이미 시작되었으므로, backlog 로 이미 보낸 댓글만 id 로 거릅니다.
+    # 동시에 커밋된 댓글은 id 순서와 다르게 도착할 수 있으므로 (11 다음에 10) "마지막 id 보다 큰 것만"으로 거르면
+    # 늦게 도착한 댓글이 빠집니다. 나머지 실시간 이벤트는 모두 보냅니다.
+    try:
+        head = [b"retry: %d\n\n" % COMMENT_STREAM_RETRY_MS]
+        if reset:
+            head.append(sse_frame("reset"))
+        head.extend(event.frame for event in backlog)
+        sent = {event.id for event in backlog}
+        yield b"".join(head)
+        while True:
+            try:
+                events = await subscription.get()
+            except SubscriptionEnded as exc:
+                yield sse_frame("close", fast_json.dumps({"reason": exc.reason}))
+                return
+            if not events:
+                yield b": ping\n\n"
+                continue
+            if sent:
+                frames = [event.frame for event in events if event.id not in sent]
+                sent.difference_update(event.id for event in events)
+            else:
+                frames = [event.frame for event in events]
+            if frames:
+                yield b"".join(frames)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def websocket_stream(hub: CommentHub, subscription: Subscription, websocket):
+    # WebSocket 은 메시지 하나에 댓글 JSON 하나를 보냅니다. 클라이언트가 보내는 메시지는 무시하고,
+    # 연결 종료만 감지해서 구독을 끝냅니다 (연결 유지는 uvicorn 의 ping 이 담당하므로 하트비트는 건너뜀).
+    async def watch_disconnect():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscription.end("disconnect")
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            try:
+                events = await subscription.get()
+            except SubscriptionEnded as exc:
+                if exc.reason != "disconnect":
+                    # 1013: Try Again Later
+                    await websocket.close(code=1013, reason=exc.reason)
+                return
+            try:
+                for event in events:
+                    await websocket.send_text(event.text)
+            except (WebSocketDisconnect, RuntimeError):
+                return
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(subscription)
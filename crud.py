@@ -1,12 +1,23 @@
-﻿from sqlalchemy.orm import Session
+﻿import logging
+import os
+
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from schemas import UserCreate , PostCreate, CommentCreate
-from auth_utils import get_password_hash,verify_password
+from auth_utils import get_password_hash,verify_and_update_password,get_password_hash_async,verify_and_update_password_async,dummy_verify_password_async
+from login_limiter import login_limiter
 import models
+import post_counters
+import response_cache
+import search
+from comment_stream import comment_hub
 
+logger = logging.getLogger(__name__)
 
 # 1. 사용자 이름으로 사용자 찾기
 def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+    return db.scalars(user_by_username_query(username)).first()
 
 # 2. 새로운 사용자 생성 (회원가입)
 def create_user(db: Session, user: UserCreate):
@@ -32,28 +43,244 @@ def authenticate_user(db: Session, username: str, password: str):
     
     # 3. 비밀번호 검증 (auth_utils.py의 함수 사용)
     # plain_password(사용자가 입력한 비밀번호)와 hashed_password(DB에 저장된 비밀번호) 비교
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return None  # 비밀번호가 일치하지 않으면 None 반환
-    
-    # 4. 인증 성공 시 사용자 객체 반환
+
+    # 4. 저장된 해시가 예전 방식/비용이면 현재 설정으로 다시 해싱한 값으로 교체
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        db.commit()
+
+    # 5. 인증 성공 시 사용자 객체 반환
     return user
 
+# 새 글/댓글과 같은 트랜잭션에서 실행할 부가 문장 [(문장, 파라미터), ...]
+# - 전문 검색 색인 갱신 (SQLite FTS5, MySQL 은 자동이라 할 일 없음)
+# - 댓글이면 게시글마다 댓글 수/마지막 댓글 시각 UPDATE 한 번 (post_counters.py 참고)
+def _write_side_statements(db, posts=(), comments=()):
+    statements = list(search.index_statements(db.get_bind().dialect.name, posts, comments))
+    if comments:
+        statements.append(
+            (post_counters.ACTIVITY_UPDATE, post_counters.activity_params(comment.post_id for comment in comments))
+        )
+    return statements
+
+def _execute_side_statements(db: Session, posts=(), comments=()):
+    for statement, params in _write_side_statements(db, posts, comments):
+        db.execute(statement, params)
+
+def _after_posts_committed(posts):
+    # 커밋 이후 캐시된 게시글 목록 응답 무효화. 게시글은 이미 저장되었으므로 캐시 오류(공유 SQLite 백엔드의
+    # 잠금 등)로 요청이 실패하면 안 됩니다 (_after_comments_committed 와 같음).
+    try:
+        response_cache.invalidate(response_cache.POSTS_TAG)
+    except Exception:
+        logger.exception("response cache invalidation failed after saving %d posts", len(posts))
+
+async def _after_posts_committed_async(posts):
+    try:
+        await response_cache.invalidate_async(response_cache.POSTS_TAG)
+    except Exception:
+        logger.exception("response cache invalidation failed after saving %d posts", len(posts))
+
 # 게시글 생성 함수
 def create_user_post(db: Session, post: PostCreate, user_id: int):
     # Post 모델에 owner_id와 함께 데이터 저장
     db_post = models.Post(**post.model_dump(), owner_id=user_id)
     db.add(db_post)
+    db.flush()
+    _execute_side_statements(db, posts=[db_post])
     db.commit()
     db.refresh(db_post)
+    _after_posts_committed([db_post])
     return db_post
 
+# -----------------
+# 📦 일괄(bulk) 생성
+# -----------------
+# 행마다 add/commit/refresh 를 하는 대신, 한 트랜잭션에서 다중 행 INSERT ... RETURNING 한 번으로 처리합니다.
+# RETURNING 을 지원하지 않는 DB(MySQL)는 ORM flush 로 대신하며, 이때도 트랜잭션/커밋은 한 번입니다.
+# (sort_by_parameter_order=True 는 센티널 컬럼이 없으면 SQLite 에서 행마다 INSERT 로 쪼개지므로 쓰지 않고,
+#  돌려받은 행은 id 순으로 정렬합니다. 한 문장 안의 자동 증가 id 는 입력 순서대로 매겨집니다.)
+BULK_MAX_BATCH_SIZE = int(os.getenv("BULK_MAX_BATCH_SIZE", 1000))
+
+def _supports_bulk_returning(db) -> bool:
+    return db.get_bind().dialect.insert_executemany_returning
+
+def _sorted_by_id(rows):
+    return sorted(rows, key=lambda row: row.id)
+
+def create_user_posts_bulk(db: Session, posts: list[PostCreate], user_id: int):
+    rows = [{**post.model_dump(), "owner_id": user_id} for post in posts]
+    if _supports_bulk_returning(db):
+        db_posts = _sorted_by_id(db.scalars(insert(models.Post).returning(models.Post), rows))
+    else:
+        # 새 글에는 아직 댓글이 없습니다 (flush 뒤에도 속성이 채워져 있도록 명시, 지연 로딩 방지)
+        db_posts = [models.Post(**row, last_comment_at=None) for row in rows]
+        db.add_all(db_posts)
+        db.flush()
+    _execute_side_statements(db, posts=db_posts)
+    db.commit()
+    _after_posts_committed(db_posts)
+    return db_posts
+
+def _comment_cache_tags(comments):
+    return {response_cache.post_comments_tag(comment.post_id) for comment in comments} | {response_cache.POSTS_TAG}
+
+def _publish_committed_comments(comments):
+    try:
+        comment_hub.publish_comments(comments)
+    except Exception:
+        logger.exception("publishing %d comments to the stream hub failed", len(comments))
+
+def _after_comments_committed(comments):
+    # 커밋 이후 해당 게시글의 댓글 목록과 (댓글 수가 들어 있는) 게시글 목록 캐시를 무효화하고,
+    # 스트림 구독자에게 새 댓글을 알립니다. 댓글은 이미 저장되었으므로 여기서 난 오류(공유 SQLite 백엔드의
+    # 잠금 등)로 요청이나 write-behind 플러시가 실패하면 안 됩니다. 기록만 남기고 넘어갑니다.
+    try:
+        response_cache.invalidate(*_comment_cache_tags(comments))
+    except Exception:
+        logger.exception("response cache invalidation failed after saving %d comments", len(comments))
+    _publish_committed_comments(comments)
+
+async def _after_comments_committed_async(comments):
+    # _after_comments_committed 와 같음 (캐시 무효화는 blocking 백엔드면 스레드에서 실행)
+    try:
+        await response_cache.invalidate_async(*_comment_cache_tags(comments))
+    except Exception:
+        logger.exception("response cache invalidation failed after saving %d comments", len(comments))
+    _publish_committed_comments(comments)
+
+def create_comments_for_post_bulk(db: Session, comments: list[CommentCreate], post_id: int, user_id: int):
+    rows = [{"content": comment.content, "post_id": post_id, "owner_id": user_id} for comment in comments]
+    if _supports_bulk_returning(db):
+        db_comments = _sorted_by_id(db.scalars(insert(models.Comment).returning(models.Comment), rows))
+    else:
+        db_comments = [models.Comment(**row) for row in rows]
+        db.add_all(db_comments)
+        db.flush()
+    _execute_side_statements(db, comments=db_comments)
+    db.commit()
+    _after_comments_committed(db_comments)
+    return db_comments
+
 def get_post(db: Session, post_id: int):
-    # Post 모델을 사용하여 ID가 일치하는 첫 번째 레코드를 반환합니다.
-    return db.query(models.Post).filter(models.Post.id == post_id).first()
+    # 기본 키 조회 (이미 세션에 있으면 DB 왕복 없이 반환)
+    return db.get(models.Post, post_id)
+
+# -----------------
+# 📋 목록 조회용 컬럼 선택 (projection)
+# -----------------
+# 목록 조회는 엔티티 전체 대신 필요한 컬럼만 SELECT 해서 Row 튜플로 돌려줍니다.
+# Row 는 identity map / unit of work 에 등록되지 않으므로 객체 생성·상태 추적 비용이 없고,
+# fields 로 고른 컬럼(sparse fieldset)만 DB에서 읽습니다. id 는 커서 계산에 필요하므로 항상 포함합니다.
+# excerpt 가 주어지면 content 를 DB에서 앞 excerpt 글자만 잘라 읽습니다 (긴 본문을 통째로 옮기지 않음).
+# Row 도 속성 이름으로 접근할 수 있으므로 (row.id, row.title ...) 엔티티를 쓰던 코드는 그대로 동작합니다.
+# 컬럼 순서는 schemas.Post / schemas.Comment 의 필드 순서와 같게 둡니다 (fast_json 이 튜플을 그대로 씀).
+POST_LIST_COLUMNS = {
+    "id": models.Post.id,
+    "title": models.Post.title,
+    "content": models.Post.content,
+    "owner_id": models.Post.owner_id,
+    "comment_count": models.Post.comment_count,
+    "last_comment_at": models.Post.last_comment_at,
+}
+COMMENT_LIST_COLUMNS = {
+    "content": models.Comment.content,
+    "id": models.Comment.id,
+    "post_id": models.Comment.post_id,
+    "owner_id": models.Comment.owner_id,
+}
+
+
+def _list_columns(columns: dict, fields=None, excerpt: int | None = None, always=("id",)) -> list:
+    selected = []
+    for name, column in columns.items():
+        if fields is not None and name not in always and name not in fields:
+            continue
+        if name == "content" and excerpt is not None:
+            column = func.substr(column, 1, excerpt).label("content")
+        selected.append(column)
+    return selected
 
-# 모든 게시글 조회 함수 (간단하게)
-def get_posts(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Post).offset(skip).limit(limit).all()
+# -----------------
+# 🧱 공유 쿼리 빌더
+# -----------------
+# 조회 문장은 여기서 한 번만 만들고, 아래의 동기(Session) / 비동기(AsyncSession) 함수는 실행만 합니다.
+# (같은 쿼리를 두 벌 유지하다 한쪽만 고쳐지는 일이 없도록, check_query_plans 도 이 빌더로 실행 계획을 확인합니다.)
+def user_by_username_query(username: str):
+    return select(models.User).where(models.User.username == username)
+
+def posts_query(skip: int = 0, limit: int = 10, after_id: int | None = None, fields=None, excerpt: int | None = None):
+    query = select(*_list_columns(POST_LIST_COLUMNS, fields, excerpt))
+    if after_id is not None:
+        query = query.where(models.Post.id > after_id)
+    return query.order_by(models.Post.id).offset(skip).limit(limit)
+
+def comments_query(
+    post_id: int, limit: int | None = None, after_id: int | None = None, fields=None, excerpt: int | None = None
+):
+    query = select(*_list_columns(COMMENT_LIST_COLUMNS, fields, excerpt)).where(models.Comment.post_id == post_id)
+    if after_id is not None:
+        query = query.where(models.Comment.id > after_id)
+    return query.order_by(models.Comment.id).limit(limit)
+
+# 게시글 상세: 게시글(+작성자) 1번, 댓글 페이지(+각 작성자) 1번 → 댓글 수와 관계없이 쿼리 2개
+def post_detail_query(post_id: int):
+    return select(models.Post).options(joinedload(models.Post.owner)).where(models.Post.id == post_id)
+
+def post_detail_comments_query(post_id: int, comment_limit: int):
+    return (
+        select(models.Comment)
+        .options(joinedload(models.Comment.owner))
+        .where(models.Comment.post_id == post_id)
+        .order_by(models.Comment.id)
+        .limit(comment_limit)
+    )
+
+# 모든 게시글 조회 함수
+# after_id 가 주어지면 키셋 방식(id > after_id)으로 찾아가므로 깊은 페이지도 OFFSET 처럼 느려지지 않습니다.
+def get_posts(
+    db: Session, skip: int = 0, limit: int = 10, after_id: int | None = None, fields=None, excerpt: int | None = None
+):
+    return db.execute(posts_query(skip, limit, after_id, fields, excerpt)).all()
+
+# -----------------
+# 🔥 활동순 피드 (sort=activity)
+# -----------------
+# 최근에 댓글이 달린 게시글부터 (last_comment_at DESC, id DESC), 댓글이 없는 게시글은 그 뒤에 id 역순으로 보여 줍니다.
+# 두 구간을 각각 ix_posts_last_comment_at_id 로 읽는 쿼리로 나눕니다 (NULL 을 섞은 정렬/비교는 인덱스를 못 탐).
+# after 는 마지막으로 받은 행의 (last_comment_at, id) 이고, 커서 계산에 필요하므로 last_comment_at 은 항상 조회합니다.
+def activity_queries(limit: int, after=None, fields=None, excerpt: int | None = None):
+    columns = _list_columns(POST_LIST_COLUMNS, fields, excerpt, always=("id", "last_comment_at"))
+    post = models.Post
+    active = select(*columns).where(post.last_comment_at.is_not(None))
+    idle = select(*columns).where(post.last_comment_at.is_(None))
+    if after is not None:
+        last_comment_at, last_id = after
+        if last_comment_at is None:
+            active = None
+            idle = idle.where(post.id < last_id)
+        else:
+            active = active.where(tuple_(post.last_comment_at, post.id) < (last_comment_at, last_id))
+    if active is not None:
+        active = active.order_by(post.last_comment_at.desc(), post.id.desc()).limit(limit)
+    return active, idle.order_by(post.id.desc())
+
+def get_posts_by_activity(db: Session, limit: int = 10, after=None, fields=None, excerpt: int | None = None):
+    active, idle = activity_queries(limit, after, fields, excerpt)
+    rows = db.execute(active).all() if active is not None else []
+    if len(rows) < limit:
+        rows += db.execute(idle.limit(limit - len(rows))).all()
+    return rows
+
+# 게시글 상세 조회 (post_detail_query 참고)
+def get_post_detail(db: Session, post_id: int, comment_limit: int):
+    post = db.scalars(post_detail_query(post_id)).first()
+    if post is None:
+        return None, []
+    return post, db.scalars(post_detail_comments_query(post_id, comment_limit)).all()
 
 def create_comment_for_post(db: Session, comment: CommentCreate, post_id: int, user_id: int):
     db_comment = models.Comment(
@@ -62,9 +289,264 @@ def create_comment_for_post(db: Session, comment: CommentCreate, post_id: int, u
         owner_id=user_id
     )
     db.add(db_comment)
+    db.flush()
+    _execute_side_statements(db, comments=[db_comment])
     db.commit()
     db.refresh(db_comment)
+    _after_comments_committed([db_comment])
     return db_comment
 
-def get_comments_by_post(db: Session, post_id: int):
-    return db.query(models.Comment).filter(models.Comment.post_id == post_id).all()
\ No newline at end of file
+def get_comments_by_post(
+    db: Session, post_id: int, limit: int | None = None, after_id: int | None = None, fields=None,
+    excerpt: int | None = None,
+):
+    return db.execute(comments_query(post_id, limit, after_id, fields, excerpt)).all()
+
+
+# -----------------
+# ⚡ 비동기(AsyncSession) 버전
+# -----------------
+# 위의 동기 함수들과 동일한 동작을 하지만(같은 쿼리 빌더 사용), DB 왕복 동안 이벤트 루프를 막지 않습니다.
+# main.py의 라우트 핸들러와 auth_token.get_current_user는 이 함수들을 사용합니다.
+
+async def get_user_by_username_async(db: AsyncSession, username: str):
+    return (await db.scalars(user_by_username_query(username))).first()
+
+async def create_user_async(db: AsyncSession, user: UserCreate):
+    # 비밀번호 해싱은 CPU를 오래 쓰므로 해싱 전용 프로세스 풀에서 실행합니다
+    # (대기열이 가득 차면 auth_utils.PasswordHashingBusy 발생)
+    hashed_password = await get_password_hash_async(user.password)
+
+    db_user = models.User(username=user.username, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await login_limiter.forget_unknown_user(user.username)
+    return db_user
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    # 없는 사용자 이름: 최근에 DB에서 없다고 확인한 이름이면 조회를 건너뛰고,
+    # 어느 쪽이든 가짜 검증을 수행해 있는 사용자와 응답 시간이 같도록 합니다.
+    if await login_limiter.is_unknown_user(username):
+        await dummy_verify_password_async()
+        return None
+    user = await get_user_by_username_async(db, username=username)
+    if not user:
+        await login_limiter.remember_unknown_user(username)
+        await dummy_verify_password_async()
+        return None
+
+    verified, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not verified:
+        return None
+
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
+
+    return user
+
+async def _execute_side_statements_async(db: AsyncSession, posts=(), comments=()):
+    for statement, params in _write_side_statements(db, posts, comments):
+        await db.execute(statement, params)
+
+async def create_user_post_async(db: AsyncSession, post: PostCreate, user_id: int):
+    db_post = models.Post(**post.model_dump(), owner_id=user_id)
+    db.add(db_post)
+    await db.flush()
+    await _execute_side_statements_async(db, posts=[db_post])
+    await db.commit()
+    await db.refresh(db_post)
+    await _after_posts_committed_async([db_post])
+    return db_post
+
+async def create_user_posts_bulk_async(db: AsyncSession, posts: list[PostCreate], user_id: int):
+    rows = [{**post.model_dump(), "owner_id": user_id} for post in posts]
+    if _supports_bulk_returning(db):
+        db_posts = _sorted_by_id(await db.scalars(insert(models.Post).returning(models.Post), rows))
+    else:
+        # 새 글에는 아직 댓글이 없습니다 (flush 뒤에도 속성이 채워져 있도록 명시, 지연 로딩 방지)
+        db_posts = [models.Post(**row, last_comment_at=None) for row in rows]
+        db.add_all(db_posts)
+        await db.flush()
+    await _execute_side_statements_async(db, posts=db_posts)
+    await db.commit()
+    await _after_posts_committed_async(db_posts)
+    return db_posts
+
+async def create_comments_for_post_bulk_async(
+    db: AsyncSession, comments: list[CommentCreate], post_id: int, user_id: int
+):
+    rows = [{"content": comment.content, "post_id": post_id, "owner_id": user_id} for comment in comments]
+    return await create_comments_batch_async(db, rows)
+
+async def create_comments_batch_async(db: AsyncSession, rows: list[dict]):
+    # 여러 게시글에 걸친 댓글 행({"content", "post_id", "owner_id"[, "provisional_id"]})을 한 트랜잭션으로 저장합니다.
+    # (comment_queue 의 write-behind 플러시에서도 사용)
+    if _supports_bulk_returning(db):
+        db_comments = _sorted_by_id(await db.scalars(insert(models.Comment).returning(models.Comment), rows))
+    else:
+        db_comments = [models.Comment(**row) for row in rows]
+        db.add_all(db_comments)
+        await db.flush()
+    await _execute_side_statements_async(db, comments=db_comments)
+    await db.commit()
+    await _after_comments_committed_async(db_comments)
+    return db_comments
+
+async def get_saved_provisional_ids_async(db: AsyncSession, provisional_ids: list[str]) -> set[str]:
+    # write-behind 큐가 다시 저장하려는 댓글 중 이미 커밋된 것 (재시도/로그 재생을 멱등하게)
+    result = await db.scalars(
+        select(models.Comment.provisional_id).where(models.Comment.provisional_id.in_(provisional_ids))
+    )
+    return set(result)
+
+async def get_post_async(db: AsyncSession, post_id: int):
+    return await db.get(models.Post, post_id)
+
+async def get_posts_async(
+    db: AsyncSession, skip: int = 0, limit: int = 10, after_id: int | None = None, fields=None,
+    excerpt: int | None = None,
+):
+    return (await db.execute(posts_query(skip, limit, after_id, fields, excerpt))).all()
+
+async def get_posts_by_activity_async(
+    db: AsyncSession, limit: int = 10, after=None, fields=None, excerpt: int | None = None
+):
+    active, idle = activity_queries(limit, after, fields, excerpt)
+    rows = (await db.execute(active)).all() if active is not None else []
+    if len(rows) < limit:
+        rows += (await db.execute(idle.limit(limit - len(rows)))).all()
+    return rows
+
+async def get_post_detail_async(db: AsyncSession, post_id: int, comment_limit: int):
+    post = (await db.scalars(post_detail_query(post_id))).first()
+    if post is None:
+        return None, []
+    return post, (await db.scalars(post_detail_comments_query(post_id, comment_limit))).all()
+
+async def create_comment_for_post_async(db: AsyncSession, comment: CommentCreate, post_id: int, user_id: int):
+    db_comment = models.Comment(
+        content=comment.content,
+        post_id=post_id,
+        owner_id=user_id
+    )
+    db.add(db_comment)
+    await db.flush()
+    await _execute_side_statements_async(db, comments=[db_comment])
+    await db.commit()
+    await db.refresh(db_comment)
+    await _after_comments_committed_async([db_comment])
+    return db_comment
+
+async def get_comments_by_post_async(
+    db: AsyncSession, post_id: int, limit: int | None = None, after_id: int | None = None, fields=None,
+    excerpt: int | None = None,
+):
+    return (await db.execute(comments_query(post_id, limit, after_id, fields, excerpt))).all()
+
+# -----------------
+# 🔎 전문 검색 (search.py 참고)
+# -----------------
+# 순위 쿼리로 한 페이지의 (종류, id, 점수)를 얻고, 그 문서들만 제목/미리보기를 조회합니다.
+# after: 이전 페이지 마지막 결과의 (원래 점수, 종류, id). 지원하지 않는 DB면 None 을 반환합니다.
+def search_documents(db: Session, q: str, limit: int, after=None):
+    backend = search.backend_for(db.get_bind().dialect.name)
+    if backend is None:
+        return None
+    terms = search.query_terms(q)
+    if not terms:
+        return []
+    statement, params = backend.rank_statement(terms, limit, after)
+    hits = db.execute(statement, params).all()
+    if not hits:
+        return []
+    statement, params = backend.details_statement(terms, hits)
+    return search.merge_results(hits, db.execute(statement, params).all())
+
+async def search_documents_async(db: AsyncSession, q: str, limit: int, after=None):
+    backend = search.backend_for(db.get_bind().dialect.name)
+    if backend is None:
+        return None
+    terms = search.query_terms(q)
+    if not terms:
+        return []
+    statement, params = backend.rank_statement(terms, limit, after)
+    hits = (await db.execute(statement, params)).all()
+    if not hits:
+        return []
+    statement, params = backend.details_statement(terms, hits)
+    return search.merge_results(hits, (await db.execute(statement, params)).all())
+
+# -----------------
+# 🔄 리프레시 토큰 / 폐기(revocation) 목록
+# -----------------
+async def create_refresh_token_async(
+    db: AsyncSession, jti: str, family_id: str, user_id: int, access_jti: str, expires_at
+):
+    db.add(models.RefreshToken(
+        id=jti, family_id=family_id, user_id=user_id, access_jti=access_jti, expires_at=expires_at, revoked=False
+    ))
+    await db.commit()
+
+async def use_refresh_token_async(db: AsyncSession, jti: str, now):
+    # 아직 쓰이지 않았고 폐기/만료되지 않은 토큰이면 used_at 을 기록하고 행을 반환합니다.
+    # 조건부 UPDATE 이므로 같은 토큰으로 동시에 들어온 요청 중 하나만 성공합니다.
+    result = await db.execute(
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.id == jti,
+            models.RefreshToken.used_at.is_(None),
+            models.RefreshToken.revoked.is_not(True),
+            models.RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return None
+    await db.commit()
+    return await db.get(models.RefreshToken, jti)
+
+async def get_refresh_token_async(db: AsyncSession, jti: str):
+    return await db.get(models.RefreshToken, jti)
+
+async def revoke_refresh_family_async(db: AsyncSession, family_id: str) -> list[str]:
+    # family 의 모든 리프레시 토큰을 폐기하고, 함께 발급된 액세스 토큰 jti 목록을 반환합니다.
+    result = await db.execute(
+        select(models.RefreshToken.access_jti).where(models.RefreshToken.family_id == family_id)
+    )
+    access_jtis = [jti for jti in result.scalars().all() if jti]
+    await db.execute(
+        update(models.RefreshToken).where(models.RefreshToken.family_id == family_id).values(revoked=True)
+    )
+    await db.commit()
+    return access_jtis
+
+async def add_revoked_tokens_async(db: AsyncSession, entries: dict):
+    # entries: {jti: 원래 토큰의 만료 시각}. 이미 폐기된 jti 는 건너뜁니다.
+    if not entries:
+        return
+    result = await db.execute(select(models.RevokedToken.jti).where(models.RevokedToken.jti.in_(list(entries))))
+    existing = set(result.scalars().all())
+    db.add_all(
+        models.RevokedToken(jti=jti, expires_at=expires_at)
+        for jti, expires_at in entries.items()
+        if jti not in existing
+    )
+    await db.commit()
+
+async def get_revoked_tokens_since_async(db: AsyncSession, after_id: int, now):
+    # 증분 동기화: 마지막으로 읽은 id 이후에 추가된, 아직 만료되지 않은 폐기 항목
+    result = await db.execute(
+        select(models.RevokedToken)
+        .where(models.RevokedToken.id > after_id, models.RevokedToken.expires_at > now)
+        .order_by(models.RevokedToken.id)
+    )
+    return result.scalars().all()
+
+async def delete_expired_tokens_async(db: AsyncSession, now):
+    # 만료된 폐기 항목/리프레시 토큰은 더 이상 검사할 필요가 없으므로 지웁니다.
+    await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= now))
+    await db.execute(delete(models.RefreshToken).where(models.RefreshToken.expires_at <= now))
+    await db.commit()
@@ -0,0 +1,132 @@
+﻿import os
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metrics import Counter, Gauge, Histogram
+
+# -----------------
+# 🔌 커넥션 풀 설정 (환경 변수)
+# -----------------
+# 기본값은 SQLAlchemy 기본값과 같고, recycle 만 MySQL wait_timeout(기본 8시간)보다 충분히 짧게 잡았습니다.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+# 풀이 가득 찼을 때 커넥션을 기다리는 최대 시간 (초). 넘으면 sqlalchemy.exc.TimeoutError
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# 이 시간(초)보다 오래된 커넥션은 다시 연결합니다 (서버 쪽 wait_timeout 으로 끊긴 커넥션 방지)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# 체크아웃할 때마다 가벼운 ping 으로 죽은 커넥션을 걸러냅니다.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# 문장 실행 시간 제한 (ms, 0 이면 사용 안 함). MySQL: max_execution_time, PostgreSQL: statement_timeout
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+
+db_pool_checkouts_total = Counter("db_pool_checkouts_total", "Connections checked out of the pool", ["engine"])
+db_pool_connects_total = Counter("db_pool_connects_total", "New DBAPI connections opened by the pool", ["engine"])
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (including connect and pre-ping)",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+db_pool_timeouts_total = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up because the pool was exhausted", ["engine"]
+)
+db_pool_checked_out = Gauge("db_pool_checked_out", "Connections currently checked out", ["engine"])
+db_pool_checked_out_peak = Gauge(
+    "db_pool_checked_out_peak", "Highest number of connections checked out at once since start", ["engine"]
+)
+db_pool_overflow = Gauge("db_pool_overflow", "Connections open beyond pool_size (negative: unused pool slots)", ["engine"])
+db_pool_capacity = Gauge("db_pool_capacity", "pool_size + max_overflow", ["engine"])
+
+
+# 체크아웃 대기 시간과 고갈 횟수는 해당하는 풀 이벤트가 없으므로 공개 메서드 Pool.connect() 를 감싸서 잽니다
+# (Engine 은 커넥션마다 pool.connect() 를 호출합니다). 나머지 지표는 install_pool_metrics 의 풀 이벤트로 모읍니다.
+class _InstrumentedPoolMixin:
+    engine_label = ""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            db_pool_timeouts_total.inc(engine=self.engine_label)
+            raise
+        db_pool_checkout_wait_seconds.observe(time.perf_counter() - start, engine=self.engine_label)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    engine_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def install_pool_metrics(engine, label: str):
+    # 풀 이벤트(checkout / checkin / connect)로 체크아웃 수, 새 커넥션 수, 사용 중/초과 커넥션 게이지를 갱신합니다.
+    # 게이지 값은 이벤트 시점의 pool.checkedout() / pool.overflow() 입니다. (engine.dispose() 로 풀이 바뀌어도
+    # 리스너는 새 풀로 복사되므로 engine.pool 을 매번 다시 읽습니다.)
+    if not isinstance(engine.pool, QueuePool):
+        return  # 인메모리 SQLite 의 단일 커넥션 풀 등: 크기 개념이 없음
+
+    def _update_gauges(returning: int = 0):
+        pool = engine.pool
+        checked_out = pool.checkedout() - returning
+        db_pool_checked_out.set(checked_out, engine=label)
+        db_pool_overflow.set(pool.overflow(), engine=label)
+        if checked_out > db_pool_checked_out_peak.value(engine=label):
+            db_pool_checked_out_peak.set(checked_out, engine=label)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        db_pool_connects_total.inc(engine=label)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts_total.inc(engine=label)
+        _update_gauges()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        # checkin 이벤트는 커넥션이 풀에 돌아가기 직전에 호출되므로 반납 중인 1개를 빼고 셉니다.
+        _update_gauges(returning=1)
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    # create_engine / create_async_engine 에 넘길 풀 관련 인자
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # 인메모리 SQLite 는 커넥션마다 DB가 달라지므로 SQLAlchemy 기본 풀(단일 커넥션)을 그대로 씁니다.
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    db_pool_capacity.set(DB_POOL_SIZE + DB_MAX_OVERFLOW, engine="async" if is_async else "sync")
+    return options
+
+
+def install_statement_timeout(engine):
+    # 새 커넥션마다 세션 단위 문장 실행 시간 제한을 겁니다. (SQLite 는 지원하지 않아 건너뜁니다)
+    if DB_STATEMENT_TIMEOUT_MS <= 0:
+        return
+    dialect = engine.dialect.name
+    if dialect == "mysql":
+        statement = f"SET SESSION max_execution_time = {DB_STATEMENT_TIMEOUT_MS}"
+    elif dialect == "postgresql":
+        statement = f"SET statement_timeout = {DB_STATEMENT_TIMEOUT_MS}"
+    else:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(statement)
+        cursor.close()
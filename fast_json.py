@@ -0,0 +1,112 @@
+﻿import json
+import os
+from datetime import datetime
+from operator import attrgetter, itemgetter
+
+from fastapi import Response, status
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.engine import Row
+
+try:  # orjson 은 선택 의존성입니다. 없으면 표준 json 으로 같은 바이트를 만듭니다.
+    import orjson
+except ImportError:
+    orjson = None
+
+# -----------------
+# ⚡ ORM 결과 → JSON 바이트 직행 경로
+# -----------------
+# response_model 경로는 행마다 from_attributes 검증으로 Pydantic 객체를 만든 뒤 직렬화합니다.
+# 목록 응답(게시글/댓글 페이지, 일괄 생성 결과)에서는 이 검증이 요청당 CPU 의 대부분을 차지하는데,
+# DB 에서 방금 읽은 행은 이미 스키마와 같은 타입이므로 검증할 필요가 없습니다.
+# 여기서는 스키마의 필드 이름으로 attrgetter 를 미리 만들어 두고 행에서 값만 꺼내 바로 직렬화합니다.
+# (라우트의 response_model 은 그대로 두므로 OpenAPI 스키마는 바뀌지 않습니다.)
+#
+# - ORM 객체는 이미 읽어 둔 값이 있는 인스턴스 __dict__ 에서 바로 꺼냅니다 (계측된 속성 접근을 건너뜀).
+#   만료되었거나 지연 로딩인 속성이 있는 행만 일반 속성 접근으로 읽습니다.
+# - 컬럼만 조회한 Row 는 튜플이므로 컬럼 위치로 꺼냅니다 (Row 의 이름 접근은 느림).
+#   일부 컬럼만 조회한 Row (fields= sparse fieldset)는 조회한 필드만 내보냅니다.
+#   only 를 주면 그중에서도 only 에 있는 필드만 내보냅니다 (커서 계산용으로만 조회한 컬럼을 응답에서 뺄 때).
+# - 필드 순서와 구분자가 Pydantic 의 dump_json 과 같아서 같은 바이트(= 같은 ETag)가 나옵니다.
+# - 중첩 모델 필드가 있는 스키마(PostDetail 등)에는 쓰지 않습니다.
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "1") == "1"
+
+
+class RowSerializer:
+    def __init__(self, schema: type[BaseModel]):
+        self.fields = tuple(schema.model_fields)
+        self._getter = attrgetter(*self.fields)
+        self._single = len(self.fields) == 1
+        self._adapter = TypeAdapter(list[schema])
+
+    def _row_fields(self, rows, only=None) -> tuple:
+        # Row 목록에서 내보낼 필드 (스키마 순서). ORM 객체면 스키마의 모든 필드입니다.
+        if rows and isinstance(rows[0], Row):
+            keys = rows[0]._fields
+            return tuple(name for name in self.fields if name in keys and (only is None or name in only))
+        return self.fields
+
+    def to_dicts(self, rows, only=None) -> list[dict]:
+        if not rows:
+            return []
+        if isinstance(rows[0], Row):
+            keys = rows[0]._fields
+            fields = self._row_fields(rows, only)
+            # 조회한 컬럼 순서가 필드 순서와 같으면 튜플 그대로, 아니면 위치를 골라 꺼냅니다.
+            if keys == fields:
+                return [dict(zip(fields, row)) for row in rows]
+            getter = itemgetter(*(keys.index(name) for name in fields))
+            if len(fields) == 1:
+                return [{fields[0]: getter(row)} for row in rows]
+            return [dict(zip(fields, getter(row))) for row in rows]
+
+        fields = self.fields
+        dicts = []
+        for row in rows:
+            loaded = row.__dict__
+            try:
+                dicts.append({name: loaded[name] for name in fields})
+            except KeyError:
+                values = self._getter(row)
+                dicts.append({fields[0]: values} if self._single else dict(zip(fields, values)))
+        return dicts
+
+    def dump_list(self, rows, only=None) -> bytes:
+        if not FAST_JSON_ENABLED and self._row_fields(rows, only) == self.fields:
+            # 비교/문제 해결용: 기존과 같은 검증 + 직렬화 경로 (일부 필드만 조회한 Row 는 검증할 수 없으므로 제외)
+            return self._adapter.dump_json(self._adapter.validate_python(rows))
+        return dumps(self.to_dicts(rows, only))
+
+
+def dumps(value) -> bytes:
+    # dict/list 를 Pydantic dump_json 과 같은 형식(공백 없음, UTF-8 그대로)의 바이트로 직렬화합니다.
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+def _default(value):
+    # 표준 json 경로: datetime 은 Pydantic/orjson 과 같은 ISO 8601 문자열로
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_serializers: dict[type[BaseModel], RowSerializer] = {}
+
+
+def serializer_for(schema: type[BaseModel]) -> RowSerializer:
+    serializer = _serializers.get(schema)
+    if serializer is None:
+        serializer = _serializers[schema] = RowSerializer(schema)
+    return serializer
+
+
+def dump_list(schema: type[BaseModel], rows, only=None) -> bytes:
+    return serializer_for(schema).dump_list(rows, only)
+
+
+def list_response(schema: type[BaseModel], rows, status_code: int = status.HTTP_200_OK, headers: dict | None = None) -> Response:
+    # Response 를 직접 반환하면 FastAPI 는 response_model 검증을 건너뜁니다.
+    return Response(
+        content=dump_list(schema, rows), status_code=status_code, media_type="application/json", headers=headers
+    )
@@ -0,0 +1,204 @@
+﻿import collections
+import contextvars
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+
+from metrics import Counter, Histogram
+
+# -----------------
+# ⏱️ 요청 계측: 라우트별 지연 시간, 요청당 SQL 수/DB 시간, Server-Timing 헤더
+# -----------------
+# RequestMetricsMiddleware 는 순수 ASGI 미들웨어입니다 (BaseHTTPMiddleware 는 요청마다 태스크/큐를 더 만들고
+# 스트리밍 응답을 감싸므로 쓰지 않음). 요청마다 RequestStats 를 contextvar 에 두고,
+# install_sql_hooks 로 엔진에 건 before/after_cursor_execute 리스너가 그 요청의 쿼리 수와 DB 시간을 더합니다.
+# (AsyncSession 의 쿼리도 같은 태스크의 greenlet 에서 실행되므로 contextvar 가 그대로 보입니다.)
+# - 라벨의 route 는 실제 경로가 아니라 라우트 템플릿입니다 (/posts/{post_id}). 매칭되지 않은 요청은 "unmatched".
+# - Server-Timing: 응답 헤더를 보내는 시점까지의 값입니다 (app = 첫 바이트까지 걸린 시간, db = 그중 SQL 시간).
+#   스트리밍 응답(SSE)은 헤더 이후에 실행된 쿼리가 빠지고, 지연 시간 히스토그램에는 스트림 전체 길이가 기록됩니다.
+# - 백그라운드 작업(write-behind 플러시, 폐기 목록 동기화)의 쿼리는 요청이 없으므로 전체 카운터에만 더합니다.
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "1") == "1"
+# 브라우저 개발자 도구/클라이언트에 서버 내부 시간을 보여 줄지 (외부에 노출하기 싫으면 0)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+# GET /metrics (Prometheus 텍스트): 라우트별 지연 시간/SQL 수, 풀 상태 등 내부 정보가 들어 있으므로 기본은 닫혀 있습니다.
+# 수집기(Prometheus)가 접근할 수 있는 내부망에서만 1 로 켜세요 (CORS 가 모든 출처를 허용하므로 공개 포트에서는 주의).
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+# 샘플링 프로파일러 (선택): 1 이면 GET /debug/profile 을 열고, PROFILER_OUTPUT 을 지정하면
+# 프로세스가 떠 있는 동안 계속 샘플링해서 종료할 때 그 파일에 씁니다. 내부/개발 환경에서만 켜세요.
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+PROFILER_OUTPUT = os.getenv("PROFILER_OUTPUT", "")
+# /debug/profile 한 번에 샘플링할 수 있는 최대 시간 (초)
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to finishing its response",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while handling one request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 4, 5, 7, 10, 15, 25, 50, 100),
+)
+db_seconds_per_request = Histogram(
+    "db_seconds_per_request", "Time spent executing SQL while handling one request", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+db_queries_total = Counter("db_queries_total", "SQL statements executed", ["engine"])
+db_query_seconds_total = Counter("db_query_seconds_total", "Time spent executing SQL statements", ["engine"])
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+def install_sql_hooks(engine, label: str):
+    # 동기 엔진 또는 async_engine.sync_engine 에 겁니다 (database.py).
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        db_queries_total.inc(engine=label)
+        db_query_seconds_total.inc(elapsed, engine=label)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REQUEST_METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    app_ms = (time.perf_counter() - started) * 1000
+                    value = (
+                        f'app;dur={app_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                    )
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = _route_label(scope)
+            http_request_duration_seconds.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=status_code
+            )
+            db_queries_per_request.observe(stats.queries, method=scope["method"], route=route)
+            db_seconds_per_request.observe(stats.db_seconds, method=scope["method"], route=route)
+
+
+# -----------------
+# 🔬 샘플링 프로파일러 (선택)
+# -----------------
+# 별도 스레드가 PROFILER_INTERVAL_MS 마다 이벤트 루프 스레드의 호출 스택을 읽어 (sys._current_frames)
+# "folded stack" 형식(함수;함수;함수 횟수)으로 셉니다. 그대로 flamegraph.pl / speedscope 에 넣으면 됩니다.
+# 요청 처리 코드를 건드리지 않으므로 켜 둔 동안의 부하는 샘플링 스레드 하나뿐입니다.
+# 이벤트 루프가 할 일 없이 select 에서 기다린 샘플은 "(idle)" 하나로 모읍니다.
+class SamplingProfiler:
+    def __init__(self, interval: float = PROFILER_INTERVAL_MS / 1000, thread_id: int | None = None):
+        self.interval = interval
+        # 기본값은 프로파일러를 만든 스레드 (lifespan/라우트에서 만들면 이벤트 루프 스레드)
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples += 1
+            if stack[0].startswith(("select (selectors.py", "poll (selectors.py")):
+                self.stacks["(idle)"] += 1
+            else:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_lifetime_profiler: SamplingProfiler | None = None
+
+
+def start_lifetime_profiler():
+    # PROFILER_OUTPUT 이 지정되어 있으면 시작부터 종료까지 샘플링합니다 (lifespan 에서 호출).
+    global _lifetime_profiler
+    if PROFILER_ENABLED and PROFILER_OUTPUT and _lifetime_profiler is None:
+        _lifetime_profiler = SamplingProfiler()
+        _lifetime_profiler.start()
+
+
+def stop_lifetime_profiler():
+    global _lifetime_profiler
+    if _lifetime_profiler is None:
+        return
+    _lifetime_profiler.stop()
+    with open(PROFILER_OUTPUT, "w", encoding="utf-8") as output:
+        output.write(_lifetime_profiler.folded())
+    _lifetime_profiler = None
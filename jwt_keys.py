@@ -0,0 +1,263 @@
+﻿import argparse
+import json
+import os
+import threading
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+from jose.utils import base64url_encode
+
+# -----------------
+# 🔑 JWT 서명 키 관리 (키링 + kid + JWKS)
+# -----------------
+# JWT_KEYS_DIR 를 지정하지 않으면 예전과 같이 HS256 공유 비밀키(JWT_SECRET_KEY)로 서명/검증합니다.
+#
+# JWT_KEYS_DIR 를 지정하면 그 디렉터리의 PEM 파일들로 키링을 만듭니다 (파일 이름 = kid, 예: 2026-10.pem).
+# - 서명 키(active): JWT_ACTIVE_KID 의 개인 키. 지정하지 않으면 가장 최근에 수정된 개인 키.
+# - 검증 전용 키(retiring): 나머지 모든 키 (개인 키 또는 공개 키만 있어도 됨).
+#   키를 교체할 때는 새 키를 추가해 active 로 바꾸고, 이전 키는 토큰 만료 시간이 지날 때까지 남겨 둡니다.
+#   그러면 이미 발급된 토큰이 그대로 검증되므로 사용자가 로그아웃되지 않습니다.
+# - 알고리즘은 키 종류로 정해집니다: RSA → RS256, Ed25519 → EdDSA, EC P-256 → ES256
+# - 공개 키는 GET /.well-known/jwks.json 으로 공개되므로, 다른 노드/엣지는 서명 비밀 없이 검증할 수 있습니다.
+#
+# PEM 은 시작할 때 한 번만 파싱해 jose Key 객체로 들고 있으므로, 요청마다 키를 파싱하지 않습니다.
+# 키 생성: python jwt_keys.py generate --alg EdDSA --kid 2026-10 --dir ./keys
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "당신의_매우_매우_매우_안전한_비밀키")  # 실제 서비스에서는 절대로 노출되지 않게 하세요!
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+# 키 디렉터리로 옮겨 간 뒤에도 kid 가 없는 (예전 HS256) 토큰을 받아줄지 여부.
+# 예전 토큰이 모두 만료된 뒤(ACCESS_TOKEN_EXPIRE_MINUTES 이후)에는 false 로 바꾸세요.
+JWT_ACCEPT_LEGACY_HS256 = os.getenv("JWT_ACCEPT_LEGACY_HS256", "true").lower() in ("1", "true", "yes")
+# JWKS 응답을 다른 노드가 캐시해도 되는 시간 (초)
+JWT_JWKS_MAX_AGE = int(os.getenv("JWT_JWKS_MAX_AGE", 300))
+
+LEGACY_ALGORITHM = "HS256"
+
+
+class Ed25519Key(Key):
+    # python-jose 에는 EdDSA 가 없으므로 cryptography 로 구현해 jwk.register_key 로 등록합니다.
+    def __init__(self, key, algorithm):
+        if isinstance(key, (str, bytes)):
+            data = key.encode() if isinstance(key, str) else key
+            try:
+                key = serialization.load_pem_private_key(data, password=None)
+            except ValueError:
+                key = serialization.load_pem_public_key(data)
+        if not isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            raise TypeError("Ed25519Key requires an Ed25519 key")
+        self._key = key
+        self._algorithm = algorithm
+
+    def is_public(self) -> bool:
+        return isinstance(self._key, ed25519.Ed25519PublicKey)
+
+    def sign(self, msg):
+        return self._key.sign(msg)
+
+    def verify(self, msg, sig):
+        public = self._key if self.is_public() else self._key.public_key()
+        try:
+            public.verify(sig, msg)
+            return True
+        except InvalidSignature:
+            return False
+
+    def public_key(self):
+        if self.is_public():
+            return self
+        return Ed25519Key(self._key.public_key(), self._algorithm)
+
+    def to_dict(self):
+        public = self.public_key()._key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "alg": self._algorithm, "x": base64url_encode(public).decode()}
+
+
+jwk.register_key("EdDSA", Ed25519Key)
+
+
+class JwtKey:
+    # signer/verifier 는 미리 파싱된 jose Key 입니다 (검증은 항상 공개 키로).
+    __slots__ = ("kid", "algorithm", "signer", "verifier")
+
+    def __init__(self, kid: str | None, algorithm: str, signer: Key | None, verifier: Key):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.signer = signer  # 공개 키만 있는 검증 전용 키면 None
+        self.verifier = verifier
+
+    @property
+    def can_sign(self) -> bool:
+        return self.signer is not None
+
+    def public_jwk(self) -> dict | None:
+        if self.algorithm == LEGACY_ALGORITHM:
+            return None  # 대칭 키는 공개하지 않습니다.
+        data = dict(self.verifier.to_dict())
+        data.update({"kid": self.kid, "use": "sig", "alg": self.algorithm})
+        return data
+
+
+def _algorithm_for(key) -> str:
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return "RS256"
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "EdDSA"
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)) and key.curve.name == "secp256r1":
+        return "ES256"
+    raise ValueError(f"unsupported key type: {type(key).__name__}")
+
+
+def load_key_file(path: str) -> JwtKey:
+    # kid 는 파일 이름의 첫 '.' 앞부분입니다 (2026-10.pem, 2026-10.pub.pem → "2026-10").
+    kid = os.path.basename(path).split(".")[0]
+    with open(path, "rb") as key_file:
+        data = key_file.read()
+    try:
+        parsed = serialization.load_pem_private_key(data, password=None)
+        public = parsed.public_key()
+    except ValueError:
+        parsed = public = serialization.load_pem_public_key(data)
+    algorithm = _algorithm_for(parsed)
+    verifier = jwk.construct(_to_jose_input(public, algorithm), algorithm)
+    if parsed is public:
+        return JwtKey(kid, algorithm, None, verifier)
+    return JwtKey(kid, algorithm, jwk.construct(_to_jose_input(parsed, algorithm), algorithm), verifier)
+
+
+def _to_jose_input(key, algorithm: str):
+    # RSA/EC 는 jose 의 cryptography 백엔드가 PEM 을 받고, EdDSA(Ed25519Key)는 키 객체를 그대로 받습니다.
+    if algorithm == "EdDSA":
+        return key
+    if hasattr(key, "private_bytes"):
+        return key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    return key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+
+class KeyRing:
+    def __init__(self, signing: JwtKey, verifying: list[JwtKey], legacy: JwtKey | None = None):
+        self.signing = signing
+        self._by_kid = {key.kid: key for key in verifying if key.kid is not None}
+        self._by_kid[signing.kid] = signing
+        # kid 헤더가 없는 토큰을 검증할 키 (HS256)
+        self._legacy = signing if signing.kid is None else legacy
+
+    @property
+    def algorithm(self) -> str:
+        return self.signing.algorithm
+
+    def kids(self) -> list[str]:
+        return [kid for kid in self._by_kid if kid is not None]
+
+    def sign(self, claims: dict) -> str:
+        headers = {"kid": self.signing.kid} if self.signing.kid is not None else None
+        return jwt.encode(claims, self.signing.signer, algorithm=self.signing.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        # 헤더의 kid 로 키를 고르고, 그 키의 알고리즘만 허용합니다 (alg 바꿔치기 방지).
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._by_kid.get(kid) if kid is not None else self._legacy
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.verifier, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        keys = [key.public_jwk() for key in self._by_kid.values()]
+        return {"keys": [key for key in keys if key is not None]}
+
+
+def _legacy_key() -> JwtKey:
+    secret = jwk.construct(JWT_SECRET_KEY, LEGACY_ALGORITHM)
+    return JwtKey(None, LEGACY_ALGORITHM, secret, secret)
+
+
+def load_keyring(keys_dir: str = JWT_KEYS_DIR, active_kid: str = JWT_ACTIVE_KID) -> KeyRing:
+    if not keys_dir:
+        return KeyRing(_legacy_key(), [])
+
+    paths = sorted(
+        (os.path.join(keys_dir, name) for name in os.listdir(keys_dir) if name.endswith(".pem")),
+        key=os.path.getmtime,
+    )
+    keys: dict[str, JwtKey] = {}
+    for path in paths:
+        key = load_key_file(path)
+        # 같은 kid 의 개인 키와 공개 키가 함께 있으면 개인 키를 씁니다.
+        if key.kid not in keys or key.can_sign:
+            keys[key.kid] = key
+    signers = [key for key in keys.values() if key.can_sign]
+    if active_kid:
+        if active_kid not in keys or not keys[active_kid].can_sign:
+            raise RuntimeError(f"JWT_ACTIVE_KID={active_kid} has no private key in {keys_dir}")
+        signing = keys[active_kid]
+    elif signers:
+        signing = signers[-1]  # 가장 최근에 추가된 개인 키
+    else:
+        raise RuntimeError(f"no private key found in {keys_dir}")
+    legacy = _legacy_key() if JWT_ACCEPT_LEGACY_HS256 else None
+    return KeyRing(signing, list(keys.values()), legacy)
+
+
+_keyring: KeyRing | None = None
+_keyring_lock = threading.Lock()
+
+
+def get_keyring() -> KeyRing:
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = load_keyring()
+    return _keyring
+
+
+def reload_keyring() -> KeyRing:
+    # 키 디렉터리를 다시 읽어 교체합니다 (키 교체 후 재시작 없이 반영할 때).
+    global _keyring
+    keyring = load_keyring()
+    with _keyring_lock:
+        _keyring = keyring
+    return keyring
+
+
+# -----------------
+# 키 생성 명령
+# -----------------
+def generate_key(algorithm: str, kid: str, keys_dir: str) -> str:
+    if algorithm == "RS256":
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        private = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm == "ES256":
+        private = ec.generate_private_key(ec.SECP256R1())
+    else:
+        raise ValueError(f"unsupported algorithm: {algorithm}")
+    os.makedirs(keys_dir, exist_ok=True)
+    path = os.path.join(keys_dir, f"{kid}.pem")
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    # 개인 키는 소유자만 읽을 수 있게 만듭니다.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as key_file:
+        key_file.write(pem)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JWT signing key tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="create a new private key file in the key directory")
+    generate.add_argument("--alg", choices=["RS256", "EdDSA", "ES256"], default="EdDSA")
+    generate.add_argument("--kid", required=True)
+    generate.add_argument("--dir", default=JWT_KEYS_DIR or "./keys")
+    commands.add_parser("jwks", help="print the JWKS document for the configured key directory")
+    args = parser.parse_args()
+    if args.command == "generate":
+        print(generate_key(args.alg, args.kid, args.dir))
+    else:
+        print(json.dumps(load_keyring().jwks(), indent=2))
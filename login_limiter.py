@@ -0,0 +1,319 @@
+﻿import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from metrics import Counter
+
+# -----------------
+# 🛡️ 로그인 시도 제한 (credential stuffing / 무차별 대입 방어)
+# -----------------
+# POST /token 은 서비스에서 가장 비싼 요청입니다 (비밀번호 검증 1회 = 수백 ms CPU).
+# 아래 검사는 DB 조회와 해싱보다 먼저 실행되어, 제한에 걸린 요청은 CPU 를 거의 쓰지 않고 429 로 거절됩니다.
+#
+# 1. 토큰 버킷 (클라이언트 IP별, 사용자 이름별): 시도할 때마다 토큰 1개를 쓰고 창(window) 동안 천천히 다시 채워집니다.
+#    (토큰이 연속적으로 채워지므로 고정 창과 달리 창 경계에서 한꺼번에 몰리는 시도를 허용하지 않는 슬라이딩 창입니다.)
+# 2. 잠금 백오프: 같은 사용자 이름으로 연속 LOGIN_LOCKOUT_THRESHOLD 번 실패하면 잠금 시간이 2배씩 늘어납니다.
+#    로그인에 성공하면 실패 횟수와 잠금이 초기화됩니다.
+# 3. 없는 사용자 이름 캐시: DB에 없는 이름을 기억해 두고 DB 조회를 건너뜁니다. 이때도 가짜 검증을 수행하므로
+#    (auth_utils.dummy_verify_password_async) 응답 시간만으로 사용자 존재 여부를 알 수 없습니다.
+#
+# 클라이언트 IP 는 request.client.host 를 씁니다. 리버스 프록시 뒤에서는 uvicorn 의 --proxy-headers /
+# --forwarded-allow-ips 로 X-Forwarded-For 를 신뢰하도록 설정해야 IP별 제한이 의미가 있습니다.
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "1") == "1"
+LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")  # memory | sqlite
+# sqlite 백엔드: 같은 호스트의 여러 워커 프로세스가 카운터를 함께 씁니다 (Redis 등을 대신하는 로컬 대용)
+LOGIN_RATE_LIMIT_SQLITE_PATH = os.getenv("LOGIN_RATE_LIMIT_SQLITE_PATH", "./login_limiter.db")
+LOGIN_RATE_WINDOW_SECONDS = float(os.getenv("LOGIN_RATE_WINDOW_SECONDS", 60))
+LOGIN_IP_MAX_ATTEMPTS = int(os.getenv("LOGIN_IP_MAX_ATTEMPTS", 30))  # 창당 IP별 최대 시도 수
+LOGIN_USERNAME_MAX_ATTEMPTS = int(os.getenv("LOGIN_USERNAME_MAX_ATTEMPTS", 10))  # 창당 사용자 이름별 최대 시도 수
+LOGIN_LOCKOUT_THRESHOLD = int(os.getenv("LOGIN_LOCKOUT_THRESHOLD", 5))
+LOGIN_LOCKOUT_BASE_SECONDS = float(os.getenv("LOGIN_LOCKOUT_BASE_SECONDS", 2))
+LOGIN_LOCKOUT_MAX_SECONDS = float(os.getenv("LOGIN_LOCKOUT_MAX_SECONDS", 900))
+# 마지막 실패 후 이 시간이 지나면 연속 실패 횟수를 잊습니다.
+LOGIN_FAILURE_TTL_SECONDS = float(os.getenv("LOGIN_FAILURE_TTL_SECONDS", 3600))
+# 없는 사용자 이름을 기억하는 시간. 다른 워커에서 가입한 이름은 (memory 백엔드에서) 최대 이 시간 동안 로그인되지 않습니다.
+LOGIN_UNKNOWN_USER_TTL_SECONDS = float(os.getenv("LOGIN_UNKNOWN_USER_TTL_SECONDS", 60))
+# memory 백엔드가 기억하는 최대 키 수 (무작위 IP/이름으로 메모리를 채우는 공격 대비, 오래된 키부터 버림).
+# 만료되지 않은 잠금/연속 실패 기록은 버리지 않습니다 (다른 키를 잔뜩 만들어 잠금을 풀 수 없도록).
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", 100_000))
+
+login_rate_limited_total = Counter(
+    "login_rate_limited_total", "Login attempts rejected before authentication", ["reason"]
+)
+login_unknown_user_cache_hits_total = Counter(
+    "login_unknown_user_cache_hits_total", "Logins for a cached unknown username (DB lookup skipped)"
+)
+
+
+class LoginRateLimited(Exception):
+    def __init__(self, retry_after: float, reason: str):
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class LimiterStore(ABC):
+    # 저장소 인터페이스 (Redis 의 토큰 버킷 스크립트 / INCR + EXPIRE / SET EX 에 해당하는 연산)
+    # blocking 이 True 인 저장소(파일/네트워크 I/O)는 LoginLimiter 가 스레드에서 호출합니다.
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, capacity: int, refill_per_second: float, now: float) -> float:
+        # 토큰 1개를 씁니다. 허용이면 0, 아니면 다음 토큰까지 남은 초를 반환합니다.
+        ...
+
+    @abstractmethod
+    def incr(self, key: str, ttl: float, now: float) -> int:
+        # 만료 시간이 있는 카운터를 1 올리고 새 값을 반환합니다 (만료 시간은 매번 now + ttl 로 갱신).
+        ...
+
+    @abstractmethod
+    def get_until(self, key: str, now: float) -> float:
+        # set_until 로 저장한 시각 (지났거나 없으면 0)
+        ...
+
+    @abstractmethod
+    def set_until(self, key: str, until: float):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryLimiterStore(LimiterStore):
+    # 프로세스 안의 저장소. 값은 [값, 갱신 시각, 만료 시각] 이고, 키 수가 max_keys 를 넘으면 오래된 키부터 버립니다.
+    # 만료되지 않은 PROTECTED_PREFIXES 키(잠금, 연속 실패 횟수)는 버리지 않고 뒤로 보냅니다.
+    # 이런 키만 남았으면 max_keys 를 넘더라도 보관합니다 (각자 만료 시각이 있으므로 무한히 늘지는 않음).
+    PROTECTED_PREFIXES = ("lock:", "fail:")
+
+    def __init__(self, max_keys: int = LOGIN_RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) <= self.max_keys:
+            return
+        now = time.time()
+        # 한 번 훑는 동안 보호된 키는 뒤로 보내므로, 모든 키를 한 번씩 본 뒤에는 멈춥니다.
+        for _ in range(len(self._entries)):
+            if len(self._entries) <= self.max_keys:
+                return
+            oldest, oldest_entry = next(iter(self._entries.items()))
+            if oldest.startswith(self.PROTECTED_PREFIXES) and oldest_entry[2] > now:
+                self._entries.move_to_end(oldest)
+            else:
+                del self._entries[oldest]
+
+    def take(self, key, capacity, refill_per_second, now):
+        with self._lock:
+            entry = self._get(key, now)
+            tokens = capacity if entry is None else min(capacity, entry[0] + (now - entry[1]) * refill_per_second)
+            if tokens < 1:
+                return (1 - tokens) / refill_per_second
+            # 가득 찰 때까지 걸리는 시간이 지나면 새 버킷과 같으므로 그때 만료시킵니다.
+            self._put(key, [tokens - 1, now, now + (capacity - tokens + 1) / refill_per_second])
+            return 0.0
+
+    def incr(self, key, ttl, now):
+        with self._lock:
+            entry = self._get(key, now)
+            count = 1 if entry is None else int(entry[0]) + 1
+            self._put(key, [count, now, now + ttl])
+            return count
+
+    def get_until(self, key, now):
+        with self._lock:
+            entry = self._get(key, now)
+            return 0.0 if entry is None else entry[0]
+
+    def set_until(self, key, until):
+        with self._lock:
+            self._put(key, [until, time.time(), until])
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteLimiterStore(LimiterStore):
+    # 로컬 SQLite 파일을 공유 저장소로 쓰는 백엔드. BEGIN IMMEDIATE 로 읽기-수정-쓰기를 원자적으로 처리합니다.
+    # 다른 워커가 쓰는 중이면 파일 잠금을 기다리므로 (최대 timeout 초) 이벤트 루프가 아닌 스레드에서 호출됩니다.
+    blocking = True
+
+    def __init__(self, path: str = LOGIN_RATE_LIMIT_SQLITE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS limiter (key TEXT PRIMARY KEY, value REAL, updated_at REAL, expires_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_limiter_expires_at ON limiter (expires_at)")
+
+    def _update(self, key, now, compute):
+        # compute(현재 행 또는 None) -> (저장할 행 또는 None, 반환값)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value, updated_at FROM limiter WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                new_row, result = compute(row)
+                if new_row is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO limiter (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, *new_row),
+                    )
+                    # 가끔씩 만료된 행을 정리합니다.
+                    self._writes += 1
+                    if self._writes % 1000 == 0:
+                        self._conn.execute("DELETE FROM limiter WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def take(self, key, capacity, refill_per_second, now):
+        def compute(row):
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * refill_per_second)
+            if tokens < 1:
+                return None, (1 - tokens) / refill_per_second
+            return (tokens - 1, now, now + (capacity - tokens + 1) / refill_per_second), 0.0
+
+        return self._update(key, now, compute)
+
+    def incr(self, key, ttl, now):
+        def compute(row):
+            count = 1 if row is None else int(row[0]) + 1
+            return (count, now, now + ttl), count
+
+        return self._update(key, now, compute)
+
+    def get_until(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM limiter WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        return 0.0 if row is None else row[0]
+
+    def set_until(self, key, until):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO limiter (key, value, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, until, time.time(), until),
+            )
+
+    def delete(self, *keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM limiter WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM limiter")
+
+
+def _create_store(name: str) -> LimiterStore:
+    if name == "sqlite":
+        return SqliteLimiterStore()
+    return MemoryLimiterStore()
+
+
+class LoginLimiter:
+    # 공개 메서드는 모두 코루틴입니다. 저장소가 blocking 이면 (sqlite) 검사 한 번에 필요한 저장소 연산을
+    # 묶어서 스레드 하나에서 실행합니다. 로그인이 몰려도 파일 잠금 대기가 이벤트 루프를 멈추지 않습니다.
+    def __init__(self, store: LimiterStore, enabled: bool = LOGIN_RATE_LIMIT_ENABLED):
+        self.store = store
+        self.enabled = enabled
+
+    async def _run(self, function, *args):
+        if self.store.blocking:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def check(self, username: str, client_ip: str, now: float | None = None):
+        # 인증 전에 호출: 제한에 걸리면 LoginRateLimited 를 던집니다.
+        # IP 를 먼저 확인해서, 한 IP 가 여러 사용자 이름의 버킷을 비우지 못하게 합니다.
+        if not self.enabled:
+            return
+        await self._run(self._check, username, client_ip, time.time() if now is None else now)
+
+    def _check(self, username: str, client_ip: str, now: float):
+        locked_until = self.store.get_until(f"lock:{username}", now)
+        if locked_until > now:
+            login_rate_limited_total.inc(reason="lockout")
+            raise LoginRateLimited(locked_until - now, "lockout")
+        retry_after = self.store.take(
+            f"ip:{client_ip}", LOGIN_IP_MAX_ATTEMPTS, LOGIN_IP_MAX_ATTEMPTS / LOGIN_RATE_WINDOW_SECONDS, now
+        )
+        if retry_after:
+            login_rate_limited_total.inc(reason="ip")
+            raise LoginRateLimited(retry_after, "ip")
+        retry_after = self.store.take(
+            f"user:{username}",
+            LOGIN_USERNAME_MAX_ATTEMPTS,
+            LOGIN_USERNAME_MAX_ATTEMPTS / LOGIN_RATE_WINDOW_SECONDS,
+            now,
+        )
+        if retry_after:
+            login_rate_limited_total.inc(reason="username")
+            raise LoginRateLimited(retry_after, "username")
+
+    async def record_failure(self, username: str, now: float | None = None):
+        # 없는 사용자 이름도 똑같이 잠가서, 잠금 여부로 사용자 존재를 알 수 없게 합니다.
+        if not self.enabled:
+            return
+        await self._run(self._record_failure, username, time.time() if now is None else now)
+
+    def _record_failure(self, username: str, now: float):
+        failures = self.store.incr(f"fail:{username}", LOGIN_FAILURE_TTL_SECONDS, now)
+        if failures >= LOGIN_LOCKOUT_THRESHOLD:
+            delay = min(LOGIN_LOCKOUT_BASE_SECONDS * 2 ** (failures - LOGIN_LOCKOUT_THRESHOLD), LOGIN_LOCKOUT_MAX_SECONDS)
+            self.store.set_until(f"lock:{username}", now + delay)
+
+    async def record_success(self, username: str):
+        if not self.enabled:
+            return
+        await self._run(self.store.delete, f"fail:{username}", f"lock:{username}", f"user:{username}")
+
+    # 없는 사용자 이름 캐시
+    async def is_unknown_user(self, username: str) -> bool:
+        if await self._run(self.store.get_until, f"unknown:{username}", time.time()):
+            login_unknown_user_cache_hits_total.inc()
+            return True
+        return False
+
+    async def remember_unknown_user(self, username: str):
+        await self._run(self.store.set_until, f"unknown:{username}", time.time() + LOGIN_UNKNOWN_USER_TTL_SECONDS)
+
+    async def forget_unknown_user(self, username: str):
+        # 가입 시 호출: 방금 만든 이름이 "없는 사용자"로 남아 있지 않게 합니다.
+        await self._run(self.store.delete, f"unknown:{username}")
+
+
+login_limiter = LoginLimiter(_create_store(LOGIN_RATE_LIMIT_BACKEND))
@@ -1,19 +1,62 @@
 ﻿# main.py
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Annotated, Literal
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import engine, Base, get_db
-from schemas import UserCreate, User,Token,PostCreate, Post, Comment, CommentCreate
+from fastapi import FastAPI, Depends, Header, HTTPException, Path, Query, Request, Response, WebSocket, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import Field
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import engine, Base, get_async_db, AsyncSessionLocal
+from schemas import UserCreate, User,Token,PostCreate, Post, Comment, CommentCreate, PostDetail, PendingComment, RefreshTokenRequest, SearchHit
 import models
-from models import User as UserModel
 import crud
 from fastapi.security import OAuth2PasswordRequestForm # 핵심! 로그인 폼 처리용
-from auth_token import create_access_token,get_current_user # JWT 토큰 생성 함수 임포트
+from auth_token import get_current_user, get_current_user_for_stream, issue_tokens, oauth2_scheme, revoke_tokens, rotate_refresh_token # JWT 토큰 발급/검증 함수 임포트
+from auth_utils import PasswordHashingBusy, shutdown_password_pool
+from comment_queue import COMMENT_WRITE_BEHIND, CommentQueueFull, comment_queue
+import comment_stream
+from comment_stream import CommentStreamFull, comment_hub
+from jwt_keys import JWT_JWKS_MAX_AGE, get_keyring
+from login_limiter import LoginRateLimited, login_limiter
+from revocation import revocation_list
+import metrics
+from pagination import (
+    DEFAULT_COMMENT_PAGE_SIZE, MAX_ID, NEXT_CURSOR_HEADER, PAGE_SIZE_DESCRIPTION, clamp_page_size, activity_cursor, decode_activity_cursor,
+    decode_cursor, decode_search_cursor, encode_search_cursor, parse_fields, split_page,
+)
+import response_cache
+import fast_json
+import instrumentation
+
+# 경로의 게시글 id: DB 정수 범위를 넘는 값은 422 로 거절합니다 (pagination.MAX_ID 참고).
+PostId = Annotated[int, Path(le=MAX_ID)]
 
 # Base.metadata.create_all(bind=engine)를 호출하여 DB 파일 및 테이블 생성
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 서명 키를 시작할 때 읽어 둡니다 (키 파일 오류를 첫 요청이 아니라 시작 시점에 발견).
+    get_keyring()
+    instrumentation.start_lifetime_profiler()
+    # 폐기된 토큰 목록을 읽어 두고 주기적으로 동기화합니다.
+    await revocation_list.start()
+    if COMMENT_WRITE_BEHIND:
+        await comment_queue.start()
+    await comment_hub.start()
+    yield
+    # 종료 시 접수해 둔 댓글을 모두 저장한 뒤 내려갑니다 (저장된 댓글은 스트림에도 발행된 뒤 허브를 멈춤).
+    await comment_queue.stop()
+    await comment_hub.stop()
+    await revocation_list.stop()
+    # 종료 시 해싱 워커 프로세스 정리
+    shutdown_password_pool()
+    instrumentation.stop_lifetime_profiler()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "*",  # 개발 단계에서 모든 도메인 허용
@@ -26,7 +69,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],  # 브라우저에서 다음 페이지 커서/ETag/서버 시간을 읽을 수 있도록 노출
 )
+# 라우트별 지연 시간/요청당 SQL 수 (/metrics) + Server-Timing 헤더 (instrumentation.py 참고)
+app.add_middleware(instrumentation.RequestMetricsMiddleware)
+
+# 해싱 대기열이 가득 찬 경우: 지연 시간을 무한정 늘리는 대신 바로 503 으로 거절
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# 댓글 write-behind 큐가 가득 찬 경우 (또는 종료 중)
+@app.exception_handler(CommentQueueFull)
+async def comment_queue_full_handler(request: Request, exc: CommentQueueFull):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many comments right now, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# 댓글 스트림 구독 수가 워커 한도에 도달한 경우
+@app.exception_handler(CommentStreamFull)
+async def comment_stream_full_handler(request: Request, exc: CommentStreamFull):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many open comment streams, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# 로그인 시도 제한에 걸린 경우 (DB 조회/비밀번호 검증 전에 거절)
+@app.exception_handler(LoginRateLimited)
+async def login_rate_limited_handler(request: Request, exc: LoginRateLimited):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many login attempts, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# DB 커넥션 풀이 고갈되어 DB_POOL_TIMEOUT 안에 커넥션을 얻지 못한 경우
+@app.exception_handler(sa_exc.TimeoutError)
+async def db_pool_timeout_handler(request: Request, exc: sa_exc.TimeoutError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is busy, please retry later"},
+        headers={"Retry-After": "1"},
+    )
 
 # 루트(Root) 경로 테스트 엔드포인트
 @app.get("/")
@@ -34,79 +125,352 @@ def read_root():
     return {"message": "Welcome to the FastAPI JWT Auth API!"}
 
 @app.get("/users/me/", response_model=User) # schemas.User 스키마 사용
-def read_users_me(current_user: UserModel = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     # get_current_user 디펜던시가 토큰을 검증하고 인증된 사용자 객체를 반환합니다.
     # 인증에 실패하면 FastAPI가 자동으로 401 UNAUTHORIZED 응답을 반환합니다.
     return current_user
 
 # 새로운 사용자 생성 (회원가입) 엔드포인트
 @app.post("/users/", response_model=User) # schemas.User 사용
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)): # schemas.UserCreate 사용
+async def create_new_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)): # schemas.UserCreate 사용
     # 1. 사용자 이름 중복 확인
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await crud.get_user_by_username_async(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    return crud.create_user(db=db, user=user)
+    return await crud.create_user_async(db=db, user=user)
 
 @app.post("/token", response_model=Token) # schemas.Token 사용
-def login_for_access_token(
+async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # 0. 시도 제한 확인 (IP/사용자 이름별 버킷, 잠금). 걸리면 DB 조회/해싱 없이 429
+    await login_limiter.check(form_data.username, request.client.host if request.client else "unknown")
+
     # 1. 사용자 인증 시도 (crud.py의 함수 사용)
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    user = await crud.authenticate_user_async(db, form_data.username, form_data.password)
     
-    # 2. 인증 실패 시 401 Unauthorized 반환
+    # 2. 인증 실패 시 401 Unauthorized 반환 (연속 실패는 잠금 백오프로 이어짐)
     if not user:
+        await login_limiter.record_failure(form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(
-        data={"sub": user.username} # 토큰에 포함될 데이터 (subject: 사용자 이름)
-    )
-    
+    await login_limiter.record_success(form_data.username)
+
+    # 3. 액세스 토큰 + 리프레시 토큰 발급 (토큰에 포함될 데이터 subject: 사용자 이름)
     # 4. 토큰 응답 반환 (schemas.Token 형식)
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await issue_tokens(db, user_id=user.id, username=user.username)
+
+# 리프레시 토큰으로 새 토큰 쌍 발급 (비밀번호 검증 없음). 쓴 리프레시 토큰은 더 이상 쓸 수 없습니다.
+@app.post("/token/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
+    return await rotate_refresh_token(db, body.refresh_token)
+
+# 로그아웃: 현재 액세스 토큰과 (보낸 경우) 리프레시 토큰 family 를 폐기합니다.
+@app.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_access_token(
+    body: RefreshTokenRequest | None = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user), # JWT 인증 필수
+    db: AsyncSession = Depends(get_async_db)
+):
+    await revoke_tokens(db, token, current_user.username, body.refresh_token if body else None)
 
 # 게시글 생성 엔드포인트 (로그인 필수!)
 @app.post("/posts/", response_model=Post)
-def create_post_for_user(
+async def create_post_for_user(
     post: PostCreate,
-    current_user: UserModel = Depends(get_current_user), # JWT 인증 필수
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), # JWT 인증 필수
+    db: AsyncSession = Depends(get_async_db)
 ):
     # current_user.id를 사용하여 해당 사용자의 ID로 게시글을 생성
-    return crud.create_user_post(db=db, post=post, user_id=current_user.id)
+    return await crud.create_user_post_async(db=db, post=post, user_id=current_user.id)
+
+# 게시글 일괄 생성 (로그인 필수!): 목록 전체를 한 번에 검증하고 한 트랜잭션으로 저장합니다.
+# 한 번에 보낼 수 있는 개수는 BULK_MAX_BATCH_SIZE 로 제한됩니다 (초과 시 422).
+@app.post("/posts/bulk", response_model=list[Post], status_code=status.HTTP_201_CREATED)
+async def create_posts_bulk(
+    posts: Annotated[list[PostCreate], Field(min_length=1, max_length=crud.BULK_MAX_BATCH_SIZE)],
+    current_user: User = Depends(get_current_user), # JWT 인증 필수
+    db: AsyncSession = Depends(get_async_db)
+):
+    rows = await crud.create_user_posts_bulk_async(db=db, posts=posts, user_id=current_user.id)
+    # 방금 INSERT ... RETURNING 으로 받은 행이므로 검증 없이 바로 직렬화합니다 (fast_json.py 참고).
+    return fast_json.list_response(Post, rows, status_code=status.HTTP_201_CREATED)
 
 # 모든 게시글 조회 엔드포인트 (선택적: 인증 없이도 조회 가능하게 설정)
+# - cursor: 이전 응답의 X-Next-Cursor 헤더 값 (키셋 페이지네이션, 권장)
+# - skip/limit: 기존 방식도 그대로 동작합니다 (skip 이 클수록 느려짐)
+# - 응답은 ETag 와 함께 캐시되며, If-None-Match 가 일치하면 304 를 반환합니다.
+# - fields: 응답에 담을 필드 (예: fields=id,title). 고른 컬럼만 DB에서 읽습니다. id 는 항상 포함됩니다.
+# - excerpt: content 를 앞 excerpt 글자까지만 잘라서 반환합니다 (목록 미리보기용).
+# sort=activity: 최근에 댓글이 달린 게시글부터 (댓글 수/마지막 댓글 시각은 게시글 행에 함께 저장되어 있음).
+# 활동순은 커서로만 이어갈 수 있습니다 (skip 미지원).
 @app.get("/posts/", response_model=list[Post])
-def read_posts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    posts = crud.get_posts(db, skip=skip, limit=limit)
-    return posts
+async def read_posts(
+    request: Request,
+    skip: int = Query(0, ge=0, le=MAX_ID),
+    limit: int = Query(10, ge=1, description=PAGE_SIZE_DESCRIPTION),
+    cursor: str | None = None,
+    sort: Literal["id", "activity"] = "id",
+    fields: str | None = Query(None, description="Comma-separated fields to return (id is always included)"),
+    excerpt: int | None = Query(None, ge=1, le=4000, description="Truncate content to this many characters"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if sort == "activity" and skip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="skip is not supported with sort=activity")
+    limit = clamp_page_size(limit)
+    after = (decode_activity_cursor if sort == "activity" else decode_cursor)(cursor) if cursor else None
+    selected_fields = parse_fields(fields, crud.POST_LIST_COLUMNS)
+    cached, cache_key = await response_cache.lookup(request, "posts", [response_cache.POSTS_TAG])
+    if cached is not None:
+        return cached
+
+    # 다음 페이지 존재 여부를 알기 위해 하나 더 조회합니다.
+    if sort == "activity":
+        posts = await crud.get_posts_by_activity_async(
+            db, limit=limit + 1, after=after, fields=selected_fields, excerpt=excerpt
+        )
+        posts, next_cursor = split_page(posts, limit, cursor_for=activity_cursor)
+    else:
+        posts = await crud.get_posts_async(
+            db, skip=skip, limit=limit + 1, after_id=after, fields=selected_fields, excerpt=excerpt
+        )
+        posts, next_cursor = split_page(posts, limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    # 캐시할 응답 바이트: ORM 행을 검증 없이 바로 직렬화합니다 (response_model 과 같은 스키마, fast_json.py 참고)
+    # 활동순은 커서 계산을 위해 last_comment_at 을 항상 조회하므로, fields 로 고르지 않았으면 응답에서 뺍니다.
+    only = selected_fields | {"id"} if selected_fields is not None else None
+    body = fast_json.dump_list(Post, posts, only=only)
+    return await response_cache.store(request, "posts", cache_key, body, headers)
+
+# 게시글 상세 조회 (공개 경로): 게시글 + 작성자 + 첫 페이지 댓글과 각 댓글 작성자
+# 댓글 수와 관계없이 SQL 2개로 처리합니다 (crud.get_post_detail_async 참고).
+@app.get("/posts/{post_id}", response_model=PostDetail)
+async def read_post_detail(
+    post_id: PostId,
+    comments_limit: int = Query(DEFAULT_COMMENT_PAGE_SIZE, ge=1, description=PAGE_SIZE_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_db),
+):
+    comments_limit = clamp_page_size(comments_limit)
+    post, comments = await crud.get_post_detail_async(db, post_id=post_id, comment_limit=comments_limit + 1)
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    comments, next_cursor = split_page(comments, comments_limit)
+    return PostDetail(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        owner_id=post.owner_id,
+        comment_count=post.comment_count,
+        last_comment_at=post.last_comment_at,
+        owner=post.owner,
+        comments=comments,
+        next_comments_cursor=next_cursor,
+    )
 
 # 1. 댓글 생성 (로그인 필수!)
-@app.post("/posts/{post_id}/comments/", response_model=Comment, status_code=status.HTTP_201_CREATED)
-def create_comment_for_post(
-    post_id: int,
+# COMMENT_WRITE_BEHIND 모드에서는 커밋을 기다리지 않고 큐에 넣은 뒤 202 + 임시 id 를 반환합니다.
+@app.post(
+    "/posts/{post_id}/comments/",
+    response_model=Comment,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": PendingComment}},
+)
+async def create_comment_for_post(
+    post_id: PostId,
     comment: CommentCreate,
-    current_user: UserModel = Depends(get_current_user), # JWT 인증 필수
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), # JWT 인증 필수
+    db: AsyncSession = Depends(get_async_db)
+):
+    # 게시글 존재 여부 확인 (write-behind 모드에서는 한 번 확인한 게시글을 다시 조회하지 않습니다)
+    if not comment_queue.knows_post(post_id):
+        db_post = await crud.get_post_async(db, post_id=post_id)
+        if not db_post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        comment_queue.remember_post(post_id)
+
+    if comment_queue.running:
+        pending = comment_queue.enqueue(post_id=post_id, owner_id=current_user.id, content=comment.content)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=pending.model_dump())
+
+    # 로그인한 사용자 ID와 게시글 ID를 사용하여 댓글 생성
+    return await crud.create_comment_for_post_async(db=db, comment=comment, post_id=post_id, user_id=current_user.id)
+
+# 1-1. 댓글 일괄 생성 (로그인 필수!): 게시글 존재 확인 1번 + INSERT 1번 + 커밋 1번
+@app.post("/posts/{post_id}/comments/bulk", response_model=list[Comment], status_code=status.HTTP_201_CREATED)
+async def create_comments_for_post_bulk(
+    post_id: PostId,
+    comments: Annotated[list[CommentCreate], Field(min_length=1, max_length=crud.BULK_MAX_BATCH_SIZE)],
+    current_user: User = Depends(get_current_user), # JWT 인증 필수
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # 게시글 존재 여부 확인
-    db_post = crud.get_post(db, post_id=post_id)
+    db_post = await crud.get_post_async(db, post_id=post_id)
     if not db_post:
         raise HTTPException(status_code=404, detail="Post not found")
-        
-    # 로그인한 사용자 ID와 게시글 ID를 사용하여 댓글 생성
-    return crud.create_comment_for_post(db=db, comment=comment, post_id=post_id, user_id=current_user.id)
 
-# 2. 특정 게시글의 댓글 목록 조회 (공개 경로)
+    rows = await crud.create_comments_for_post_bulk_async(
+        db=db, comments=comments, post_id=post_id, user_id=current_user.id
+    )
+    return fast_json.list_response(Comment, rows, status_code=status.HTTP_201_CREATED)
+
+# 2. 특정 게시글의 댓글 목록 조회 (공개 경로, 커서 페이지네이션, fields/excerpt 는 게시글 목록과 같음)
 @app.get("/posts/{post_id}/comments/", response_model=list[Comment])
-def read_comments_for_post(post_id: int, db: Session = Depends(get_db)):
-    return crud.get_comments_by_post(db, post_id=post_id)
\ No newline at end of file
+async def read_comments_for_post(
+    post_id: PostId,
+    request: Request,
+    limit: int = Query(DEFAULT_COMMENT_PAGE_SIZE, ge=1, description=PAGE_SIZE_DESCRIPTION),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated fields to return (id is always included)"),
+    excerpt: int | None = Query(None, ge=1, le=4000, description="Truncate content to this many characters"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    limit = clamp_page_size(limit)
+    after_id = decode_cursor(cursor) if cursor else None
+    selected_fields = parse_fields(fields, crud.COMMENT_LIST_COLUMNS)
+    cached, cache_key = await response_cache.lookup(
+        request, "comments", [response_cache.post_comments_tag(post_id)]
+    )
+    if cached is not None:
+        return cached
+
+    comments = await crud.get_comments_by_post_async(
+        db, post_id=post_id, limit=limit + 1, after_id=after_id, fields=selected_fields, excerpt=excerpt
+    )
+    comments, next_cursor = split_page(comments, limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    body = fast_json.dump_list(Comment, comments)
+    return await response_cache.store(request, "comments", cache_key, body, headers)
+
+# 2-1. 새 댓글 실시간 스트림 (SSE, 로그인 필수): 목록을 주기적으로 다시 조회하는 대신 연결해 두고 새 댓글만 받습니다.
+# - 이벤트: "comment" (data = Comment JSON, id = 댓글 id), "reset" (놓친 댓글이 너무 많음 → 목록을 다시 조회),
+#   "close" (서버가 스트림을 끝냄, 느린 소비자/종료). 새 댓글이 없으면 주기적으로 ": ping" 주석을 보냅니다.
+# - 다시 연결할 때 Last-Event-ID 헤더(브라우저 EventSource 가 자동으로 보냄)가 있으면 그 뒤의 댓글부터 보냅니다.
+#   처음 연결할 때는 헤더를 지정할 수 없으므로, 먼저 읽은 목록의 마지막 댓글 id 를 ?after= 로 주면 됩니다 (헤더 우선).
+# - EventSource 는 Authorization 헤더도 보낼 수 없으므로 토큰을 ?token= 으로도 받습니다.
+@app.get("/posts/{post_id}/comments/stream", response_class=StreamingResponse)
+async def stream_comments_for_post(
+    post_id: PostId,
+    last_event_id: str | None = Header(None),
+    after: int | None = Query(None, ge=0, le=MAX_ID, description="Resume after this comment id when no Last-Event-ID is sent"),
+    current_user: User = Depends(get_current_user_for_stream), # JWT 인증 필수
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Last-Event-ID 는 구독하기 전에 검사합니다 (잘못된 값으로 구독 슬롯만 차지하고 500 이 나는 일이 없도록).
+    # str.isdigit() 은 '²' 같은 유니코드 숫자도 참이므로 ASCII 인지도 확인합니다.
+    if last_event_id:
+        if not (last_event_id.isascii() and last_event_id.isdigit()) or int(last_event_id) > MAX_ID:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID")
+        after = int(last_event_id)
+    if not await crud.get_post_async(db, post_id=post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # 1. 먼저 구독한 뒤 놓친 댓글을 읽어야 그 사이에 커밋된 댓글이 빠지지 않습니다 (backlog 와 겹치는 실시간 이벤트는 id 로 거름).
+    subscription = comment_hub.subscribe(post_id)
+    backlog, reset = [], False
+    try:
+        if after is not None:
+            rows = await crud.get_comments_by_post_async(
+                db, post_id=post_id, limit=comment_stream.COMMENT_STREAM_BACKFILL_LIMIT + 1, after_id=after
+            )
+            if len(rows) > comment_stream.COMMENT_STREAM_BACKFILL_LIMIT:
+                reset = True
+            else:
+                backlog = comment_stream.events_from_comments(rows)
+    except BaseException:
+        comment_hub.unsubscribe(subscription)
+        raise
+    # 2. 스트림이 열려 있는 동안 DB 커넥션을 잡고 있지 않도록 세션을 먼저 닫습니다.
+    await db.close()
+
+    return StreamingResponse(
+        comment_stream.sse_stream(comment_hub, subscription, backlog, reset=reset),
+        media_type="text/event-stream",
+        # 프록시(nginx)가 응답을 모았다가 보내지 않도록 합니다.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# 2-2. 새 댓글 실시간 스트림 (WebSocket, 로그인 필수): 메시지 하나 = Comment JSON 하나
+# 브라우저 WebSocket 은 헤더를 지정할 수 없으므로 토큰을 ?token= 으로도 받습니다 (Authorization 헤더 우선).
+@app.websocket("/posts/{post_id}/comments/ws")
+async def stream_comments_for_post_ws(websocket: WebSocket, post_id: PostId, token: str | None = None):
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    async with AsyncSessionLocal() as db:
+        try:
+            await get_current_user(token=token or "", db=db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        if not await crud.get_post_async(db, post_id=post_id):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Post not found")
+            return
+
+    try:
+        subscription = comment_hub.subscribe(post_id)
+    except CommentStreamFull:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    await websocket.accept()
+    await comment_stream.websocket_stream(comment_hub, subscription, websocket)
+
+# 3. 전문 검색 (공개 경로): 게시글 제목/본문과 댓글을 관련도 순으로 검색합니다 (search.py 참고).
+# - q 의 단어가 모두 들어 있는 문서만 찾습니다. 다음 페이지는 X-Next-Cursor 헤더 값을 cursor 로 전달합니다.
+@app.get("/search", response_model=list[SearchHit])
+async def search_posts_and_comments(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, description=PAGE_SIZE_DESCRIPTION),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    limit = clamp_page_size(limit)
+    after = decode_search_cursor(cursor) if cursor else None
+    # 다음 페이지 존재 여부를 알기 위해 하나 더 조회합니다.
+    hits = await crud.search_documents_async(db, q, limit + 1, after)
+    if hits is None:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Search is not available")
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last = hits[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_search_cursor(-last["score"], last["kind"], last["id"])
+    return hits
+
+# 토큰 검증용 공개 키 목록 (JWKS). 다른 워커/노드/엣지는 이 키로 서명 비밀 없이 토큰을 검증합니다.
+# HS256(키 디렉터리 미사용)일 때는 공개할 키가 없으므로 빈 목록입니다.
+@app.get("/.well-known/jwks.json")
+async def read_jwks():
+    return JSONResponse(
+        content=get_keyring().jwks(),
+        headers={"Cache-Control": f"public, max-age={JWT_JWKS_MAX_AGE}"},
+    )
+
+# 운영 메트릭 (Prometheus 텍스트 형식, METRICS_ENABLED=1 일 때만)
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def read_metrics():
+    if not instrumentation.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return metrics.render()
+
+# 샘플링 프로파일러 (PROFILER_ENABLED=1 일 때만): seconds 동안 이벤트 루프 스레드를 샘플링해
+# folded stack 텍스트로 돌려줍니다. 예: curl "localhost:8000/debug/profile?seconds=10" > out.folded
+@app.get("/debug/profile", response_class=PlainTextResponse, include_in_schema=False)
+async def read_profile(seconds: float = Query(10, gt=0, le=instrumentation.PROFILER_MAX_SECONDS)):
+    if not instrumentation.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    profiler = instrumentation.SamplingProfiler()
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return PlainTextResponse(profiler.folded(), headers={"X-Profile-Samples": str(profiler.samples)})
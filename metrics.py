@@ -0,0 +1,156 @@
+﻿import threading
+from abc import ABC, abstractmethod
+
+# -----------------
+# 📊 간단한 인프로세스 메트릭 레지스트리 (Prometheus 텍스트 형식 출력)
+# -----------------
+# 외부 라이브러리 없이 카운터/게이지/히스토그램만 지원합니다.
+# 각 모듈은 모듈 수준에서 메트릭을 만들고, main.py의 /metrics 엔드포인트가 render()로 출력합니다.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self):
+        # Prometheus 텍스트 형식의 샘플 줄 목록
+        ...
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        if not self._values and not self.labelnames:
+            return [f"{self.name} 0.0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), callback=None):
+        # callback: 값을 직접 저장하지 않고 출력 시점에 읽어오는 경우 (예: 커넥션 풀 상태)
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        if self._callback is not None:
+            return float(self._callback())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        if self._callback is not None:
+            return [f"{self.name} {float(self._callback())}"]
+        if not self._values and not self.labelnames:
+            return [f"{self.name} 0.0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def snapshot(self, **labels):
+        # {"count": ..., "sum": ...} (벤치마크/테스트에서 평균을 계산할 때 사용)
+        state = self._values.get(self._key(labels))
+        if state is None:
+            return {"count": 0, "sum": 0.0}
+        return {"count": state["count"], "sum": state["sum"]}
+
+    def samples(self):
+        lines = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state['sum']}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    with _lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
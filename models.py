@@ -1,28 +1,43 @@
-﻿from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Text
+﻿from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, ForeignKey, Text
 from database import Base 
 from sqlalchemy.orm import relationship
 
+# 💡 인덱스 메모: 기본 키(id)는 그 자체로 인덱스이므로 별도의 ix_*_id 인덱스를 두지 않습니다.
+# (쓰기 때마다 갱신 비용만 들고 읽기에는 쓰이지 않습니다.)
+
 class Post(Base):
     __tablename__ = "posts"
+    # 전문 검색용 FULLTEXT 인덱스 (MySQL 에서만 생성, SQLite 는 search.py 의 FTS5 테이블 사용)
+    __table_args__ = (
+        Index("ft_posts_title_content", "title", "content", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        # 피드의 활동순 정렬 (sort=activity): last_comment_at DESC, id DESC 를 인덱스 역방향으로 읽고,
+        # 댓글이 없는 게시글(last_comment_at IS NULL)도 같은 인덱스에서 id 역순으로 읽습니다.
+        Index("ix_posts_last_comment_at_id", "last_comment_at", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     # 🚨 수정: title에 길이 추가
     title = Column(String(length=255), index=True) 
     # 🚨 수정: content에 길이 추가 (VARCHAR)
     content = Column(String(length=4000)) 
     
-    owner_id = Column(Integer, ForeignKey("users.id")) 
+    # 작성자별 게시글 조회/조인용 인덱스
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # 비정규화 카운터: 댓글을 저장하는 트랜잭션에서 함께 갱신합니다 (post_counters.py)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_comment_at = Column(DateTime, nullable=True)
     owner = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post")
     
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     # 🚨 수정: username에 길이 추가
     username = Column(String(length=100), unique=True, index=True) 
     # 🚨 수정: hashed_password에 길이 추가 (해시된 문자열을 저장할 공간)
-    hashed_password = Column(String(length=100)) 
+    # argon2 등 설정에 따라 해시 문자열이 100자를 넘을 수 있어 255로 늘렸습니다.
+    hashed_password = Column(String(length=255)) 
     is_active = Column(Boolean, default=True)
     posts = relationship("Post", back_populates="owner")
     comments = relationship("Comment", back_populates="owner")
@@ -30,22 +45,57 @@ class User(Base):
 class Item(Base):
     __tablename__ = "items"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     # 🚨 수정: title에 길이 추가
     title = Column(String(length=255), index=True)
-    # 🚨 수정: description에 길이 추가
-    description = Column(String(length=500), index=True) 
+    # 🚨 수정: description에 길이 추가 (조회 조건으로 쓰지 않으므로 인덱스 없음)
+    description = Column(String(length=500))
     owner_id = Column(Integer)
     
 class Comment(Base):
     __tablename__ = "comments"
-    
-    id = Column(Integer, primary_key=True, index=True)
+    # 게시글별 댓글을 id 순으로 찾아가는 키셋 페이지네이션용 복합 인덱스 (post_id = ? AND id > ? ORDER BY id)
+    # 전문 검색용 FULLTEXT 인덱스는 MySQL 에서만 생성합니다 (search.py 참고).
+    __table_args__ = (
+        Index("ix_comments_post_id_id", "post_id", "id"),
+        Index("ft_comments_content", "content", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        Index("ix_comments_provisional_id", "provisional_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
     
     content = Column(Text) 
     
     post_id = Column(Integer, ForeignKey("posts.id"))
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # write-behind 큐가 접수할 때 발급한 임시 id (comment_queue.py). 로그를 다시 재생해도 같은 댓글이
+    # 두 번 저장되지 않도록 unique 입니다. 큐를 거치지 않은 댓글은 NULL.
+    provisional_id = Column(String(length=32), nullable=True)
 
     post = relationship("Post", back_populates="comments")
-    owner = relationship("User", back_populates="comments")
\ No newline at end of file
+    owner = relationship("User", back_populates="comments")
+
+# 리프레시 토큰 (토큰 원문은 저장하지 않고 jti 만 저장)
+# 같은 로그인에서 회전(rotation)으로 이어진 토큰들은 family_id 를 공유합니다.
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(length=32), primary_key=True)  # jti
+    family_id = Column(String(length=32), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # 이 리프레시 토큰과 함께 발급된 액세스 토큰의 jti (재사용 감지 시 함께 폐기)
+    access_jti = Column(String(length=32))
+    # 만료된 토큰을 주기적으로 지울 때 (revocation.py prune) 쓰는 인덱스
+    expires_at = Column(DateTime, index=True)
+    # 회전에 사용된 시각. 이미 사용된 토큰이 다시 오면 탈취로 보고 family 전체를 폐기합니다.
+    used_at = Column(DateTime, nullable=True)
+    revoked = Column(Boolean, default=False)
+
+# 폐기된 토큰 jti 목록. 각 워커는 id 순으로 새 행만 읽어 메모리의 폐기 목록에 반영합니다 (revocation.py).
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(length=32), unique=True)
+    # 원래 토큰의 만료 시각. 이 시각이 지나면 토큰 자체가 무효이므로 목록에서 지웁니다.
+    expires_at = Column(DateTime, index=True)
@@ -0,0 +1,128 @@
+﻿import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+# -----------------
+# 📄 키셋(커서) 페이지네이션 도구
+# -----------------
+# 커서는 "마지막으로 받은 행의 정렬 키"를 base64url(JSON)로 감싼 불투명한 문자열입니다.
+# 클라이언트는 내용을 해석하지 않고 응답 헤더(X-Next-Cursor)의 값을 다음 요청의 cursor 로 그대로 돌려주면 됩니다.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 목록 조회 한 번에 돌려줄 수 있는 최대 개수. 더 큰 limit 은 거절하지 않고 이 값으로 줄입니다
+# (예전에는 GET /posts/ 의 limit 에 상한이 없었으므로 ?limit=500 을 보내던 클라이언트가 422 를 받지 않도록).
+MAX_PAGE_SIZE = 100
+PAGE_SIZE_DESCRIPTION = f"Page size (values above {MAX_PAGE_SIZE} are clamped to {MAX_PAGE_SIZE})"
+# 댓글 목록의 기본 페이지 크기 (이전에는 제한 없이 전부 반환했습니다)
+DEFAULT_COMMENT_PAGE_SIZE = 50
+# id 로 받을 수 있는 최대값 (부호 있는 64비트: SQLite INTEGER / MySQL BIGINT). 더 큰 값은 DB 드라이버가 OverflowError 를 냅니다.
+MAX_ID = 2**63 - 1
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded))
+    if not isinstance(payload, dict):
+        raise ValueError(payload)
+    return payload
+
+
+def clamp_page_size(limit: int) -> int:
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _is_int(value) -> bool:
+    # JSON 의 true/false 는 파이썬에서 int 의 하위 타입(bool)이므로 따로 거릅니다.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_id(value) -> bool:
+    return _is_int(value) and -MAX_ID - 1 <= value <= MAX_ID
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(last_id: int) -> str:
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        last_id = _decode(cursor)["id"]
+        if not _is_id(last_id):
+            raise ValueError(last_id)
+    except (ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+    return last_id
+
+
+# 검색 결과 커서: 관련도 순 정렬이므로 (점수, 종류, id) 로 이어갑니다.
+def encode_search_cursor(score: float, kind: str, doc_id: int) -> str:
+    return _encode({"s": score, "k": kind, "id": doc_id})
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, str, int]:
+    try:
+        payload = _decode(cursor)
+        score, kind, doc_id = payload["s"], payload["k"], payload["id"]
+        if not isinstance(score, (int, float)) or isinstance(score, bool) or not isinstance(kind, str) or not _is_id(doc_id):
+            raise ValueError(payload)
+    except (ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+    return float(score), kind, doc_id
+
+
+# 활동순 피드 커서: (마지막 댓글 시각, id). 댓글이 없는 게시글 구간에 들어가면 시각은 null 입니다.
+def encode_activity_cursor(last_comment_at: datetime | None, post_id: int) -> str:
+    return _encode({"t": last_comment_at.isoformat() if last_comment_at else None, "id": post_id})
+
+
+def decode_activity_cursor(cursor: str) -> tuple[datetime | None, int]:
+    try:
+        payload = _decode(cursor)
+        timestamp, post_id = payload["t"], payload["id"]
+        if not _is_id(post_id) or not (timestamp is None or isinstance(timestamp, str)):
+            raise ValueError(payload)
+        last_comment_at = datetime.fromisoformat(timestamp) if timestamp is not None else None
+    except (ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+    return last_comment_at, post_id
+
+
+def activity_cursor(row) -> str:
+    return encode_activity_cursor(row.last_comment_at, row.id)
+
+
+def split_page(rows, limit: int, cursor_for=None):
+    # rows 는 limit + 1 개까지 조회한 결과입니다. 하나 더 있으면 다음 페이지가 존재합니다.
+    # cursor_for(마지막 행) 로 커서를 만들고, 지정하지 않으면 id 커서를 씁니다.
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, cursor_for(page[-1]) if cursor_for else encode_cursor(page[-1].id)
+
+
+# -----------------
+# 📋 목록 조회 필드 선택 (sparse fieldset)
+# -----------------
+# ?fields=title,owner_id 처럼 쉼표로 구분한 필드 이름만 응답에 담습니다. id 는 커서 계산에 필요하므로 항상 포함됩니다.
+def parse_fields(value: str | None, allowed) -> set[str] | None:
+    if not value:
+        return None
+    fields = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return fields
@@ -0,0 +1,86 @@
+﻿import argparse
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, case, func, select, update
+
+import models
+from database import engine
+
+# -----------------
+# 🔢 게시글별 댓글 수 / 마지막 댓글 시각 (비정규화 카운터)
+# -----------------
+# 피드(GET /posts/)에 댓글 수와 최근 활동을 보여 주려면 지금까지는 게시글마다 댓글 목록을 따로 조회해야 했습니다.
+# 대신 posts.comment_count / posts.last_comment_at 을 댓글을 저장하는 트랜잭션 안에서 함께 갱신합니다
+# (crud 의 모든 댓글 생성 경로: 단건, 일괄, write-behind 배치).
+# - 한 트랜잭션의 댓글은 게시글마다 UPDATE 한 번으로 모아서 반영합니다 (같은 게시글에 n 개면 +n).
+#   게시글 id 순으로 갱신하므로 동시에 도는 배치끼리 서로 다른 순서로 행 잠금을 잡지 않습니다.
+# - last_comment_at 은 더 최근 시각으로만 바뀝니다 (동시에 커밋된 트랜잭션의 순서가 뒤바뀌어도 뒤로 가지 않음).
+# - 이 컬럼이 생기기 전의 댓글은 작성 시각이 남아 있지 않으므로, backfill 은 comment_count 만 다시 셉니다
+#   (그런 게시글의 last_comment_at 은 다음 댓글이 달릴 때까지 NULL).
+_posts = models.Post.__table__
+_comments = models.Comment.__table__
+
+ACTIVITY_UPDATE = (
+    update(_posts)
+    .where(_posts.c.id == bindparam("b_post_id"))
+    .values(
+        comment_count=_posts.c.comment_count + bindparam("b_added"),
+        last_comment_at=case(
+            (_posts.c.last_comment_at.is_(None), bindparam("b_at")),
+            (_posts.c.last_comment_at < bindparam("b_at"), bindparam("b_at")),
+            else_=_posts.c.last_comment_at,
+        ),
+    )
+)
+
+# 게시글 id 구간 하나의 댓글 수를 다시 셉니다 (ix_comments_post_id_id 로 게시글마다 인덱스 범위만 셈).
+RECOUNT = (
+    update(_posts)
+    .where(_posts.c.id.between(bindparam("b_low"), bindparam("b_high")))
+    .values(
+        comment_count=select(func.count())
+        .where(_comments.c.post_id == _posts.c.id)
+        .scalar_subquery()
+    )
+)
+
+
+def utc_now() -> datetime:
+    # DB 에는 UTC naive datetime 으로 저장합니다 (다른 시각 컬럼과 같은 기준).
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def activity_params(post_ids, at: datetime | None = None) -> list[dict]:
+    # 새 댓글들의 post_id 목록 → ACTIVITY_UPDATE 의 executemany 파라미터
+    at = at or utc_now()
+    counts = Counter(post_ids)
+    return [{"b_post_id": post_id, "b_added": added, "b_at": at} for post_id, added in sorted(counts.items())]
+
+
+def backfill(bind=engine, batch_size: int = 1000, pause: float = 0.0) -> int:
+    # 게시글 id 구간마다 짧은 트랜잭션으로 다시 셉니다. 서비스 중에 실행해도 됩니다:
+    # 같은 게시글 행을 갱신하는 댓글 트랜잭션과는 행 잠금으로 순서가 정해지므로 증가분이 사라지지 않습니다.
+    with bind.connect() as connection:
+        max_id = connection.scalar(select(func.max(_posts.c.id))) or 0
+    updated = 0
+    for low in range(1, max_id + 1, batch_size):
+        with bind.begin() as connection:
+            updated += connection.execute(RECOUNT, {"b_low": low, "b_high": low + batch_size - 1}).rowcount
+        if pause:
+            time.sleep(pause)
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="post comment counter tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill_command = commands.add_parser("backfill", help="recount posts.comment_count from the comments table")
+    backfill_command.add_argument("--batch-size", type=int, default=1000, help="posts per transaction")
+    backfill_command.add_argument("--pause-ms", type=float, default=0.0, help="sleep between batches")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = backfill(batch_size=args.batch_size, pause=args.pause_ms / 1000)
+    print(f"recounted comments for {count} posts in {time.perf_counter() - started:.1f}s")
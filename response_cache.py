@@ -0,0 +1,326 @@
+﻿import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from fastapi import Request, Response, status
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+# -----------------
+# 🗃️ 공개 읽기 경로용 HTTP 응답 캐시 (ETag / If-None-Match)
+# -----------------
+# GET /posts/, GET /posts/{post_id}/comments/ 의 직렬화된 응답 바이트를 저장해 두고,
+# 같은 요청이 오면 DB 조회와 Pydantic 직렬화를 건너뜁니다.
+#
+# 무효화는 "태그 버전" 방식입니다. 캐시 키에 관련 태그(예: "posts")의 현재 버전이 들어가므로,
+# crud 에서 글/댓글을 쓰면 해당 태그 버전만 올리면 그 태그의 예전 항목은 더 이상 조회되지 않고
+# (LRU 로 자연히 밀려남) 다른 태그의 항목은 그대로 유지됩니다.
+#
+# memory 백엔드의 태그 버전은 프로세스마다 따로 있습니다. 워커가 여러 개면 한 워커에서 쓴 글이
+# 다른 워커의 캐시를 무효화하지 못하므로, 그 워커들은 RESPONSE_CACHE_MAX_AGE_SECONDS 동안 예전 응답을 줄 수 있습니다.
+# 워커가 여러 개면 sqlite 백엔드(같은 호스트)나 max-age 를 짧게 설정하세요.
+# sqlite 백엔드의 조회/저장/무효화는 파일 I/O 이므로 이벤트 루프가 아닌 스레드에서 실행합니다.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | sqlite | none
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+# 저장한 지 이 시간(초)이 지난 항목은 무효화와 관계없이 다시 만듭니다 (다른 워커의 쓰기를 놓쳤을 때의 상한).
+RESPONSE_CACHE_MAX_AGE_SECONDS = float(os.getenv("RESPONSE_CACHE_MAX_AGE_SECONDS", 30))
+# sqlite 백엔드: 같은 호스트의 여러 워커 프로세스가 함께 쓰는 공유 캐시 (Redis 등을 대신하는 로컬 대용)
+RESPONSE_CACHE_SQLITE_PATH = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "./response_cache.db")
+# sqlite 백엔드는 저장할 때마다가 아니라 이 횟수마다 한 번 오래된 항목을 지워 개수를 제한합니다.
+RESPONSE_CACHE_SQLITE_PRUNE_EVERY = int(os.getenv("RESPONSE_CACHE_SQLITE_PRUNE_EVERY", 100))
+
+response_cache_hits_total = Counter("response_cache_hits_total", "Responses served from the response cache", ["route"])
+response_cache_misses_total = Counter("response_cache_misses_total", "Responses rendered because of a cache miss", ["route"])
+response_cache_not_modified_total = Counter(
+    "response_cache_not_modified_total", "304 responses sent for a matching If-None-Match", ["route"]
+)
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "stored_at")
+
+    def __init__(self, body: bytes, etag: str, headers: dict, stored_at: float | None = None):
+        self.body = body
+        self.etag = etag
+        self.headers = headers
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+
+class CacheBackend(ABC):
+    # 백엔드 인터페이스: 키-값 저장 + 태그 버전 카운터
+    # blocking 이 True 인 백엔드(파일/네트워크 I/O)는 이 모듈이 스레드에서 호출합니다.
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> CachedResponse | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse):
+        ...
+
+    @abstractmethod
+    def tag_version(self, tag: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump_tag(self, tag: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    # 프로세스 안의 LRU 캐시 (항목 수와 바이트 수 모두 제한, max_age 초가 지난 항목은 없는 것으로 봄)
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        max_age: float = RESPONSE_CACHE_MAX_AGE_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                return None
+            if time.time() - value.stored_at > self.max_age:
+                del self._entries[key]
+                self._bytes -= len(value.body)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value.body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = value
+            self._bytes += len(value.body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def tag_version(self, tag):
+        return self._versions.get(tag, 0)
+
+    def bump_tag(self, tag):
+        with self._lock:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._bytes = 0
+
+
+class SqliteCacheBackend(CacheBackend):
+    # 로컬 SQLite 파일을 공유 저장소로 쓰는 백엔드. 여러 워커 프로세스가 같은 파일을 보므로
+    # 한 워커에서 글을 쓰면 다른 워커의 캐시도 함께 무효화됩니다.
+    blocking = True
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_SQLITE_PATH,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        max_age: float = RESPONSE_CACHE_MAX_AGE_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, etag TEXT, body BLOB, headers TEXT, stored_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_stored_at ON entries (stored_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS tag_versions (tag TEXT PRIMARY KEY, version INTEGER)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, body, headers, stored_at FROM entries WHERE key = ? AND stored_at > ?",
+                (key, time.time() - self.max_age),
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(row[1], row[0], json.loads(row[2]), row[3])
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, etag, body, headers, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value.etag, value.body, json.dumps(value.headers), value.stored_at),
+            )
+            # 가끔씩 만료된 항목과 가장 오래 저장된 항목을 지워 개수를 제한합니다 (정렬 DELETE 는 저장마다 하기엔 비쌈).
+            self._writes += 1
+            if self._writes % RESPONSE_CACHE_SQLITE_PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM entries WHERE stored_at <= ?", (time.time() - self.max_age,))
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def tag_version(self, tag):
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM tag_versions WHERE tag = ?", (tag,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_tag(self, tag):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tag_versions (tag, version) VALUES (?, 1) "
+                "ON CONFLICT(tag) DO UPDATE SET version = version + 1",
+                (tag,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM tag_versions")
+
+
+def _create_backend(name: str) -> CacheBackend | None:
+    if name == "none" or RESPONSE_CACHE_MAX_ENTRIES <= 0:
+        return None
+    if name == "sqlite":
+        return SqliteCacheBackend()
+    # uvicorn/gunicorn 은 --workers 기본값을 WEB_CONCURRENCY 에서 읽습니다.
+    if int(os.getenv("WEB_CONCURRENCY", 1)) > 1:
+        logger.warning(
+            "RESPONSE_CACHE_BACKEND=memory with %s workers: writes only invalidate the worker that made them, "
+            "other workers may serve stale listings for up to %ss (use RESPONSE_CACHE_BACKEND=sqlite)",
+            os.getenv("WEB_CONCURRENCY"),
+            RESPONSE_CACHE_MAX_AGE_SECONDS,
+        )
+    return MemoryCacheBackend()
+
+
+backend: CacheBackend | None = _create_backend(RESPONSE_CACHE_BACKEND)
+
+
+def set_backend(new_backend: CacheBackend | None):
+    # None 이면 캐시를 끕니다 (ETag/304 는 계속 동작).
+    global backend
+    backend = new_backend
+
+
+# -----------------
+# 태그 (무효화 단위)
+# -----------------
+POSTS_TAG = "posts"
+
+
+def post_comments_tag(post_id: int) -> str:
+    return f"post:{post_id}:comments"
+
+
+async def _call(current: CacheBackend, function, *args):
+    if current.blocking:
+        return await asyncio.to_thread(function, *args)
+    return function(*args)
+
+
+def _bump_tags(current: CacheBackend, tags):
+    for tag in tags:
+        current.bump_tag(tag)
+
+
+def invalidate(*tags: str):
+    # 동기 경로(스레드)용
+    if backend is None:
+        return
+    _bump_tags(backend, tags)
+
+
+async def invalidate_async(*tags: str):
+    current = backend
+    if current is None:
+        return
+    await _call(current, _bump_tags, current, tags)
+
+
+# -----------------
+# 라우트에서 사용하는 도구
+# -----------------
+def _request_key(request: Request) -> str:
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    return f"{request.url.path}?{query}"
+
+
+def _fetch(current: CacheBackend, request_key: str, tags) -> tuple[str, CachedResponse | None]:
+    # 태그 버전 조회 + 항목 조회 (blocking 백엔드는 둘을 스레드 한 번에서 처리)
+    versions = ",".join(f"{tag}={current.tag_version(tag)}" for tag in tags)
+    key = f"{request_key}#{versions}"
+    return key, current.get(key)
+
+
+def make_etag(body: bytes) -> str:
+    # 강한(strong) ETag: 본문 바이트의 해시
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {value.strip() for value in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def _build_response(request: Request, route: str, cached: CachedResponse) -> Response:
+    headers = dict(cached.headers)
+    headers["ETag"] = cached.etag
+    # 브라우저는 저장해 두되 매번 ETag 로 재검증하도록 합니다.
+    headers["Cache-Control"] = "no-cache"
+    if _etag_matches(request, cached.etag):
+        response_cache_not_modified_total.inc(route=route)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+async def lookup(request: Request, route: str, tags) -> tuple[Response | None, str | None]:
+    # (캐시된 응답 또는 None, 저장할 때 쓸 키)를 반환합니다.
+    current = backend
+    if current is None:
+        return None, None
+    key, cached = await _call(current, _fetch, current, _request_key(request), tags)
+    if cached is None:
+        response_cache_misses_total.inc(route=route)
+        return None, key
+    response_cache_hits_total.inc(route=route)
+    return _build_response(request, route, cached), key
+
+
+async def store(request: Request, route: str, key: str | None, body: bytes, headers: dict | None = None) -> Response:
+    cached = CachedResponse(body, make_etag(body), headers or {})
+    current = backend
+    if current is not None and key is not None:
+        await _call(current, current.set, key, cached)
+    return _build_response(request, route, cached)
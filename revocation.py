@@ -0,0 +1,134 @@
+﻿import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import crud
+from database import AsyncSessionLocal
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# -----------------
+# 🚫 토큰 폐기 목록 (jti)
+# -----------------
+# get_current_user 는 요청마다 토큰의 jti 가 폐기되었는지 확인해야 하지만, 그때마다 DB 를 조회할 수는 없습니다.
+# 그래서 각 워커가 revoked_tokens 테이블을 메모리의 dict(jti → 만료 시각)로 들고 O(1)로 확인합니다.
+# - 시작 시 만료되지 않은 항목을 모두 읽고, 이후 REVOCATION_SYNC_INTERVAL_SECONDS 마다 새로 추가된 행만 읽습니다
+#   (id 증분 동기화). 다른 워커/노드에서 폐기한 토큰도 이 주기 안에 반영됩니다.
+# - 이 워커에서 폐기한 토큰은 add() 로 바로 반영됩니다.
+# - 만료 시각이 지난 항목은 토큰 자체가 이미 무효이므로 메모리에서 지우고, 주기적으로 DB 에서도 지웁니다.
+REVOCATION_SYNC_INTERVAL_SECONDS = float(os.getenv("REVOCATION_SYNC_INTERVAL_SECONDS", 5))
+REVOCATION_PRUNE_INTERVAL_SECONDS = float(os.getenv("REVOCATION_PRUNE_INTERVAL_SECONDS", 3600))
+# 동시에 커밋된 트랜잭션은 id 순서와 커밋 순서가 다를 수 있으므로, 마지막 id 보다 이만큼 앞에서부터 다시 읽습니다.
+REVOCATION_SYNC_OVERLAP = int(os.getenv("REVOCATION_SYNC_OVERLAP", 1000))
+
+revoked_token_rejections_total = Counter(
+    "revoked_token_rejections_total", "Requests rejected because the token was revoked"
+)
+
+
+def to_timestamp(value: datetime) -> float:
+    # DB 에는 UTC naive datetime 으로 저장합니다 (auth_token 의 datetime.utcnow() 와 같은 기준).
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RevocationList:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._entries: dict[str, float] = {}
+        # (만료 시각, jti) 최소 힙: 만료된 항목을 전체를 훑지 않고 지우기 위함
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_revoked(self, jti: str | None) -> bool:
+        if jti is None:
+            return False
+        expires_at = self._entries.get(jti)
+        if expires_at is None or expires_at <= time.time():
+            return False
+        revoked_token_rejections_total.inc()
+        return True
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            if jti in self._entries:
+                return
+            self._entries[jti] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, jti))
+
+    def evict_expired(self, now: float | None = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, jti = heapq.heappop(self._expiry_heap)
+                self._entries.pop(jti, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap.clear()
+            self._last_id = 0
+
+    async def sync(self):
+        # DB 에 새로 추가된 폐기 항목을 읽어 반영합니다.
+        after_id = max(0, self._last_id - REVOCATION_SYNC_OVERLAP) if self._last_id else 0
+        async with self.session_factory() as db:
+            rows = await crud.get_revoked_tokens_since_async(db, after_id=after_id, now=utc_now())
+        for row in rows:
+            self.add(row.jti, to_timestamp(row.expires_at))
+            self._last_id = max(self._last_id, row.id)
+        self.evict_expired()
+
+    async def prune(self):
+        async with self.session_factory() as db:
+            await crud.delete_expired_tokens_async(db, now=utc_now())
+
+    # -----------------
+    # 백그라운드 동기화 (lifespan 에서 시작/종료)
+    # -----------------
+    async def start(self):
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        next_prune = time.monotonic() + REVOCATION_PRUNE_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(REVOCATION_SYNC_INTERVAL_SECONDS)
+            try:
+                await self.sync()
+                if time.monotonic() >= next_prune:
+                    await self.prune()
+                    next_prune = time.monotonic() + REVOCATION_PRUNE_INTERVAL_SECONDS
+            except Exception:
+                # DB 가 잠시 안 되더라도 메모리의 목록으로 계속 검사하고 다음 주기에 다시 시도합니다.
+                logger.exception("revocation list sync failed")
+
+
+revocation_list = RevocationList()
+
+revoked_tokens_entries = Gauge(
+    "revoked_tokens_entries", "Unexpired revoked token ids held in memory", callback=lambda: len(revocation_list)
+)
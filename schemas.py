@@ -1,5 +1,6 @@
-﻿from pydantic import BaseModel,Field,ConfigDict
-from typing import Optional
+﻿from datetime import datetime
+from pydantic import BaseModel,Field,ConfigDict
+from typing import Literal, Optional
 
 # 1. 사용자 생성 요청 시 사용 (ID, PW 포함)
 class UserCreate(BaseModel):
@@ -38,6 +39,12 @@ class Token(BaseModel):
     access_token: str
     # 토큰 타입 (보통 "bearer"입니다)
     token_type: str
+    # 액세스 토큰 만료 후 POST /token/refresh 로 새 토큰을 받을 때 사용
+    refresh_token: str | None = None
+
+# 리프레시/로그아웃 요청 본문
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
     
 class TokenData(BaseModel):
     # JWT에 담긴 사용자 이름 (선택적)
@@ -54,6 +61,9 @@ class Post(BaseModel):
     title: str
     content: str
     owner_id: int
+    # 댓글 수와 마지막 댓글 시각 (UTC). 피드에서 게시글마다 댓글을 따로 조회하지 않아도 됩니다.
+    comment_count: int = 0
+    last_comment_at: datetime | None = None
     
     # Pydantic V2 설정
     model_config = ConfigDict(from_attributes=True)
@@ -70,4 +80,40 @@ class Comment(CommentBase):
     owner_id: int 
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# write-behind 모드에서 접수만 된 댓글 (202 응답). 실제 id 는 배치 저장 후에 정해집니다.
+class PendingComment(CommentBase):
+    provisional_id: str
+    post_id: int
+    owner_id: int
+    status: str = "queued"
+
+# 작성자 정보 (게시글 상세 응답에 포함)
+class Author(BaseModel):
+    id: int
+    username: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+# 작성자 정보가 포함된 댓글
+class CommentWithAuthor(Comment):
+    owner: Author
+
+# 게시글 상세 응답: 게시글 + 작성자 + 첫 페이지 댓글(각 댓글 작성자 포함)
+class PostDetail(Post):
+    owner: Author
+    comments: list[CommentWithAuthor]
+    # 다음 댓글 페이지 커서 (GET /posts/{post_id}/comments/?cursor= 에 그대로 전달)
+    next_comments_cursor: str | None = None
+
+# 전문 검색 결과 (GET /search). 게시글이면 title 이 있고, 댓글이면 post_id 로 원래 게시글을 찾아갑니다.
+class SearchHit(BaseModel):
+    kind: Literal["post", "comment"]
+    id: int
+    post_id: int
+    title: str | None = None
+    # 일치한 부분 주변의 본문 미리보기 (HTML 강조 없이 일반 텍스트)
+    snippet: str
+    # 관련도 (클수록 관련 높음, 같은 검색 안에서만 비교 가능)
+    score: float
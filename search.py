@@ -0,0 +1,237 @@
+﻿import argparse
+import os
+import re
+from abc import ABC, abstractmethod
+
+from sqlalchemy import bindparam, event, text
+
+from database import Base, engine
+
+# -----------------
+# 🔎 전문 검색 (게시글 제목/본문 + 댓글)
+# -----------------
+# DB마다 다른 전문 검색 인덱스를 같은 인터페이스(SearchBackend) 뒤에 둡니다.
+# - SQLite (로컬): FTS5 가상 테이블 posts_fts / comments_fts. 원문은 posts / comments 에 그대로 두고
+#   (external content) 역색인만 저장합니다. crud 의 생성 함수가 같은 트랜잭션에서 색인 행을 추가합니다.
+# - MySQL (운영): posts(title, content) / comments(content) 의 FULLTEXT 인덱스. InnoDB 가 INSERT 때 직접
+#   갱신하므로 따로 색인할 것이 없습니다.
+#
+# 검색은 쿼리 2개입니다.
+# 1. 순위: 일치하는 문서의 (종류, id, 점수)만 점수 순으로 한 페이지 가져옵니다 (점수가 낮을수록 관련도 높음).
+#    FTS5 의 bm25() 는 원래 낮을수록 좋고, MySQL 의 MATCH() 점수는 부호를 바꿔 같은 방향으로 맞춥니다.
+# 2. 상세: 그 페이지의 문서만 제목/본문 미리보기(snippet)를 만듭니다 (snippet 계산은 비싸므로 페이지 안에서만).
+# 다음 페이지는 (점수, 종류, id) 키셋 커서로 이어집니다.
+#
+# 지금은 글/댓글 수정·삭제 경로가 없어서 색인 추가만 합니다. 직접 DB를 고쳤다면
+# python search.py rebuild 로 색인을 다시 만들 수 있습니다 (SQLite).
+SEARCH_TITLE_WEIGHT = float(os.getenv("SEARCH_TITLE_WEIGHT", 5.0))  # 제목 일치에 주는 가중치 (SQLite)
+SEARCH_SNIPPET_TOKENS = int(os.getenv("SEARCH_SNIPPET_TOKENS", 16))
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", 200))  # MySQL: 본문 앞부분을 미리보기로 사용
+SEARCH_MAX_TERMS = int(os.getenv("SEARCH_MAX_TERMS", 8))
+# 한국어처럼 조사가 붙는 언어에서 부분 문자열로 찾으려면 "trigram" 을 쓸 수 있습니다 (색인이 커지고 3글자 이상만 검색).
+# 바꾼 뒤에는 posts_fts / comments_fts 를 지우고 다시 만들어야 합니다.
+SEARCH_FTS5_TOKENIZER = os.getenv("SEARCH_FTS5_TOKENIZER", "unicode61 remove_diacritics 2")
+
+
+def query_terms(q: str) -> list[str]:
+    # 사용자 입력을 단어 목록으로 바꿉니다. 검색 문법(따옴표, AND/OR, *, - 등)은 그대로 전달하지 않습니다.
+    return re.findall(r"\w+", q)[:SEARCH_MAX_TERMS]
+
+
+def _keyset_clause(after) -> tuple[str, dict]:
+    # after: (점수, 종류, id) — 이전 페이지의 마지막 결과
+    if after is None:
+        return "", {}
+    score, kind, doc_id = after
+    return (
+        "WHERE score > :after_score OR (score = :after_score AND "
+        "(kind > :after_kind OR (kind = :after_kind AND id > :after_id)))",
+        {"after_score": score, "after_kind": kind, "after_id": doc_id},
+    )
+
+
+class SearchBackend(ABC):
+    # 색인을 DB가 직접 관리하는 백엔드(MySQL FULLTEXT)는 create / rebuild / index_statements 를 그대로 둡니다.
+    def create(self, connection) -> bool:
+        # create_all 로 테이블을 만들 때 호출: 색인 구조가 없으면 만들고 기존 데이터로 채웁니다 (만들었으면 True).
+        return False
+
+    def rebuild(self, connection):
+        pass
+
+    def index_statements(self, posts=(), comments=()) -> list[tuple]:
+        # 새로 저장한 글/댓글(ORM 객체)을 색인하는 (문장, 파라미터 목록) 쌍. 호출한 쪽의 트랜잭션에서 실행합니다.
+        return []
+
+    @abstractmethod
+    def rank_statement(self, terms: list[str], limit: int, after=None) -> tuple:
+        # 한 페이지의 (kind, id, score) 를 점수 순으로 고르는 (문장, 파라미터)
+        ...
+
+    @abstractmethod
+    def details_statement(self, terms: list[str], hits) -> tuple:
+        # hits 의 문서만 (kind, id, post_id, title, snippet) 을 읽는 (문장, 파라미터)
+        ...
+
+
+class Fts5SearchBackend(SearchBackend):
+    def create(self, connection):
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+        ).first()
+        if exists:
+            return False
+        tokenize = SEARCH_FTS5_TOKENIZER.replace("'", "''")
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5("
+            f"title, content, content='posts', content_rowid='id', tokenize='{tokenize}')"
+        ))
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE comments_fts USING fts5("
+            f"content, content='comments', content_rowid='id', tokenize='{tokenize}')"
+        ))
+        self.rebuild(connection)
+        return True
+
+    def rebuild(self, connection):
+        connection.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+        connection.execute(text("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')"))
+
+    def index_statements(self, posts=(), comments=()):
+        statements = []
+        if posts:
+            statements.append((
+                text("INSERT INTO posts_fts (rowid, title, content) VALUES (:id, :title, :content)"),
+                [{"id": post.id, "title": post.title, "content": post.content} for post in posts],
+            ))
+        if comments:
+            statements.append((
+                text("INSERT INTO comments_fts (rowid, content) VALUES (:id, :content)"),
+                [{"id": comment.id, "content": comment.content} for comment in comments],
+            ))
+        return statements
+
+    @staticmethod
+    def _match(terms):
+        # 각 단어를 따옴표로 감싼 구문의 AND
+        return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def rank_statement(self, terms, limit, after=None):
+        keyset, params = _keyset_clause(after)
+        statement = text(
+            "SELECT kind, id, score FROM ("
+            "SELECT 'post' AS kind, rowid AS id, bm25(posts_fts, :title_weight, 1.0) AS score "
+            "FROM posts_fts WHERE posts_fts MATCH :match "
+            "UNION ALL "
+            "SELECT 'comment' AS kind, rowid AS id, bm25(comments_fts) AS score "
+            "FROM comments_fts WHERE comments_fts MATCH :match"
+            f") AS hits {keyset} ORDER BY score, kind, id LIMIT :limit"
+        )
+        params.update(match=self._match(terms), title_weight=SEARCH_TITLE_WEIGHT, limit=limit)
+        return statement, params
+
+    def details_statement(self, terms, hits):
+        statement = text(
+            "SELECT 'post' AS kind, posts_fts.rowid AS id, posts_fts.rowid AS post_id, posts_fts.title AS title, "
+            "snippet(posts_fts, 1, '', '', '…', :tokens) AS snippet "
+            "FROM posts_fts WHERE posts_fts MATCH :match AND posts_fts.rowid IN :post_ids "
+            "UNION ALL "
+            "SELECT 'comment' AS kind, comments_fts.rowid AS id, comments.post_id AS post_id, NULL AS title, "
+            "snippet(comments_fts, 0, '', '', '…', :tokens) AS snippet "
+            "FROM comments_fts JOIN comments ON comments.id = comments_fts.rowid "
+            "WHERE comments_fts MATCH :match AND comments_fts.rowid IN :comment_ids"
+        ).bindparams(bindparam("post_ids", expanding=True), bindparam("comment_ids", expanding=True))
+        return statement, {
+            "match": self._match(terms),
+            "tokens": SEARCH_SNIPPET_TOKENS,
+            "post_ids": [hit.id for hit in hits if hit.kind == "post"],
+            "comment_ids": [hit.id for hit in hits if hit.kind == "comment"],
+        }
+
+
+class MySqlFullTextBackend(SearchBackend):
+    # FULLTEXT 인덱스는 models.py 에 선언되어 있고 (MySQL 에서만 생성) InnoDB 가 INSERT 때 갱신합니다.
+    # 필터는 BOOLEAN MODE 의 +단어 (모든 단어 포함), 점수는 NATURAL LANGUAGE MODE 관련도입니다.
+    def rank_statement(self, terms, limit, after=None):
+        keyset, params = _keyset_clause(after)
+        statement = text(
+            "SELECT kind, id, score FROM ("
+            "SELECT 'post' AS kind, id, -(MATCH (title, content) AGAINST (:natural)) AS score "
+            "FROM posts WHERE MATCH (title, content) AGAINST (:boolean IN BOOLEAN MODE) "
+            "UNION ALL "
+            "SELECT 'comment' AS kind, id, -(MATCH (content) AGAINST (:natural)) AS score "
+            "FROM comments WHERE MATCH (content) AGAINST (:boolean IN BOOLEAN MODE)"
+            f") AS hits {keyset} ORDER BY score, kind, id LIMIT :limit"
+        )
+        params.update(natural=" ".join(terms), boolean=" ".join("+" + term for term in terms), limit=limit)
+        return statement, params
+
+    def details_statement(self, terms, hits):
+        statement = text(
+            "SELECT 'post' AS kind, id, id AS post_id, title, SUBSTRING(content, 1, :chars) AS snippet "
+            "FROM posts WHERE id IN :post_ids "
+            "UNION ALL "
+            "SELECT 'comment' AS kind, id, post_id, NULL AS title, SUBSTRING(content, 1, :chars) AS snippet "
+            "FROM comments WHERE id IN :comment_ids"
+        ).bindparams(bindparam("post_ids", expanding=True), bindparam("comment_ids", expanding=True))
+        return statement, {
+            "chars": SEARCH_SNIPPET_CHARS,
+            "post_ids": [hit.id for hit in hits if hit.kind == "post"],
+            "comment_ids": [hit.id for hit in hits if hit.kind == "comment"],
+        }
+
+
+_backends = {"sqlite": Fts5SearchBackend(), "mysql": MySqlFullTextBackend()}
+
+
+def backend_for(dialect_name: str) -> SearchBackend | None:
+    # 지원하지 않는 DB면 None (검색 API 는 501, 색인 갱신은 건너뜀)
+    return _backends.get(dialect_name)
+
+
+def index_statements(dialect_name: str, posts=(), comments=()) -> list[tuple]:
+    backend = backend_for(dialect_name)
+    return backend.index_statements(posts, comments) if backend else []
+
+
+# models.Base.metadata.create_all (main.py) 로 테이블을 만들 때 검색 색인도 함께 만듭니다.
+# (alembic 을 쓰는 환경에서는 마이그레이션이 만듭니다.)
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    backend = backend_for(connection.dialect.name)
+    if backend is not None:
+        backend.create(connection)
+
+
+def merge_results(hits, details) -> list[dict]:
+    # 순위 쿼리 결과(hits)의 순서대로 상세 정보를 붙입니다.
+    by_key = {(row.kind, row.id): row for row in details}
+    results = []
+    for hit in hits:
+        row = by_key.get((hit.kind, hit.id))
+        if row is None:  # 두 쿼리 사이에 지워진 문서
+            continue
+        results.append({
+            "kind": hit.kind,
+            "id": hit.id,
+            "post_id": row.post_id,
+            "title": row.title,
+            "snippet": row.snippet or "",
+            "score": -hit.score,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="full-text search index tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="create the search index if missing and rebuild it from posts/comments")
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        backend = backend_for(connection.dialect.name)
+        if backend is None:
+            raise SystemExit(f"full-text search is not supported on {connection.dialect.name}")
+        if not backend.create(connection):
+            backend.rebuild(connection)
+    print("search index rebuilt")
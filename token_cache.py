@@ -0,0 +1,157 @@
+﻿import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from metrics import Counter, Gauge
+from models import User as UserModel
+from schemas import User
+
+# -----------------
+# 🎟️ 검증된 토큰 → 사용자(principal) 캐시
+# -----------------
+# 같은 Bearer 토큰이 반복해서 들어오면 jwt.decode 와 users 테이블 조회를 건너뜁니다.
+# - 키: 토큰 문자열의 SHA-256 다이제스트 (원문 토큰은 메모리에 두지 않음)
+# - 값: 디코딩된 클레임 + 세션과 분리된 가벼운 사용자 정보 (schemas.User: id, username, is_active)
+# - 만료: 토큰의 exp 와 TOKEN_CACHE_TTL_SECONDS 중 빠른 쪽, 개수는 LRU 로 제한
+# - 무효화: User.is_active/username 변경, 사용자 삭제가 커밋되면 해당 사용자의 항목을 모두 제거
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 60))
+# 0 이면 캐시를 사용하지 않습니다.
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+
+token_cache_hits_total = Counter("token_cache_hits_total", "Authenticated requests served from the token cache")
+token_cache_misses_total = Counter("token_cache_misses_total", "Authenticated requests that had to decode the token")
+
+
+class CachedToken:
+    __slots__ = ("claims", "principal", "expires_at")
+
+    def __init__(self, claims: dict, principal: User, expires_at: float):
+        self.claims = claims
+        self.principal = principal
+        self.expires_at = expires_at
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, ttl_seconds: float = TOKEN_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[bytes, CachedToken] = OrderedDict()
+        # username -> 그 사용자의 토큰 다이제스트들 (사용자 단위 무효화용)
+        self._by_username: dict[str, set[bytes]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token: str) -> CachedToken | None:
+        if self.max_entries <= 0:
+            return None
+        key = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                token_cache_misses_total.inc()
+                return None
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                token_cache_misses_total.inc()
+                return None
+            self._entries.move_to_end(key)
+        token_cache_hits_total.inc()
+        return entry
+
+    def put(self, token: str, claims: dict, principal: User):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        key = self._digest(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = CachedToken(claims, principal, expires_at)
+            self._by_username.setdefault(principal.username, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, username: str):
+        with self._lock:
+            for key in self._by_username.pop(username, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_username.clear()
+
+    def _remove(self, key: bytes):
+        # self._lock 을 잡은 상태에서만 호출
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_username.get(entry.principal.username)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_username[entry.principal.username]
+
+
+token_cache = TokenCache()
+
+token_cache_entries = Gauge("token_cache_entries", "Tokens currently cached", callback=lambda: len(token_cache))
+
+
+# -----------------
+# 무효화: User 행이 바뀌거나 지워지면 캐시된 principal 이 더 이상 유효하지 않습니다.
+# (Query.update()/delete() 같은 벌크 연산은 ORM 이벤트를 거치지 않으므로 invalidate_user 를 직접 호출해야 합니다.)
+# flush 시점에 바로 지우면 커밋 전에 들어온 다른 요청이 아직 바뀌기 전의 행을 다시 캐시할 수 있으므로,
+# flush 때는 사용자 이름을 session.info 에 모아 두고 커밋이 끝난 뒤에 지웁니다 (롤백되면 버림).
+# -----------------
+_PENDING_INVALIDATIONS = "token_cache_pending_usernames"
+
+
+def _invalidate_after_commit(target, usernames):
+    session = object_session(target)
+    if session is None:
+        for username in usernames:
+            token_cache.invalidate_user(username)
+        return
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).update(usernames)
+
+
+@event.listens_for(UserModel, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.is_active.history.has_changes() or state.attrs.username.history.has_changes():
+        # 이름이 바뀐 경우 이전 이름으로 캐시되어 있으므로 이전 값도 함께 지웁니다.
+        _invalidate_after_commit(target, set(state.attrs.username.history.deleted or ()) | {target.username})
+
+
+@event.listens_for(UserModel, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    _invalidate_after_commit(target, {target.username})
+
+
+# SAVEPOINT 의 커밋/롤백에서도 불리므로, 가장 바깥 트랜잭션이 끝날 때만 처리합니다.
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session):
+    if session.in_nested_transaction():
+        return
+    for username in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        token_cache.invalidate_user(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    if not session.in_nested_transaction():
+        session.info.pop(_PENDING_INVALIDATIONS, None)